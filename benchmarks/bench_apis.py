@@ -0,0 +1,89 @@
+import os
+import asyncio
+import itertools
+
+from fakes import FakeReddit, FakeTwikitClient
+from harness import Skip, benchmark
+
+REDDIT_TOPICS = ["Bitcoin", "Tesla", "CD Projekt"]
+
+
+# === Reddit (fetch_and_save_posts z klientem FakeReddit zamiast PRAW) ===
+
+def _reddit_scraper(fake):
+    try:
+        import reddit_scraper
+    except ImportError as e:
+        raise Skip(f"brak zależności reddit_scraper: {e}")
+    # Wszystkie wątki puli dostają tego samego klienta testowego zamiast praw.Reddit
+    reddit_scraper.get_reddit = lambda: fake
+    return reddit_scraper
+
+
+@benchmark("reddit.search", "api")
+def reddit_search(quick):
+    from crawl_state import CrawlState
+    # Limit jak w API Reddita, ale w oknie 10 s, żeby 429 pojawiały się już w krótkim przebiegu
+    fake = FakeReddit(latency=0.02 if quick else 0.05, posts_per_listing=100 if quick else 250,
+                      rate_limit=100, rate_window=10.0)
+    scraper = _reddit_scraper(fake)
+    subreddits = len(scraper.FINANCE_SUBREDDITS)
+    runs = itertools.count()
+    params = {"topics": len(REDDIT_TOPICS), "subreddits": subreddits, "latency": fake.latency, "workers": 8}
+
+    def call():
+        # Nowy stan crawla w każdym powtórzeniu - inaczej high-water mark zatrzymałby stronicowanie
+        with CrawlState(os.path.join("state", f"reddit-search-{next(runs)}.sqlite")) as state:
+            scraper.fetch_and_save_posts(REDDIT_TOPICS, days_back=365, limit_total=subreddits * fake.posts_per_listing,
+                                         workers=8, requests_per_minute=600, state=state)
+        params["rate_limited"] = fake.rate.rejected
+        params["requests"] = fake.rate.requests
+    return call, len(REDDIT_TOPICS) * subreddits * fake.posts_per_listing, params
+
+
+@benchmark("reddit.route_new", "api")
+def reddit_route_new(quick):
+    from crawl_state import CrawlState
+    fake = FakeReddit(latency=0.02 if quick else 0.05, posts_per_listing=100 if quick else 1000, spacing=60.0,
+                      rate_limit=100, rate_window=10.0)
+    scraper = _reddit_scraper(fake)
+    subreddits = len(scraper.FINANCE_SUBREDDITS)
+    runs = itertools.count()
+    params = {"topics": len(REDDIT_TOPICS), "subreddits": subreddits, "latency": fake.latency, "workers": 8}
+
+    def call():
+        with CrawlState(os.path.join("state", f"reddit-new-{next(runs)}.sqlite")) as state:
+            scraper.route_and_save_posts(REDDIT_TOPICS, days_back=365, limit_per_subreddit=fake.posts_per_listing,
+                                         workers=8, requests_per_minute=600, state=state)
+        params["rate_limited"] = fake.rate.rejected
+        params["requests"] = fake.rate.requests
+    return call, subreddits * fake.posts_per_listing, params
+
+
+# === Twikit (search_windows z klientem FakeTwikitClient) ===
+
+@benchmark("twikit.search_windows", "api")
+def twikit_search_windows(quick):
+    from keyword_matcher import INVESTMENT_MATCHER
+    from rate_limiter import TokenBucket
+    from twikit_search import month_windows, search_windows
+
+    # Serwer: 100 zapytań na 5 s; limiter klienta ustawiony tak samo jak search_limiter() dla X
+    client = FakeTwikitClient(latency=0.05 if quick else 0.1, pages_per_window=2 if quick else 5,
+                              rate_limit=100, rate_window=5.0)
+    windows = month_windows("2025-01-01", "2025-04-01" if quick else "2025-07-01")
+    params = {"windows": len(windows), "pages_per_window": client.pages_per_window, "latency": client.latency,
+              "concurrency": 4}
+
+    def call():
+        matched = []
+
+        def sink(tweet):
+            if INVESTMENT_MATCHER.find(tweet.text):
+                matched.append(tweet)
+
+        limiter = TokenBucket(100 / 5.0, capacity=100)
+        asyncio.run(search_windows(client, "bitcoin", windows, sink, limiter=limiter, concurrency=4))
+        params["rate_limited"] = client.rate.rejected
+        params["matched"] = len(matched)
+    return call, len(windows) * client.pages_per_window * client.count, params
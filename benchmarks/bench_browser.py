@@ -0,0 +1,142 @@
+import atexit
+import importlib
+from functools import partial
+
+from fake_server import FixtureServer
+from harness import Skip, benchmark
+
+# Jeden serwer i po jednej puli przeglądarek na tryb (DOM, przechwytywanie sieci) na cały przebieg
+_server = None
+_pools = {}
+
+
+def _fixture_server():
+    global _server
+    if _server is None:
+        _server = FixtureServer(latency=0.05, tweets=200, comments=40, batch=20, scroll_delay_ms=100).start()
+        atexit.register(_server.close)
+    return _server
+
+
+def _capture_driver():
+    # Headless Chrome z logiem zdarzeń Network i przechwytywaniem timeline'ów jak w init_x_driver
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from network_capture import attach, enable_network_log
+
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    driver = webdriver.Chrome(options=enable_network_log(options))
+    attach(driver)
+    return driver
+
+
+def _browser_pool(capture=False):
+    # Zwykły headless Chrome z fb+ig_scraper - strony X z lokalnego serwera nie wymagają logowania
+    if capture not in _pools:
+        try:
+            fbig = importlib.import_module("fb+ig_scraper")
+            from browser_pool import BrowserPool
+        except ImportError as e:
+            raise Skip(f"brak Selenium: {e}")
+        pool = BrowserPool(_capture_driver if capture else fbig.init_driver, size=3, max_retries=1)
+        try:
+            pool.warm_up(1)
+        except Exception as e:
+            raise Skip(f"Chrome niedostępny: {e}")
+        atexit.register(pool.close)
+        _pools[capture] = pool
+    return _pools[capture]
+
+
+def _x_scraper():
+    try:
+        import x_scraper
+    except ImportError as e:
+        raise Skip(f"brak zależności x_scraper: {e}")
+    server = _fixture_server()
+    x_scraper.X_SEARCH_URL = server.url("/x/search?q={query}")
+    x_scraper.X_STATUS_URL = server.url("/x/status/{tweet_id}")
+    return x_scraper
+
+
+class _NoComments:
+    # Harvester, który nic nie przyjmuje - mierzymy samo wyszukiwanie
+    def submit(self, tweet_url, parent_text):
+        return False
+
+
+def _x_search(quick, capture):
+    x_scraper = _x_scraper()
+    server = _fixture_server()
+    pool = _browser_pool(capture)
+    max_scrolls = 3 if quick else 20
+    params = {"max_scrolls": max_scrolls, "scroll_delay_ms": server.scroll_delay_ms, "capture": capture}
+
+    def call():
+        tweets = []
+        with pool.session(pages=0) as driver:
+            x_scraper.scrape_x_selenium(driver, pool, _NoComments(), "bitcoin", tweets.append,
+                                        [("2025-05-01", "2025-06-01")], max_scrolls, max_wait_time=300, scroll_timeout=2)
+        params["tweets"] = len(tweets)
+    # Elementy to artykuły na stronie (z filtrem słów kluczowych część nie trafia do wyników)
+    return call, min(server.tweets, server.batch * (max_scrolls + 1)), params
+
+
+def _x_comments(quick, capture):
+    x_scraper = _x_scraper()
+    pool = _browser_pool(capture)
+    statuses = 2 if quick else 6
+    # Krótszy timeout scrolla niż w produkcji (8 s) - ostatni scroll zawsze czeka do timeoutu
+    harvest = partial(x_scraper.harvest_comments, max_scrolls=5, scroll_timeout=2)
+
+    def call():
+        with pool.session() as driver:
+            for n in range(statuses):
+                harvest(driver, x_scraper.status_url(1_800_000_000_000_000_000 + n * 1_000_000), "parent")
+    return call, statuses, {"status_pages": statuses, "comments_per_page": _fixture_server().comments,
+                            "capture": capture}
+
+
+@benchmark("browser.x_search", "browser", repeat=2)
+def browser_x_search(quick):
+    return _x_search(quick, capture=False)
+
+
+@benchmark("browser.x_search_network", "browser", repeat=2)
+def browser_x_search_network(quick):
+    return _x_search(quick, capture=True)
+
+
+@benchmark("browser.x_comments", "browser", repeat=2)
+def browser_x_comments(quick):
+    return _x_comments(quick, capture=False)
+
+
+@benchmark("browser.x_comments_network", "browser", repeat=2)
+def browser_x_comments_network(quick):
+    return _x_comments(quick, capture=True)
+
+
+def _fbig_page(platform, url_attribute, path, scrape_name):
+    try:
+        fbig = importlib.import_module("fb+ig_scraper")
+    except ImportError as e:
+        raise Skip(f"brak Selenium: {e}")
+    setattr(fbig, url_attribute, _fixture_server().url(path))
+    pool = _browser_pool()
+    scrape = getattr(fbig, scrape_name)
+    # scrape_* to generatory - list() wymusza pobranie strony i ekstrakcję
+    return (lambda: list(scrape("bitcoin", max_posts=10, pool=pool))), 1, {"platform": platform}
+
+
+@benchmark("browser.facebook", "browser", repeat=3)
+def browser_facebook(quick):
+    return _fbig_page("facebook", "FACEBOOK_SEARCH_URL", "/facebook/search?q={query}", "scrape_facebook")
+
+
+@benchmark("browser.instagram", "browser", repeat=3)
+def browser_instagram(quick):
+    return _fbig_page("instagram", "INSTAGRAM_TAG_URL", "/instagram/tags/{query}/", "scrape_instagram")
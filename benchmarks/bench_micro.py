@@ -0,0 +1,189 @@
+import os
+import json
+import itertools
+from datetime import datetime, timezone
+
+import fixtures
+from harness import Skip, benchmark
+
+TOPIC = "Bitcoin"
+DAY = datetime(2025, 1, 1, tzinfo=timezone.utc)
+# Scrapery zapisują paczkami: strona wyników, scroll albo temat
+SAVE_BATCH = 50
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# === Słowa kluczowe (contains_investment_keywords / text_contains_investment_keywords) ===
+
+@benchmark("keywords.contains", "micro")
+def keywords_contains(quick):
+    from keyword_matcher import INVESTMENT_MATCHER
+    texts = fixtures.post_texts(2_000 if quick else 20_000, max_words=120)
+
+    def call():
+        for text in texts:
+            INVESTMENT_MATCHER.contains(text)
+    return call, len(texts), {"texts": len(texts)}
+
+
+@benchmark("keywords.find", "micro")
+def keywords_find(quick):
+    from keyword_matcher import INVESTMENT_MATCHER
+    texts = fixtures.post_texts(2_000 if quick else 20_000, max_words=120)
+
+    def call():
+        for text in texts:
+            INVESTMENT_MATCHER.find(text)
+    return call, len(texts), {"texts": len(texts)}
+
+
+# === Deduplikacja przy zapisie (save_posts -> storage.append) ===
+
+@benchmark("dedup.save_posts", "micro")
+def dedup_save_posts(quick):
+    from storage import JsonlStorage
+    posts = fixtures.posts(2_000 if quick else 20_000, duplicates=0.3)
+    runs = itertools.count()
+
+    def call():
+        # Każde powtórzenie do nowego katalogu - zapis do pustej partycji jak pierwszy przebieg dnia
+        storage = JsonlStorage(os.path.join("dedup", f"run-{next(runs)}"))
+        for batch in _batches(posts, SAVE_BATCH):
+            storage.append(TOPIC, DAY, [dict(post) for post in batch])
+        storage.flush()
+    return call, len(posts), {"posts": len(posts), "duplicates": 0.3, "batch": SAVE_BATCH}
+
+
+@benchmark("dedup.save_posts_repeated", "micro")
+def dedup_save_posts_repeated(quick):
+    # Ponowny przebieg tematu: prawie wszystko jest już w indeksie dnia
+    from storage import JsonlStorage
+    posts = fixtures.posts(2_000 if quick else 20_000, duplicates=0.3)
+    storage = JsonlStorage(os.path.join("dedup", "repeated"))
+    for batch in _batches(posts, SAVE_BATCH):
+        storage.append(TOPIC, DAY, [dict(post) for post in batch])
+    storage.flush()
+
+    def call():
+        for batch in _batches(posts, SAVE_BATCH):
+            storage.append(TOPIC, DAY, [dict(post) for post in batch])
+        storage.flush()
+    return call, len(posts), {"posts": len(posts)}
+
+
+@benchmark("dedup.cold_index", "micro")
+def dedup_cold_index(quick):
+    # Pierwsze dopisanie w nowym procesie: wczytanie DD.idx dużej partycji
+    from dedup_index import DedupIndex
+    from storage import JsonlStorage
+    storage = JsonlStorage(os.path.join("dedup", "cold"))
+    existing = fixtures.posts(5_000 if quick else 50_000, seed=2)
+    for batch in _batches(existing, 1_000):
+        storage.append(TOPIC, DAY, batch)
+    storage.flush()
+    path = storage.path(TOPIC, DAY)
+    fresh = fixtures.posts(SAVE_BATCH, seed=3)
+
+    def call():
+        DedupIndex().filter_new(path, fresh)
+    return call, None, {"indexed_posts": len(existing)}
+
+
+@benchmark("dedup.near_duplicates", "micro")
+def dedup_near_duplicates(quick):
+    from near_dedup import NearDuplicateIndex
+    posts = fixtures.posts(2_000 if quick else 20_000, duplicates=0.3)
+    runs = itertools.count()
+
+    def call():
+        index = NearDuplicateIndex(os.path.join("near", f"run-{next(runs)}.idx"))
+        for batch in _batches(posts, SAVE_BATCH):
+            index.mark([dict(post) for post in batch])
+        index.flush()
+    return call, len(posts), {"posts": len(posts)}
+
+
+@benchmark("pipeline.stream", "micro")
+def pipeline_stream(quick):
+    # Cały potok zapisu: filtr słów kluczowych, deduplikacja po ID, partycje dni i zapis paczkami
+    from pipeline import Pipeline, Record
+    from storage import JsonlStorage
+    # Bez gotowych słów kluczowych - filtr liczy je dla każdego wpisu
+    posts = [{key: value for key, value in post.items() if key != "keywords"}
+             for post in fixtures.posts(2_000 if quick else 20_000, duplicates=0.3)]
+    runs = itertools.count()
+
+    def call():
+        storage = JsonlStorage(os.path.join("pipeline", f"run-{next(runs)}"))
+        with Pipeline(storage=storage, flush_interval=60) as pipeline:
+            for n, post in enumerate(posts):
+                pipeline.put(Record(TOPIC, dict(post), DAY, key=n, require_keywords=False))
+    return call, len(posts), {"posts": len(posts), "duplicates": 0.3}
+
+
+# === Dekodowanie przechwyconych odpowiedzi X (tryb sieciowy x_scraper) ===
+
+@benchmark("capture.search_timeline", "micro")
+def capture_search_timeline(quick):
+    from network_capture import timeline_items
+    batch = 20
+    results = fixtures.x_search_tweets(500 if quick else 5_000)
+    # Odpowiedzi przychodzą jako tekst z Network.getResponseBody - mierzymy też json.loads
+    pages = [json.dumps(fixtures.x_search_timeline(results, page, batch)) for page in range(len(results) // batch)]
+
+    def call():
+        for page in pages:
+            timeline_items(json.loads(page))
+    return call, len(results), {"tweets": len(results), "pages": len(pages)}
+
+
+# === Ekstrakcja HTML (FB/IG) ===
+
+def legacy_facebook(html):
+    # Dawna ekstrakcja: get_text() na każdym divie (bez limitu postów, żeby pokazać pełny koszt)
+    from dom_extract import make_soup
+    soup = make_soup(html)
+    return [text for text in (div.get_text(strip=True) for div in soup.find_all("div")) if len(text) > 50]
+
+
+def legacy_instagram(html):
+    from dom_extract import make_soup
+    soup = make_soup(html)
+    return [text for text in (article.get_text(strip=True) for article in soup.find_all("article")) if text]
+
+
+def _extract(platform, html, extract):
+    from dom_extract import HTML_PARSER, extract_posts, lxml_html
+    # bs4 potrzebny dla dawnej ekstrakcji i dla extract_posts bez lxml
+    if extract is not None or lxml_html is None:
+        try:
+            import bs4  # noqa: F401
+        except ImportError as e:
+            raise Skip(f"brak parsera HTML: {e}")
+    extract = extract or (lambda page: extract_posts(page, platform))
+    params = {"platform": platform, "page_mb": round(len(html.encode("utf-8")) / 1e6, 2), "parser": HTML_PARSER}
+    return (lambda: extract(html)), 1, params
+
+
+def _register_extract(name, platform, page, extract=None, repeat=None):
+    benchmark(name, "extract", repeat=repeat)(lambda quick: _extract(platform, page(quick), extract))
+
+
+_register_extract("extract.facebook", "facebook",
+                  lambda quick: fixtures.synthetic_facebook(200 if quick else 2_000))
+_register_extract("extract.instagram", "instagram",
+                  lambda quick: fixtures.synthetic_instagram(300 if quick else 3_000))
+# Dawne get_text() na każdym divie - punkt odniesienia, wolne na dużych stronach
+_register_extract("extract.facebook_legacy", "facebook",
+                  lambda quick: fixtures.synthetic_facebook(200 if quick else 2_000), legacy_facebook, repeat=2)
+_register_extract("extract.instagram_legacy", "instagram",
+                  lambda quick: fixtures.synthetic_instagram(300 if quick else 3_000), legacy_instagram, repeat=2)
+
+for _platform, _name, _html in fixtures.recorded_pages():
+    if _platform in ("facebook", "instagram"):
+        _register_extract(f"extract.recorded.{os.path.splitext(_name)[0]}", _platform,
+                          lambda quick, html=_html: html)
@@ -0,0 +1,174 @@
+import re
+import json
+import time
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import fixtures
+
+STATUS_RE = re.compile(r"^/x/status/(\d+)$")
+GRAPHQL_RE = re.compile(r"^/i/api/graphql/[^/]+/(SearchTimeline|TweetDetail)$")
+
+
+class FixtureServer:
+    """Lokalny serwer HTTP z nagranymi albo syntetycznymi stronami X, Facebooka i Instagrama.
+
+    Adresy odpowiadają szablonom scraperów po podstawieniu bazy, np.
+    x_scraper.X_SEARCH_URL = server.url("/x/search?q={query}"). Strony X pobierają wyniki
+    z /i/api/graphql/<id>/SearchTimeline i TweetDetail jak x.com, więc działają z ekstrakcją
+    z DOM i z przechwytywaniem sieci. `latency` to opóźnienie odpowiedzi serwera,
+    `scroll_delay_ms` - czas doładowania kolejnej porcji po scrollu. Strona z
+    fixtures/<platforma>-*.html i odpowiedzi z fixtures/x-<operacja>-*.json mają
+    pierwszeństwo przed syntetycznymi.
+    """
+
+    def __init__(self, latency=0.0, tweets=200, comments=40, batch=20, scroll_delay_ms=300,
+                 facebook_posts=400, instagram_posts=600, port=0):
+        self.latency = latency
+        self.tweets = tweets
+        self.comments = comments
+        self.batch = batch
+        self.scroll_delay_ms = scroll_delay_ms
+        self.facebook_posts = facebook_posts
+        self.instagram_posts = instagram_posts
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path):
+        return self.base_url + path
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def page(self, path, query=""):
+        # Treść odpowiedzi dla ścieżki i parametrów zapytania albo None
+        if path == "/x/search":
+            return _x_search(self.batch, self.scroll_delay_ms)
+        match = STATUS_RE.match(path)
+        if match:
+            return _x_status(int(match.group(1)), self.scroll_delay_ms)
+        match = GRAPHQL_RE.match(path)
+        if match:
+            variables = json.loads(parse_qs(query).get("variables", ["{}"])[0])
+            return self.graphql(match.group(1), variables)
+        if path.startswith("/facebook/search"):
+            return _recorded_or("facebook", fixtures.synthetic_facebook, self.facebook_posts)
+        if path.startswith("/instagram/tags/"):
+            return _recorded_or("instagram", fixtures.synthetic_instagram, self.instagram_posts)
+        return None
+
+    def graphql(self, operation, variables):
+        cursor = variables.get("cursor")
+        recorded = _recorded_responses(operation)
+        if recorded:
+            return _recorded_page(recorded, cursor)
+        page = int(cursor or 0)
+        if operation == "SearchTimeline":
+            return _search_timeline(self.tweets, self.batch, page)
+        return _tweet_detail(int(variables["focalTweetId"]), self.comments, self.batch, page)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                url = urlsplit(self.path)
+                body = server.page(url.path, url.query)
+                if body is None:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                if url.path.startswith("/i/api/"):
+                    self.send_header("Content-Type", "application/json; charset=utf-8")
+                else:
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@lru_cache(maxsize=None)
+def _x_search(batch, delay_ms):
+    return fixtures.x_search_page(batch, delay_ms)
+
+
+@lru_cache(maxsize=1024)
+def _x_status(tweet_id, delay_ms):
+    return fixtures.x_status_page(tweet_id, delay_ms)
+
+
+@lru_cache(maxsize=None)
+def _search_results(tweets):
+    return fixtures.x_search_tweets(tweets)
+
+
+@lru_cache(maxsize=1024)
+def _search_timeline(tweets, batch, page):
+    return json.dumps(fixtures.x_search_timeline(_search_results(tweets), page, batch))
+
+
+@lru_cache(maxsize=256)
+def _conversation(tweet_id, comments):
+    return fixtures.x_conversation(tweet_id, comments)
+
+
+@lru_cache(maxsize=1024)
+def _tweet_detail(tweet_id, comments, batch, page):
+    focal, replies = _conversation(tweet_id, comments)
+    return json.dumps(fixtures.x_tweet_detail(focal, replies, page, batch))
+
+
+@lru_cache(maxsize=None)
+def _recorded_responses(operation):
+    # (JSON, kursor następnej strony) dla nagranych odpowiedzi operacji
+    return tuple((json.dumps(payload), fixtures.bottom_cursor(payload))
+                 for payload in fixtures.recorded_responses(operation))
+
+
+def _recorded_page(recorded, cursor):
+    # Kursor z nagranej odpowiedzi wskazuje następny plik; po ostatnim - pusta odpowiedź
+    if cursor is None:
+        return recorded[0][0]
+    for index, (_, bottom) in enumerate(recorded[:-1]):
+        if bottom == cursor:
+            return recorded[index + 1][0]
+    return json.dumps({"data": {}})
+
+
+@lru_cache(maxsize=None)
+def _recorded_or(platform, generate, size):
+    recorded = fixtures.recorded_pages(platform)
+    return recorded[0][2] if recorded else generate(size)
@@ -0,0 +1,171 @@
+import re
+import time
+import random
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+
+import fixtures
+
+TWITTER_TIME_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+WINDOW_RE = re.compile(r"since:(\d{4}-\d{2}-\d{2}) until:(\d{4}-\d{2}-\d{2})")
+
+
+class RateLimitExceeded(Exception):
+    """Odpowiedź 429 z czasem resetu - tak jak TooManyRequests z Twikit/prawcore."""
+
+    status_code = 429
+
+    def __init__(self, reset):
+        super().__init__(f"429 Too Many Requests (reset za {reset - time.time():.1f}s)")
+        self.rate_limit_reset = reset
+
+
+class RateWindow:
+    """Limit serwera: najwyżej `limit` zapytań w stałym oknie `window` sekund (None = bez limitu)."""
+
+    def __init__(self, limit=None, window=60.0):
+        self.limit = limit
+        self.window = window
+        self.requests = 0
+        self.rejected = 0
+        self._window_start = time.time()
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        with self._lock:
+            self.requests += 1
+            now = time.time()
+            if now - self._window_start >= self.window:
+                self._window_start = now
+                self._count = 0
+            if self.limit is not None and self._count >= self.limit:
+                self.rejected += 1
+                raise RateLimitExceeded(self._window_start + self.window)
+            self._count += 1
+
+
+# === PRAW ===
+
+class FakeSubredditName:
+    def __init__(self, display_name):
+        self.display_name = display_name
+
+
+class FakeSubmission:
+    def __init__(self, post_id, subreddit, title, selftext, created_utc):
+        self.id = post_id
+        self.subreddit = subreddit
+        self.title = title
+        self.selftext = selftext
+        self.created_utc = created_utc
+        self.url = f"https://www.reddit.com/r/{subreddit.display_name}/comments/{post_id}/"
+
+
+class FakeSubreddit:
+    def __init__(self, reddit, name):
+        self.reddit = reddit
+        self.name = name
+
+    def _listing(self, limit, salt):
+        # Listing od najnowszych, stronami po page_size; każda strona to jedno zapytanie z opóźnieniem
+        rng = random.Random(f"{self.name}/{salt}")
+        display = FakeSubredditName(self.name)
+        now = self.reddit.now
+        total = min(limit or self.reddit.posts_per_listing, self.reddit.posts_per_listing)
+        for i in range(total):
+            if i % self.reddit.page_size == 0:
+                self.reddit.rate.hit()
+                time.sleep(self.reddit.latency)
+            title = fixtures.post_text(rng, 4, 14)
+            body = fixtures.post_text(rng, 0, 250) if rng.random() < 0.7 else ""
+            yield FakeSubmission(f"{self.name[:3].lower()}{salt}{i:06d}", display, title, body,
+                                 now - i * self.reddit.spacing)
+
+    def search(self, query, sort="new", time_filter="year", limit=100):
+        return self._listing(limit, "s")
+
+    def new(self, limit=100):
+        return self._listing(limit, "n")
+
+
+class FakeReddit:
+    """Klient o interfejsie praw.Reddit używanym przez reddit_scraper (subreddit().search/new).
+
+    Podstawiany za reddit_scraper.get_reddit; zapytania liczone i limitowane przez RateWindow.
+    """
+
+    def __init__(self, latency=0.05, posts_per_listing=250, page_size=100, spacing=3600.0,
+                 rate_limit=None, rate_window=60.0):
+        self.latency = latency
+        self.posts_per_listing = posts_per_listing
+        self.page_size = page_size
+        self.spacing = spacing
+        self.now = time.time()
+        self.rate = RateWindow(rate_limit, rate_window)
+
+    def subreddit(self, name):
+        return FakeSubreddit(self, name)
+
+
+# === Twikit ===
+
+class FakeTweet:
+    def __init__(self, tweet_id, text, created_at):
+        self.id = str(tweet_id)
+        self.text = text
+        self.created_at = created_at
+
+
+class FakeSearchResult(list):
+    def __init__(self, client, query, window, page):
+        self.client = client
+        self.query = query
+        self.window = window
+        self.page = page
+        super().__init__(client.tweets_for(window, page))
+        self.next_cursor = f"{page + 1}" if page + 1 < client.pages_per_window else None
+
+    async def next(self):
+        return await self.client.page(self.query, self.window, self.page + 1)
+
+
+class FakeTwikitClient:
+    """Asynchroniczny klient o interfejsie twikit.Client dla search_windows().
+
+    Każde okno since/until ma pages_per_window stron po `count` tweetów (od najnowszych);
+    każde zapytanie kosztuje `latency` sekund i przechodzi przez limit RateWindow.
+    """
+
+    def __init__(self, latency=0.1, pages_per_window=5, count=20, rate_limit=None, rate_window=60.0):
+        self.latency = latency
+        self.pages_per_window = pages_per_window
+        self.count = count
+        self.rate = RateWindow(rate_limit, rate_window)
+
+    async def login(self, **kwargs):
+        await asyncio.sleep(self.latency)
+
+    async def search_tweet(self, query, product="Latest", count=20):
+        match = WINDOW_RE.search(query)
+        window = match.groups() if match else ("2025-01-01", "2025-02-01")
+        return await self.page(query, window, 0)
+
+    async def page(self, query, window, page):
+        self.rate.hit()
+        await asyncio.sleep(self.latency)
+        return FakeSearchResult(self, query, window, page)
+
+    def tweets_for(self, window, page):
+        rng = random.Random(f"{window}/{page}")
+        until = datetime.fromisoformat(window[1]).replace(tzinfo=timezone.utc)
+        # ID malejące w obrębie okna, unikalne między oknami
+        base = int(until.timestamp()) * 1_000_000
+        tweets = []
+        for i in range(self.count):
+            n = page * self.count + i
+            created = until - timedelta(minutes=n + 1)
+            tweets.append(FakeTweet(base - n, fixtures.post_text(rng, 8, 45),
+                                    created.strftime(TWITTER_TIME_FORMAT)))
+        return tweets
@@ -0,0 +1,308 @@
+import os
+import glob
+import html
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Słownik tekstów syntetycznych: część słów to słowa kluczowe inwestycyjne, reszta to wypełniacz
+KEYWORD_WORDS = ("bitcoin", "kurs", "akcje", "giełda", "inwestycja", "market", "stock", "portfel",
+                 "trading", "crypto", "ethereum", "dividend", "notowania", "price", "broker")
+FILLER_WORDS = ("dzisiaj", "naprawdę", "moim", "zdaniem", "the", "this", "is", "going", "to", "be",
+                "rośnie", "spada", "hossa", "bessa", "zysk", "strata", "analiza", "trend", "long",
+                "short", "tydzień", "wczoraj", "really", "big", "news", "for", "everyone", "kiedy")
+
+
+def sentence(rng, words=20, keyword_ratio=0.15):
+    return " ".join(rng.choice(KEYWORD_WORDS) if rng.random() < keyword_ratio else rng.choice(FILLER_WORDS)
+                    for _ in range(words))
+
+
+def post_text(rng, min_words=8, max_words=60, matching=0.8):
+    # Około `matching` tekstów zawiera słowo kluczowe, reszta to czysty wypełniacz
+    words = rng.randint(min_words, max_words)
+    return sentence(rng, words, keyword_ratio=0.15 if rng.random() < matching else 0.0)
+
+
+def post_texts(count, seed=1, min_words=8, max_words=60, matching=0.8):
+    rng = random.Random(seed)
+    return [post_text(rng, min_words, max_words, matching) for _ in range(count)]
+
+
+def posts(count, platform="X-Twikit", duplicates=0.0, seed=1, start=None):
+    # Wpisy w formacie scraperów; `duplicates` to udział powtórzonych tekstów (crossposty, retweety)
+    rng = random.Random(seed)
+    start = start or datetime(2025, 1, 1, tzinfo=timezone.utc)
+    result = []
+    for i in range(count):
+        if result and rng.random() < duplicates:
+            text = rng.choice(result)["text"]
+        else:
+            text = post_text(rng, 10, 80)
+        result.append({
+            "platform": platform,
+            "text": text,
+            "timestamp": (start + timedelta(seconds=i * 7)).isoformat(),
+            "keywords": [],
+        })
+    return result
+
+
+def synthetic_facebook(posts=400, depth=12, comments=3, seed=1):
+    # Strona wyników jak z Facebooka: głęboko zagnieżdżone divy, treść w data-ad-preview,
+    # komentarze jako zagnieżdżone role=article
+    rng = random.Random(seed)
+    wrap_open = "<div class='x1'>" * depth
+    wrap_close = "</div>" * depth
+    parts = ["<html><body><div id='root'>"]
+    for _ in range(posts):
+        parts.append(wrap_open)
+        parts.append("<div role='article'><div><div><span>Autor</span></div>")
+        parts.append("<div data-ad-preview='message'>")
+        for _ in range(rng.randint(1, 4)):
+            parts.append(f"<div dir='auto'><div><span>{sentence(rng)}</span></div></div>")
+        parts.append("</div>")
+        for _ in range(comments):
+            parts.append(f"<div role='article'><div dir='auto'>{sentence(rng, 8)}</div></div>")
+        parts.append("</div>")
+        parts.append(wrap_close)
+    parts.append("</div></body></html>")
+    return "".join(parts)
+
+
+def synthetic_instagram(posts=600, seed=2):
+    rng = random.Random(seed)
+    parts = ["<html><body><main><article><div>"]
+    for i in range(posts):
+        parts.append(f"<div><a href='/p/{i}/'><div><div><img alt='{sentence(rng, 15)}' src='x.jpg'>"
+                     f"</div></div></a></div>")
+    parts.append("</div></article></main></body></html>")
+    return "".join(parts)
+
+
+# === X: odpowiedzi GraphQL (SearchTimeline, TweetDetail) i strona, która je pobiera jak x.com ===
+
+X_GRAPHQL_PATH = "/i/api/graphql/fixture/{operation}"
+X_TIME_FORMAT = "%a %b %d %H:%M:%S +0000 %Y"
+
+
+def x_tweet(tweet_id, text, created, user, rng, reply_to=None, conversation_id=None):
+    # tweet_results.result w układzie odpowiedzi GraphQL X (pola czytane przez network_capture.parse_tweet)
+    legacy = {
+        "id_str": str(tweet_id),
+        # X zwraca full_text z encjami HTML
+        "full_text": html.escape(text, quote=False),
+        "created_at": created.strftime(X_TIME_FORMAT),
+        "conversation_id_str": str(conversation_id or tweet_id),
+        "lang": "pl",
+        "favorite_count": rng.randrange(500),
+        "retweet_count": rng.randrange(100),
+        "reply_count": rng.randrange(50),
+        "quote_count": rng.randrange(20),
+    }
+    if reply_to is not None:
+        legacy["in_reply_to_status_id_str"] = str(reply_to)
+    return {
+        "__typename": "Tweet",
+        "rest_id": str(tweet_id),
+        "core": {"user_results": {"result": {"__typename": "User", "rest_id": str(rng.randrange(10 ** 9)),
+                                             "legacy": {"screen_name": user, "name": user}}}},
+        "views": {"count": str(rng.randrange(100, 50_000)), "state": "EnabledWithCount"},
+        "legacy": legacy,
+    }
+
+
+def _tweet_item(result):
+    return {"itemType": "TimelineTweet", "__typename": "TimelineTweet", "tweet_results": {"result": result}}
+
+
+def _tweet_entry(result):
+    return {"entryId": f"tweet-{result['rest_id']}", "sortIndex": result["rest_id"],
+            "content": {"entryType": "TimelineTimelineItem", "__typename": "TimelineTimelineItem",
+                        "itemContent": _tweet_item(result)}}
+
+
+def _thread_entry(result):
+    # Odpowiedzi w TweetDetail przychodzą jako moduły conversationthread z listą items
+    entry_id = f"conversationthread-{result['rest_id']}"
+    return {"entryId": entry_id, "sortIndex": result["rest_id"],
+            "content": {"entryType": "TimelineTimelineModule", "__typename": "TimelineTimelineModule",
+                        "displayType": "VerticalConversation",
+                        "items": [{"entryId": f"{entry_id}-tweet-{result['rest_id']}",
+                                   "item": {"itemContent": _tweet_item(result)}}]}}
+
+
+def _cursor_entry(value):
+    return {"entryId": f"cursor-bottom-{value}", "sortIndex": "0",
+            "content": {"entryType": "TimelineTimelineCursor", "__typename": "TimelineTimelineCursor",
+                        "value": value, "cursorType": "Bottom"}}
+
+
+def _instructions(entries):
+    return [{"type": "TimelineClearCache"}, {"type": "TimelineAddEntries", "entries": entries}]
+
+
+def x_search_tweets(tweets=200, seed=3, newest_id=1_900_000_000_000_000_000):
+    # Wyniki "Latest": ID i czasy malejąco
+    rng = random.Random(seed)
+    start = datetime(2025, 6, 1, tzinfo=timezone.utc)
+    return [x_tweet(newest_id - i * 1000, post_text(rng, 8, 45), start - timedelta(minutes=i), f"user{i % 50}", rng)
+            for i in range(tweets)]
+
+
+def x_search_timeline(results, page, batch=20):
+    # Strona `page` odpowiedzi SearchTimeline; kursor kolejnej strony, dopóki są dalsze wyniki
+    entries = [_tweet_entry(result) for result in results[page * batch:(page + 1) * batch]]
+    if (page + 1) * batch < len(results):
+        entries.append(_cursor_entry(str(page + 1)))
+    return {"data": {"search_by_raw_query": {"search_timeline": {"timeline": {
+        "instructions": _instructions(entries)}}}}}
+
+
+def x_conversation(tweet_id, comments=40):
+    rng = random.Random(tweet_id)
+    start = datetime(2025, 6, 1, tzinfo=timezone.utc)
+    focal = x_tweet(tweet_id, post_text(rng, 10, 45), start, "author", rng)
+    replies = [x_tweet(tweet_id + i + 1, post_text(rng, 5, 30), start + timedelta(minutes=i + 1), f"reply{i}", rng,
+                       reply_to=tweet_id, conversation_id=tweet_id)
+               for i in range(comments)]
+    return focal, replies
+
+
+def x_tweet_detail(focal, replies, page, batch=20):
+    # Pierwsza strona: sam tweet i pierwsze odpowiedzi; kolejne strony - dalsze odpowiedzi
+    entries = [_tweet_entry(focal)] if page == 0 else []
+    entries += [_thread_entry(reply) for reply in replies[page * batch:(page + 1) * batch]]
+    if (page + 1) * batch < len(replies):
+        entries.append(_cursor_entry(str(page + 1)))
+    return {"data": {"threaded_conversation_with_injections_v2": {"instructions": _instructions(entries)}}}
+
+
+def bottom_cursor(payload):
+    # Kursor następnej strony z odpowiedzi (także nagranej z x.com) albo None
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if node.get("cursorType") == "Bottom":
+                return node.get("value")
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
+
+
+# Strona jak x.com: artykuły renderuje skrypt z odpowiedzi GraphQL, kolejna strona wyników
+# (z kursorem) po scrollu i `delay` ms. W trybie DOM scraper czyta artykuły, w trybie
+# sieciowym - te same odpowiedzi JSON przez CDP.
+TIMELINE_JS = """
+<script>
+(function () {
+    var endpoint = %(endpoint)s, variables = %(variables)s, delay = %(delay)d;
+    var feed = document.getElementById("feed");
+    var cursor = null, loading = false, finished = false;
+
+    function walk(node, tweets, cursors) {
+        if (Array.isArray(node)) {
+            node.forEach(function (child) { walk(child, tweets, cursors); });
+            return;
+        }
+        if (!node || typeof node !== "object") return;
+        if (node.tweet_results && node.tweet_results.result) {
+            tweets.push(node.tweet_results.result);
+            return;
+        }
+        if (node.cursorType === "Bottom") cursors.push(node.value);
+        Object.keys(node).forEach(function (key) { walk(node[key], tweets, cursors); });
+    }
+
+    function element(tag, attrs, children) {
+        var node = document.createElement(tag);
+        Object.keys(attrs).forEach(function (name) { node.setAttribute(name, attrs[name]); });
+        children.forEach(function (child) {
+            node.appendChild(typeof child === "string" ? document.createTextNode(child) : child);
+        });
+        return node;
+    }
+
+    function render(result) {
+        if (result.tweet) result = result.tweet;
+        var legacy = result.legacy;
+        if (!legacy) return;
+        var user = result.core.user_results.result;
+        var name = (user.core && user.core.screen_name) || user.legacy.screen_name;
+        var decoder = document.createElement("textarea");
+        decoder.innerHTML = legacy.full_text;
+        var created = new Date(legacy.created_at).toISOString();
+        feed.appendChild(element("article", {role: "article", style: "min-height:120px"}, [
+            element("div", {}, [element("a", {href: "/" + name}, ["@" + name])]),
+            element("a", {href: "/" + name + "/status/" + result.rest_id},
+                    [element("time", {datetime: created}, [created.slice(0, 10)])]),
+            element("div", {"data-testid": "tweetText"}, [element("span", {}, [decoder.value])])
+        ]));
+    }
+
+    function load() {
+        if (loading || finished) return;
+        loading = true;
+        var params = Object.assign({}, variables);
+        if (cursor) params.cursor = cursor;
+        setTimeout(function () {
+            fetch(endpoint + "?variables=" + encodeURIComponent(JSON.stringify(params)))
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    var tweets = [], cursors = [];
+                    walk(data, tweets, cursors);
+                    tweets.forEach(render);
+                    cursor = cursors.length ? cursors[cursors.length - 1] : null;
+                    finished = !cursor || !tweets.length;
+                    loading = false;
+                });
+        }, cursor ? delay : 0);
+    }
+
+    window.addEventListener("scroll", function () {
+        if (window.innerHeight + window.scrollY < document.body.scrollHeight - 200) return;
+        load();
+    });
+    load();
+})();
+</script>
+"""
+
+
+def x_timeline_page(operation, variables, delay_ms=300):
+    script = TIMELINE_JS % {"endpoint": json.dumps(X_GRAPHQL_PATH.format(operation=operation)),
+                            "variables": json.dumps(variables), "delay": delay_ms}
+    return "<html><body><main id='feed'></main>" + script + "</body></html>"
+
+
+def x_search_page(batch=20, delay_ms=300):
+    return x_timeline_page("SearchTimeline", {"count": batch, "product": "Latest"}, delay_ms)
+
+
+def x_status_page(tweet_id, delay_ms=300):
+    return x_timeline_page("TweetDetail", {"focalTweetId": str(tweet_id)}, delay_ms)
+
+
+def recorded_responses(operation):
+    # Nagrane odpowiedzi GraphQL z fixtures/x-<operacja>-<nazwa>.json, kolejne strony w kolejności nazw
+    responses = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, f"x-{operation}-*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            responses.append(json.load(f))
+    return responses
+
+
+def recorded_pages(platform=None):
+    # Nagrane strony (driver.page_source) z fixtures/<platforma>-<nazwa>.html
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        name = os.path.basename(path)
+        page_platform = name.split("-", 1)[0]
+        if platform is None or page_platform == platform:
+            with open(path, "r", encoding="utf-8") as f:
+                pages.append((page_platform, name, f.read()))
+    return pages
@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRAPING_DIR = os.path.join(ROOT, "src", "scraping")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+if SCRAPING_DIR not in sys.path:
+    sys.path.insert(0, SCRAPING_DIR)
+
+from metrics import METRICS  # noqa: E402
+
+BENCHMARKS = {}
+
+
+class Skip(Exception):
+    """Benchmark nie może działać w tym środowisku (brak Chrome, pakietu itp.)."""
+
+
+def benchmark(name, group, repeat=None):
+    # Rejestruje funkcję benchmarku: fn(quick) -> (wywołanie mierzone, liczba elementów, parametry).
+    # `repeat` ogranicza liczbę powtórzeń dla wolnych benchmarków (przeglądarka, dawna ekstrakcja).
+    def decorator(function):
+        BENCHMARKS[name] = (group, function, repeat)
+        return function
+    return decorator
+
+
+def measure(function, repeat=5, warmup=1):
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_benchmark(name, quick=False, repeat=5):
+    group, factory, limit = BENCHMARKS[name]
+    call, items, params = factory(quick)
+    if limit is not None:
+        repeat = min(repeat, limit)
+    METRICS.reset()
+    samples = measure(call, repeat=1 if quick else repeat, warmup=0 if quick or limit else 1)
+    median = statistics.median(samples)
+    # Etapy z warstwy metryk - gdzie poszedł czas wewnątrz benchmarku (suma ze wszystkich powtórzeń)
+    stages = {}
+    for stage in METRICS.snapshot()["stages"]:
+        stages[stage["stage"]] = stages.get(stage["stage"], 0.0) + stage["seconds"]
+    return {
+        "group": group,
+        "items": items,
+        "params": params,
+        "repeat": len(samples),
+        "min_s": min(samples),
+        "median_s": median,
+        "mean_s": statistics.fmean(samples),
+        "per_second": items / median if items and median > 0 else None,
+        "stages": {stage: seconds / len(samples) for stage, seconds in sorted(stages.items())},
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def results_document(results):
+    commit, dirty = git_commit()
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+
+def default_output_path(document):
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    commit = document["commit"] or "nocommit"
+    if document["dirty"]:
+        commit += "-dirty"
+    return os.path.join(RESULTS_DIR, f"{stamp}-{commit}.json")
+
+
+def write_results(document, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+
+
+def compare(baseline, current, threshold=0.10):
+    """Porównanie dwóch plików wyników; zwraca listę regresji większych niż `threshold`.
+
+    Dla benchmarków z liczbą elementów porównujemy przepustowość, dla pozostałych medianę czasu.
+    """
+    rows = []
+    regressions = []
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            rows.append((name, None, "nowy"))
+            continue
+        if "skipped" in old or "skipped" in new:
+            rows.append((name, None, "pominięty"))
+            continue
+        if old.get("per_second") and new.get("per_second"):
+            change = new["per_second"] / old["per_second"] - 1.0
+        else:
+            change = old["median_s"] / new["median_s"] - 1.0
+        rows.append((name, change, ""))
+        if change < -threshold:
+            regressions.append(name)
+    return rows, regressions
@@ -0,0 +1,116 @@
+"""Benchmarki offline scraperów: mikrobenchmarki, API z klientami testowymi i Chrome na lokalnym serwerze.
+
+    python benchmarks/run.py                       # wszystko, wynik w benchmarks/results/
+    python benchmarks/run.py --only micro extract  # grupy albo prefiksy nazw
+    python benchmarks/run.py --quick               # małe rozmiary, jedno powtórzenie
+    python benchmarks/run.py --compare benchmarks/results/<bazowy>.json
+    python benchmarks/run.py --compare <bazowy>.json <nowy>.json
+
+Porównanie kończy się kodem 1, gdy któryś benchmark zwolnił bardziej niż --threshold.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+import harness
+# Kolejność importów = kolejność benchmarków: od najszybszych do przeglądarki
+import bench_micro  # noqa: F401
+import bench_apis  # noqa: F401
+import bench_browser  # noqa: F401
+
+
+def selected(names, only):
+    if not only:
+        return names
+    return [name for name in names
+            if any(harness.BENCHMARKS[name][0] == item or name.startswith(item) for item in only)]
+
+
+def run(names, quick, repeat):
+    results = {}
+    for name in names:
+        print(f"⏱️ {name}...", flush=True)
+        try:
+            result = harness.run_benchmark(name, quick=quick, repeat=repeat)
+        except harness.Skip as e:
+            print(f"⏭️ Pomijam {name}: {str(e)}")
+            results[name] = {"group": harness.BENCHMARKS[name][0], "skipped": str(e)}
+            continue
+        results[name] = result
+        throughput = f", {result['per_second']:.1f}/s" if result["per_second"] else ""
+        slowest = max(result["stages"].items(), key=lambda item: item[1], default=None)
+        stage = f", najdłużej: {slowest[0]} {slowest[1] * 1e3:.1f} ms" if slowest else ""
+        print(f"   mediana {result['median_s'] * 1e3:.1f} ms{throughput}{stage}")
+    return results
+
+
+def print_comparison(baseline, current, threshold):
+    rows, regressions = harness.compare(baseline, current, threshold)
+    print(f"\n📊 {baseline.get('commit')} -> {current.get('commit')}")
+    for name, change, note in rows:
+        if change is None:
+            print(f"   {name:40} {note}")
+            continue
+        marker = "⚠️" if name in regressions else "  "
+        print(f" {marker} {name:40} {change * 100:+7.1f}%")
+    if regressions:
+        print(f"⚠️ Regresje powyżej {threshold * 100:.0f}%: {', '.join(regressions)}")
+    return regressions
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarki offline scraperów")
+    parser.add_argument("--only", nargs="+", help="grupy (micro, extract, api, browser) albo prefiksy nazw")
+    parser.add_argument("--quick", action="store_true", help="małe rozmiary i jedno powtórzenie")
+    parser.add_argument("--repeat", type=int, default=5, help="liczba powtórzeń (domyślnie 5)")
+    parser.add_argument("--output", help="plik wyników JSON (domyślnie benchmarks/results/<czas>-<commit>.json)")
+    parser.add_argument("--compare", nargs="+", metavar="PLIK", help="plik bazowy [i plik do porównania]")
+    parser.add_argument("--threshold", type=float, default=0.10, help="próg regresji (domyślnie 0.10)")
+    parser.add_argument("--list", action="store_true", help="wypisz dostępne benchmarki")
+    args = parser.parse_args()
+
+    names = selected(list(harness.BENCHMARKS), args.only)
+    if args.list:
+        for name in names:
+            print(f"{harness.BENCHMARKS[name][0]:8} {name}")
+        return 0
+
+    if args.compare and len(args.compare) == 2:
+        regressions = print_comparison(load(args.compare[0]), load(args.compare[1]), args.threshold)
+        return 1 if regressions else 0
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = load(args.compare[0]) if args.compare else None
+    # Wszystkie zapisy (data/, stan crawla, indeksy) w katalogu tymczasowym, żeby nie ruszać danych
+    with tempfile.TemporaryDirectory(prefix="market-bench-") as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            results = run(names, args.quick, args.repeat)
+        finally:
+            # Zrzut buforów zapisu, póki ścieżki względne wskazują jeszcze katalog tymczasowy
+            from storage import get_storage
+            get_storage().close()
+            os.chdir(cwd)
+
+    document = harness.results_document(results)
+    if args.quick:
+        document["quick"] = True
+    output = output or harness.default_output_path(document)
+    harness.write_results(document, output)
+    print(f"\n💾 Wyniki zapisane: {output}")
+
+    if baseline is not None:
+        return 1 if print_comparison(baseline, document, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
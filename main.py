@@ -0,0 +1,9 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "scraping"))
+
+from scheduler import main  # noqa: E402
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+from metrics import METRICS
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class _Browser:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.healthy = True
+
+
+class BrowserPool:
+    """Pula ciepłych sesji przeglądarki współdzielona przez scrapery.
+
+    factory() tworzy gotowy driver (np. z zalogowaniem). Sesja przed wydaniem
+    przechodzi health check, a po max_pages stronach lub przekroczeniu
+    max_rss_mb pamięci przeglądarki jest zamykana i zastępowana nową.
+    """
+
+    def __init__(self, factory, size=1, max_pages=50, max_rss_mb=1500, max_retries=3):
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.max_retries = max_retries
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._all = set()
+
+    def mark_pages(self, driver, count=1):
+        # Dla długich sesji: strony liczone w trakcie, recykling nastąpi przy zwrocie do puli
+        with self._lock:
+            for browser in self._all:
+                if browser.driver is driver:
+                    browser.pages += count
+                    return
+
+    @contextmanager
+    def session(self, pages=1):
+        self._slots.acquire()
+        browser = None
+        try:
+            browser = self._checkout()
+            yield browser.driver
+        except Exception:
+            if browser is not None:
+                browser.healthy = self._is_healthy(browser)
+            raise
+        finally:
+            if browser is not None:
+                browser.pages += pages
+                self._checkin(browser)
+            self._slots.release()
+
+    def close(self):
+        # Zamyka wszystkie sesje; pulę można potem dalej używać - nowe sesje powstaną na żądanie
+        with self._lock:
+            browsers = list(self._all)
+            self._all.clear()
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for browser in browsers:
+            self._quit(browser)
+
+    def warm_up(self, count=None):
+        # Uruchamia sesje z góry, żeby pierwsza strona nie płaciła za start przeglądarki
+        for _ in range(min(count or self.size, self.size) - self._idle.qsize()):
+            self._idle.put(self._create())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _checkout(self):
+        while True:
+            try:
+                browser = self._idle.get_nowait()
+            except queue.Empty:
+                return self._create()
+            if self._is_healthy(browser):
+                return browser
+            print("♻️ Sesja przeglądarki nie odpowiada, tworzę nową")
+            self._discard(browser)
+
+    def _checkin(self, browser):
+        if not browser.healthy:
+            self._discard(browser)
+        elif browser.pages >= self.max_pages:
+            print(f"♻️ Recykling przeglądarki po {browser.pages} stronach")
+            self._discard(browser)
+        else:
+            rss = self._rss_mb(browser)
+            METRICS.set("browser_rss_bytes", int(rss * 1024 * 1024))
+            if rss > self.max_rss_mb:
+                print(f"♻️ Recykling przeglądarki - pamięć przekroczyła {self.max_rss_mb} MB")
+                self._discard(browser)
+            else:
+                self._idle.put(browser)
+
+    def _create(self):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                with METRICS.timer("browser_startup"):
+                    browser = _Browser(self.factory())
+                METRICS.inc("browser_starts")
+                with self._lock:
+                    self._all.add(browser)
+                print(f"🌐 Uruchomiono przeglądarkę (próba {attempt}/{self.max_retries})")
+                return browser
+            except Exception as e:
+                print(f"⚠️ Błąd podczas uruchamiania przeglądarki (próba {attempt}/{self.max_retries}): {str(e)}")
+                if attempt == self.max_retries:
+                    raise
+
+    def _discard(self, browser):
+        with self._lock:
+            self._all.discard(browser)
+        self._quit(browser)
+
+    @staticmethod
+    def _quit(browser):
+        try:
+            browser.driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_healthy(browser):
+        try:
+            return browser.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    @staticmethod
+    def _rss_mb(browser):
+        # Bez psutil nie mierzymy pamięci - zostaje recykling po liczbie stron
+        if psutil is None:
+            return 0
+        try:
+            process = psutil.Process(browser.driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except Exception:
+            return 0
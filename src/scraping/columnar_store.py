@@ -0,0 +1,356 @@
+import os
+import re
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from dedup_index import DEDUP_INDEX, index_path, text_hash
+from metrics import METRICS, timed
+from offset_index import index_path as offset_index_path
+from partition_writer import exclusive_partition, partition_path
+from score_index import index_path as score_index_path, read_scores
+from storage import count_saved, mark_near_duplicates, parse_timestamp
+
+COMPRESSION = "zstd"
+COMPRESSION_LEVEL = 9
+ROW_GROUP_SIZE = 64 * 1024
+
+# Kolumny tekstowe wspólne dla platform; pozostałe pola wpisu trafiają do "extra" jako JSON
+STRING_FIELDS = ("title", "url", "tweet_url", "tweet_id", "parent_tweet", "cluster")
+KNOWN_FIELDS = {"platform", "text", "timestamp", "keywords", "subreddit", "sentiment", *STRING_FIELDS}
+
+if pa is not None:
+    SCHEMA = pa.schema([
+        ("platform", pa.dictionary(pa.int32(), pa.string())),
+        ("text", pa.string()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("keywords", pa.list_(pa.string())),
+        ("subreddit", pa.dictionary(pa.int32(), pa.string())),
+        *[(name, pa.string()) for name in STRING_FIELDS],
+        ("extra", pa.string()),
+        # Ocena z sentiment.py; null, dopóki wpis nie został oceniony
+        ("sentiment", pa.float32()),
+    ])
+else:
+    SCHEMA = None
+
+PART_RE = re.compile(r"^(\d{2})\.part-[\w-]+\.parquet$")
+DAY_RE = re.compile(r"^(\d{2})\.(txt|parquet)$")
+
+
+def records_to_table(records):
+    columns = {name: [] for name in SCHEMA.names}
+    for record in records:
+        extra = {key: value for key, value in record.items() if key not in KNOWN_FIELDS}
+        timestamp = parse_timestamp(record.get("timestamp"))
+        if timestamp is None and record.get("timestamp") is not None:
+            # Nieczytelny czas zostaje w oryginale, żeby konwersja była bezstratna
+            extra["timestamp"] = record["timestamp"]
+
+        columns["platform"].append(record.get("platform"))
+        columns["text"].append(record.get("text"))
+        columns["timestamp"].append(timestamp)
+        keywords = record.get("keywords")
+        columns["keywords"].append(list(keywords) if keywords is not None else None)
+        for name in ("subreddit", *STRING_FIELDS):
+            value = record.get(name)
+            columns[name].append(None if value is None else str(value))
+        columns["extra"].append(json.dumps(extra, ensure_ascii=False) if extra else None)
+        columns["sentiment"].append(record.get("sentiment"))
+    return pa.Table.from_pydict(columns, schema=SCHEMA)
+
+
+def table_to_records(table):
+    # Odwrotność records_to_table: wpisy w postaci, w jakiej zapisują je scrapery
+    records = []
+    for row in table.to_pylist():
+        record = {"platform": row["platform"], "text": row["text"]}
+        if row["timestamp"] is not None:
+            record["timestamp"] = row["timestamp"].isoformat()
+        for name in ("subreddit", *STRING_FIELDS):
+            if row[name] is not None:
+                record[name] = row[name]
+        if row["keywords"] is not None:
+            record["keywords"] = row["keywords"]
+        if row["extra"]:
+            record.update(json.loads(row["extra"]))
+        if row["sentiment"] is not None:
+            record["sentiment"] = row["sentiment"]
+        records.append(record)
+    return records
+
+
+def read_table(path, columns=None):
+    table = pq.read_table(path, columns=columns)
+    if columns is not None:
+        return table
+    # Pliki z różnych wersji zapisu sprowadzamy do jednego schematu; brakujące kolumny to null
+    for field in SCHEMA:
+        if field.name not in table.column_names:
+            table = table.append_column(field, pa.nulls(table.num_rows, field.type))
+    return table.select(SCHEMA.names).cast(SCHEMA)
+
+
+def write_table(table, path):
+    # Zapis do pliku tymczasowego i podmiana - czytelnik nigdy nie zobaczy połowy pliku
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with METRICS.timer("file_write"):
+        pq.write_table(table, tmp_path, compression=COMPRESSION, compression_level=COMPRESSION_LEVEL,
+                       row_group_size=ROW_GROUP_SIZE)
+        os.replace(tmp_path, path)
+    METRICS.inc("bytes_written", os.path.getsize(path))
+
+
+def partition_base(topic, date, root="data"):
+    # data/<temat>/YYYY/MM/DD - wspólny przedrostek DD.txt, DD.parquet i DD.part-*.parquet
+    return partition_path(topic, date, root, extension="")
+
+
+def part_files(base):
+    directory, day = os.path.split(base)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if PART_RE.match(name) and name.startswith(day + ".")
+    )
+
+
+def partition_files(base):
+    # Pliki Parquet jednego dnia: skompaktowany DD.parquet i dopisane później części
+    compacted = base + ".parquet"
+    files = [compacted] if os.path.exists(compacted) else []
+    return files + part_files(base)
+
+
+def known_text_hashes(base):
+    # Hashe tekstów ze wszystkich plików Parquet dnia; wystarczy kolumna "text" - Parquet czyta tylko ją
+    known = set()
+    for path in partition_files(base):
+        for text in read_table(path, columns=["text"]).column("text").to_pylist():
+            if text is not None:
+                known.add(text_hash(text))
+    return known
+
+
+class ParquetStorage:
+    """Kolumnowy zapis partycji w Parquet (zstd), obok dotychczasowych plików DD.txt.
+
+    Wpisy są buforowane w pamięci i przy flush() każda partycja trafia do nowego pliku
+    DD.part-<czas>-<pid>.parquet, bo Parquetu nie da się dopisywać. compact_all()
+    scala części i stare DD.txt w jeden posortowany po czasie DD.parquet. Deduplikacja
+    po hashu tekstu obejmuje wszystkie pliki Parquet dnia i ewentualny stary DD.txt.
+    """
+
+    name = "parquet"
+    extension = ".parquet"
+
+    def __init__(self, root="data", max_buffered_rows=5000, near_duplicates=None, max_known_partitions=64):
+        if pa is None:
+            raise ImportError("Backend 'parquet' wymaga pakietu pyarrow (pip install pyarrow)")
+        self.root = root
+        self.near_duplicates = near_duplicates
+        self.max_buffered_rows = max_buffered_rows
+        self.max_known_partitions = max_known_partitions
+        self._buffers = {}
+        # base -> hashe tekstów dnia (LRU); dni z niezrzuconym buforem zostają, bo ich hashy nie ma na dysku
+        self._hashes = OrderedDict()
+        self._lock = threading.RLock()
+
+    def path(self, topic, date):
+        return partition_base(topic, date, self.root) + self.extension
+
+    def append(self, topic, date, posts, dedup=True):
+        base = os.path.normpath(partition_base(topic, date, self.root))
+        posts = mark_near_duplicates(self.near_duplicates, posts)
+        with self._lock:
+            if dedup:
+                posts = self._filter_new(base, posts)
+            if not posts:
+                return posts
+            buffer = self._buffers.setdefault(base, [])
+            buffer.extend(posts)
+            if len(buffer) >= self.max_buffered_rows:
+                self._flush_partition(base)
+        count_saved(topic, posts)
+        return posts
+
+    @timed("dedup")
+    def _filter_new(self, base, posts):
+        legacy = base + ".txt"
+        if os.path.exists(legacy):
+            posts = DEDUP_INDEX.unique(legacy, posts)
+        known = self._known_hashes(base)
+        unique = []
+        for post in posts:
+            h = text_hash(post["text"])
+            if h in known:
+                continue
+            known.add(h)
+            unique.append(post)
+        return unique
+
+    def _known_hashes(self, base):
+        known = self._hashes.get(base)
+        if known is not None:
+            self._hashes.move_to_end(base)
+            return known
+        for old in list(self._hashes):
+            if len(self._hashes) < self.max_known_partitions:
+                break
+            if old not in self._buffers:
+                del self._hashes[old]
+        known = self._hashes[base] = known_text_hashes(base)
+        return known
+
+    def flush(self):
+        with self._lock:
+            for base in list(self._buffers):
+                self._flush_partition(base)
+        if self.near_duplicates is not None:
+            self.near_duplicates.flush()
+
+    def close(self):
+        self.flush()
+
+    def _flush_partition(self, base):
+        records = self._buffers.pop(base, [])
+        if not records:
+            return
+        path = f"{base}.part-{time.time_ns()}-{os.getpid()}.parquet"
+        write_table(records_to_table(records), path)
+
+
+def compact_partition(base, keep_jsonl=False):
+    # Scala DD.parquet, części DD.part-*.parquet i stary DD.txt w jeden DD.parquet. DD.txt czytamy
+    # i usuwamy z wyłącznym dostępem - inaczej linie dopisane w międzyczasie by przepadły
+    with exclusive_partition(base + ".txt") as owned:
+        if not owned:
+            print(f"⏭️ {base}.txt jest właśnie zapisywany przez inny proces - pomijam")
+            return None
+        return _compact_partition(base, keep_jsonl)
+
+
+def _compact_partition(base, keep_jsonl):
+    target = base + ".parquet"
+    legacy = base + ".txt"
+    parquet_sources = partition_files(base)
+    parts = [path for path in parquet_sources if path != target]
+    has_legacy = os.path.exists(legacy)
+    if not parts and not has_legacy:
+        return None
+
+    before = sum(os.path.getsize(path) for path in parquet_sources)
+    tables = [read_table(path) for path in parquet_sources]
+    if has_legacy:
+        before += os.path.getsize(legacy)
+        # Oceny sentymentu z DD.sent przechodzą do kolumny "sentiment"
+        scores = read_scores(legacy)
+        records = []
+        position = 0
+        with open(legacy, "rb") as f:
+            for line in f:
+                offset = position
+                position += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                score = scores.get(offset)
+                if score is not None:
+                    record["sentiment"] = score
+                records.append(record)
+        tables.append(records_to_table(records))
+
+    table = pa.concat_tables(tables)
+    # Przerwana wcześniej kompaktacja mogła zostawić te same wiersze w DD.parquet i w źródłach
+    seen = set()
+    keep = []
+    for platform, timestamp, text in zip(table.column("platform").to_pylist(),
+                                         table.column("timestamp").to_pylist(),
+                                         table.column("text").to_pylist()):
+        key = (platform, timestamp, text_hash(text or ""))
+        keep.append(key not in seen)
+        seen.add(key)
+    table = table.filter(pa.array(keep)).sort_by("timestamp").unify_dictionaries()
+
+    write_table(table, target)
+    for path in parts:
+        os.remove(path)
+    if has_legacy and not keep_jsonl:
+        # Indeks w pamięci opisywał usuwany DD.txt - deduplikację dnia przejmują hashe z DD.parquet
+        DEDUP_INDEX.forget(legacy)
+        os.remove(legacy)
+        for sidecar in (index_path(legacy), offset_index_path(legacy), score_index_path(legacy)):
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
+    return before, os.path.getsize(target)
+
+
+def iter_partition_bases(root="data"):
+    # (data/<temat>/YYYY/MM/DD, data dnia) dla każdego dnia z plikami JSONL lub Parquet
+    for dirpath, _, filenames in os.walk(root):
+        days = set()
+        for name in filenames:
+            match = DAY_RE.match(name) or PART_RE.match(name)
+            if match:
+                days.add(match.group(1))
+        if not days:
+            continue
+        month_dir, month = os.path.split(dirpath)
+        year = os.path.basename(month_dir)
+        for day in sorted(days):
+            try:
+                day_date = datetime(int(year), int(month), int(day), tzinfo=timezone.utc)
+            except ValueError:
+                continue
+            yield os.path.join(dirpath, day), day_date
+
+
+def compact_all(root="data", keep_jsonl=False, include_today=False):
+    # Dzisiejsze partycje na pewno są jeszcze dopisywane, więc domyślnie je pomijamy. Starsze dni też
+    # bywają dopisywane (partycja według czasu utworzenia wpisu) - te chroni exclusive_partition
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    partitions = 0
+    before = after = 0
+    for base, day_date in iter_partition_bases(root):
+        if not include_today and day_date >= today:
+            continue
+        result = compact_partition(base, keep_jsonl)
+        if result is None:
+            continue
+        partitions += 1
+        before += result[0]
+        after += result[1]
+    return partitions, before, after
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kompaktacja partycji JSONL/Parquet do DD.parquet (zstd)")
+    parser.add_argument("--root", default="data", help="katalog z danymi (domyślnie data)")
+    parser.add_argument("--keep-jsonl", action="store_true", help="nie usuwaj przekonwertowanych plików DD.txt")
+    parser.add_argument("--include-today", action="store_true", help="kompaktuj także dzisiejsze partycje")
+    args = parser.parse_args()
+
+    if pa is None:
+        raise SystemExit("❌ Kompaktacja wymaga pakietu pyarrow (pip install pyarrow)")
+    partitions, before, after = compact_all(args.root, args.keep_jsonl, args.include_today)
+    ratio = before / after if after else 0
+    print(f"🗜️ Skompaktowano {partitions} partycji: {before / 1e6:.1f} MB → {after / 1e6:.1f} MB ({ratio:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import time
+import queue
+import threading
+import contextvars
+
+
+class CommentHarvester:
+    """Etap producent/konsument dla komentarzy pod tweetami.
+
+    Wyszukiwanie dorzuca adresy statusów przez submit(), a `workers` wątków
+    pobiera je, każdy na własnej sesji z BrowserPool. Kolejka pamięta już
+    zgłoszone adresy, a nieudane pobrania wracają do kolejki z back-offem
+    liczonym osobno dla każdego wątku.
+    """
+
+    def __init__(self, pool, fetch, workers=2, max_attempts=3, base_backoff=2.0, max_backoff=60.0,
+                 on_comments=None, is_known=None):
+        self.pool = pool
+        self.fetch = fetch
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.on_comments = on_comments
+        self.is_known = is_known
+        # Adresy, których komentarze pobrano bez błędu (do zapisania w stanie crawla)
+        self.harvested = []
+
+        self._queue = queue.Queue()
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._results = []
+        self._threads = []
+        self._stopped = threading.Event()
+
+    def start(self):
+        # Każdy wątek dostaje kopię kontekstu wywołującego, więc metryki mają etykiety tematu
+        for n in range(self.workers):
+            context = contextvars.copy_context()
+            thread = threading.Thread(target=context.run, args=(self._work, n + 1), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, tweet_url, parent_text):
+        with self._lock:
+            if tweet_url in self._seen:
+                return False
+            self._seen.add(tweet_url)
+        if self.is_known is not None and self.is_known(tweet_url):
+            return False
+        self._queue.put((tweet_url, parent_text, 1))
+        return True
+
+    def join(self):
+        # Czeka na opróżnienie kolejki i zwraca wszystkie zebrane komentarze
+        self._queue.join()
+        self._shutdown()
+        with self._lock:
+            results, self._results = self._results, []
+        return results
+
+    def stop(self):
+        self._stopped.set()
+        self._shutdown()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.stop()
+        else:
+            self._shutdown()
+        return False
+
+    def _shutdown(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _work(self, worker_id):
+        failures = 0
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._stopped.is_set():
+                    continue
+
+                tweet_url, parent_text, attempt = item
+                if failures:
+                    time.sleep(min(self.max_backoff, self.base_backoff * 2 ** (failures - 1)))
+                try:
+                    with self.pool.session() as driver:
+                        comments = self.fetch(driver, tweet_url, parent_text)
+                except Exception as e:
+                    failures += 1
+                    print(f"⚠️ Worker {worker_id}: błąd komentarzy dla {tweet_url} "
+                          f"(próba {attempt}/{self.max_attempts}): {str(e)}")
+                    if attempt < self.max_attempts:
+                        self._queue.put((tweet_url, parent_text, attempt + 1))
+                    continue
+
+                failures = 0
+                if self.on_comments is not None:
+                    self.on_comments(comments)
+                with self._lock:
+                    if self.on_comments is None:
+                        self._results.extend(comments)
+                    self.harvested.append(tweet_url)
+            finally:
+                self._queue.task_done()
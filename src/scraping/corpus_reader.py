@@ -0,0 +1,294 @@
+import os
+import json
+import mmap
+from datetime import date, datetime, timezone
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import pyarrow.dataset as ds
+except ImportError:
+    ds = None
+
+from columnar_store import DAY_RE, PART_RE, SCHEMA, pa, partition_files, table_to_records
+from offset_index import OFFSET_INDEX
+from score_index import read_scores
+from storage import parse_timestamp
+
+DAY_MICROS = 86400 * 1_000_000
+BATCH_SIZE = 10_000
+BATCH_COLUMNS = ("topic", "platform", "timestamp", "text", "keywords", "sentiment")
+
+# np.datetime64("NaT") zapisany jako int64 - brak czasu w kolumnie timestamp
+NAT = -2 ** 63
+
+SCHEMA_COLUMNS = set(SCHEMA.names) if SCHEMA is not None else set()
+
+
+def to_micros(value):
+    # Granica zakresu: datetime, date (północ UTC), tekst ISO albo sekundy epoki
+    if value is None:
+        return None
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+    micros = parse_timestamp(value)
+    if micros is None:
+        raise ValueError(f"Nieczytelna granica zakresu czasu: {value!r}")
+    return micros
+
+
+def _day_micros(year, month=1, day=1):
+    return parse_timestamp(datetime(year, month, day, tzinfo=timezone.utc))
+
+
+def _overlaps(first, last, start, end):
+    # Czy [first, last) nachodzi na [start, end); brak granicy oznacza przedział otwarty
+    return (end is None or first < end) and (start is None or last > start)
+
+
+def _numbered_dirs(path):
+    return sorted(int(name) for name in os.listdir(path)
+                  if name.isdigit() and os.path.isdir(os.path.join(path, name)))
+
+
+def iter_partitions(topics=None, start=None, end=None, root="data"):
+    """Zwraca (temat, dzień, data/<temat>/YYYY/MM/DD) dla dni nachodzących na [start, end).
+
+    Lata i miesiące spoza zakresu odrzucamy po samych nazwach katalogów, więc zapytanie
+    o tydzień nie listuje reszty korpusu. start i end to mikrosekundy UTC albo None.
+    """
+    if not os.path.isdir(root):
+        return
+    if topics is None:
+        topic_dirs = sorted(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+    else:
+        topic_dirs = [topic.replace(" ", "_") for topic in topics]
+
+    for topic in topic_dirs:
+        topic_dir = os.path.join(root, topic)
+        if not os.path.isdir(topic_dir):
+            continue
+        for year in _numbered_dirs(topic_dir):
+            if not _overlaps(_day_micros(year), _day_micros(year + 1), start, end):
+                continue
+            year_dir = os.path.join(topic_dir, str(year))
+            for month in _numbered_dirs(year_dir):
+                month_end = _day_micros(year + 1) if month == 12 else _day_micros(year, month + 1)
+                if not _overlaps(_day_micros(year, month), month_end, start, end):
+                    continue
+                month_dir = os.path.join(year_dir, f"{month:02d}")
+                days = set()
+                for name in os.listdir(month_dir):
+                    match = DAY_RE.match(name) or PART_RE.match(name)
+                    if match:
+                        days.add(int(match.group(1)))
+                for day in sorted(days):
+                    try:
+                        day_start = _day_micros(year, month, day)
+                    except ValueError:
+                        continue
+                    if _overlaps(day_start, day_start + DAY_MICROS, start, end):
+                        yield topic, date(year, month, day), os.path.join(month_dir, f"{day:02d}")
+
+
+def _iter_jsonl(path, start=None, end=None):
+    # mmap zamiast wczytywania pliku; przy zakresie czasu czytamy tylko linie wskazane przez DD.tsi.
+    # Ocena z DD.sent (sentiment.py) dołączana jest jako pole "sentiment".
+    if os.path.getsize(path) == 0:
+        return
+    scores = read_scores(path)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if start is None and end is None:
+            offsets = None
+            position = 0
+        else:
+            offsets = iter(OFFSET_INDEX.offsets(path, start, end))
+        while True:
+            if offsets is not None:
+                position = next(offsets, None)
+                if position is None:
+                    return
+            newline = mm.find(b"\n", position)
+            if newline < 0:
+                # Niedokończona linia na końcu pliku - writer jeszcze ją dopisuje
+                return
+            line = mm[position:newline]
+            offset, position = position, newline + 1
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            score = scores.get(offset)
+            if score is not None:
+                record["sentiment"] = score
+            yield record
+
+
+def _scan_parquet(path, start=None, end=None, platforms=None, columns=None, batch_size=BATCH_SIZE):
+    # Filtr czasu trafia do skanera - pliki są posortowane po czasie, więc statystyki grup wierszy
+    # pozwalają pominąć większość pliku bez dekompresji
+    conditions = []
+    timestamp_type = SCHEMA.field("timestamp").type
+    if start is not None:
+        conditions.append(ds.field("timestamp") >= pa.scalar(start, timestamp_type))
+    if end is not None:
+        conditions.append(ds.field("timestamp") < pa.scalar(end, timestamp_type))
+    if platforms:
+        conditions.append(ds.field("platform").isin(sorted(platforms)))
+    condition = None
+    for part in conditions:
+        condition = part if condition is None else condition & part
+    dataset = ds.dataset(path, format="parquet", schema=SCHEMA)
+    return dataset.to_batches(columns=columns, filter=condition, batch_size=batch_size)
+
+
+def _parquet_sources(base):
+    files = partition_files(base)
+    if files and ds is None:
+        raise ImportError("Partycje Parquet wymagają pakietu pyarrow (pip install pyarrow)")
+    return files
+
+
+def _prepare(start, end, platforms):
+    return to_micros(start), to_micros(end), set(platforms) if platforms else None
+
+
+def iter_records(topics=None, start=None, end=None, platforms=None, root="data"):
+    """Strumień wpisów (słowników) z korpusu dla tematów, platform i zakresu czasu [start, end).
+
+    Czyta po jednej partycji, więc pamięć nie zależy od rozmiaru korpusu. Każdy wpis dostaje
+    pole "topic". Przy zakresie czasu wpisy bez czytelnego czasu są pomijane.
+    """
+    start, end, platforms = _prepare(start, end, platforms)
+    for topic, _, base in iter_partitions(topics, start, end, root):
+        legacy = base + ".txt"
+        if os.path.exists(legacy):
+            for record in _iter_jsonl(legacy, start, end):
+                if platforms is not None and record.get("platform") not in platforms:
+                    continue
+                record["topic"] = topic
+                yield record
+        for path in _parquet_sources(base):
+            for batch in _scan_parquet(path, start, end, platforms):
+                for record in table_to_records(batch):
+                    record["topic"] = topic
+                    yield record
+
+
+def _object_array(values):
+    # Element po elemencie, żeby listy słów kluczowych nie zamieniły się w tablicę 2D
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+
+def _records_piece(records, columns):
+    piece = {}
+    for column in columns:
+        if column == "timestamp":
+            values = [parse_timestamp(record.get("timestamp")) for record in records]
+            piece[column] = np.array([NAT if value is None else value for value in values], dtype=np.int64)
+        elif column == "sentiment":
+            values = [record.get("sentiment") for record in records]
+            piece[column] = np.array([np.nan if value is None else value for value in values], dtype=np.float32)
+        else:
+            piece[column] = _object_array([record.get(column) for record in records])
+    return piece
+
+
+def _arrow_piece(batch, topic, columns):
+    piece = {}
+    extra = None
+    for column in columns:
+        if column == "topic":
+            piece[column] = np.full(batch.num_rows, topic, dtype=object)
+        elif column == "timestamp":
+            timestamps = batch.column("timestamp").cast(pa.int64()).fill_null(NAT)
+            piece[column] = timestamps.to_numpy()
+        elif column == "sentiment":
+            piece[column] = batch.column("sentiment").to_numpy(zero_copy_only=False).astype(np.float32)
+        elif column in SCHEMA_COLUMNS:
+            piece[column] = _object_array(batch.column(column).to_pylist())
+        else:
+            # Pola spoza schematu leżą w kolumnie "extra" jako JSON
+            if extra is None:
+                extra = [json.loads(value) if value else {} for value in batch.column("extra").to_pylist()]
+            piece[column] = _object_array([fields.get(column) for fields in extra])
+    return piece
+
+
+def _iter_pieces(topics, start, end, platforms, root, columns, batch_size):
+    for topic, _, base in iter_partitions(topics, start, end, root):
+        legacy = base + ".txt"
+        if os.path.exists(legacy):
+            records = []
+            for record in _iter_jsonl(legacy, start, end):
+                if platforms is not None and record.get("platform") not in platforms:
+                    continue
+                record["topic"] = topic
+                records.append(record)
+                if len(records) >= batch_size:
+                    yield _records_piece(records, columns)
+                    records = []
+            if records:
+                yield _records_piece(records, columns)
+
+        scan_columns = [column for column in columns if column in SCHEMA_COLUMNS]
+        if any(column != "topic" and column not in SCHEMA_COLUMNS for column in columns):
+            scan_columns.append("extra")
+        for path in _parquet_sources(base):
+            for batch in _scan_parquet(path, start, end, platforms, scan_columns, batch_size):
+                if batch.num_rows:
+                    yield _arrow_piece(batch, topic, columns)
+
+
+def _to_output(piece, output):
+    columns = dict(piece)
+    if "timestamp" in columns:
+        columns["timestamp"] = columns["timestamp"].view("datetime64[us]")
+    if output == "numpy":
+        return columns
+    frame = pd.DataFrame(columns)
+    if "timestamp" in frame:
+        frame["timestamp"] = frame["timestamp"].dt.tz_localize("UTC")
+    return frame
+
+
+def iter_batches(topics=None, start=None, end=None, platforms=None, root="data",
+                 batch_size=BATCH_SIZE, columns=BATCH_COLUMNS, output="pandas"):
+    """Jak iter_records, ale w paczkach po batch_size wierszy (ostatnia może być krótsza).
+
+    output="pandas" daje DataFrame, output="numpy" słownik kolumna -> tablica. Kolumna
+    timestamp ma typ datetime64[us] (UTC), a brak czasu to NaT; sentiment to float32 z NaN
+    dla wpisów jeszcze nieocenionych. Partycje Parquet są konwertowane kolumnami,
+    bez przechodzenia przez słowniki Pythona.
+    """
+    if np is None or (output == "pandas" and pd is None):
+        raise ImportError("iter_batches wymaga pakietu numpy (oraz pandas dla output='pandas')")
+    if output not in ("pandas", "numpy"):
+        raise ValueError(f"Nieznany format paczek: {output} (dostępne: pandas, numpy)")
+    columns = list(columns)
+    start, end, platforms = _prepare(start, end, platforms)
+
+    pending = []
+    pending_rows = 0
+    for piece in _iter_pieces(topics, start, end, platforms, root, columns, batch_size):
+        pending.append(piece)
+        pending_rows += len(piece[columns[0]])
+        while pending_rows >= batch_size:
+            merged = {column: np.concatenate([part[column] for part in pending]) for column in columns}
+            yield _to_output({column: values[:batch_size] for column, values in merged.items()}, output)
+            pending_rows -= batch_size
+            pending = [{column: values[batch_size:] for column, values in merged.items()}] if pending_rows else []
+    if pending_rows:
+        merged = {column: np.concatenate([part[column] for part in pending]) for column in columns}
+        yield _to_output(merged, output)
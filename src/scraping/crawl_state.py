@@ -0,0 +1,143 @@
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+CRAWL_STATE_PATH = os.path.join("data", "crawl_state.sqlite")
+
+# Margines na opóźnione indeksowanie wyszukiwarki X, zanim uznamy okno za zamknięte
+WINDOW_GRACE_PERIOD = 24 * 3600
+
+
+def window_scope(since, until):
+    return f"{since}/{until}"
+
+
+class CrawlState:
+    """Stan crawla w SQLite: high-water mark per (temat, źródło, zakres) i zbiór pobranych ID.
+
+    Zakres to subreddit dla Reddita albo okno dat dla X. Dzięki temu kolejne przebiegi
+    kończą stronicowanie na pierwszym znanym elemencie i nie otwierają ponownie
+    przetworzonych wątków komentarzy.
+    """
+
+    def __init__(self, path=CRAWL_STATE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS high_water (
+                    topic TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    scope TEXT NOT NULL,
+                    value INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (topic, source, scope)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS harvested (
+                    source TEXT NOT NULL,
+                    item_id TEXT NOT NULL,
+                    harvested_at REAL NOT NULL,
+                    PRIMARY KEY (source, item_id)
+                )
+            """)
+
+    def high_water(self, topic, source, scope=""):
+        entry = self.high_water_entry(topic, source, scope)
+        return entry[0] if entry else None
+
+    def high_water_entry(self, topic, source, scope=""):
+        # (wartość, czas ostatniej aktualizacji) albo None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, updated_at FROM high_water WHERE topic = ? AND source = ? AND scope = ?",
+                (topic, source, scope)
+            ).fetchone()
+        return row
+
+    def window_complete(self, topic, source, since, until):
+        # Okno zakończone przed ostatnim pełnym przejściem nie może już dostać nowych wpisów
+        entry = self.high_water_entry(topic, source, window_scope(since, until))
+        if entry is None:
+            return False
+        until_ts = datetime.fromisoformat(until).replace(tzinfo=timezone.utc).timestamp()
+        return entry[1] >= until_ts + WINDOW_GRACE_PERIOD
+
+    def update_high_water(self, topic, source, scope, value):
+        # Zapisuje tylko wzrost - równoległe okna nie cofną znacznika
+        if value is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO high_water (topic, source, scope, value, updated_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (topic, source, scope) DO UPDATE
+                SET value = max(value, excluded.value), updated_at = excluded.updated_at
+            """, (topic, source, scope, int(value), time.time()))
+
+    def is_harvested(self, source, item_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM harvested WHERE source = ? AND item_id = ?", (source, str(item_id))
+            ).fetchone()
+        return row is not None
+
+    def mark_harvested(self, source, item_ids):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO harvested (source, item_id, harvested_at) VALUES (?, ?, ?)",
+                [(source, str(item_id), now) for item_id in item_ids]
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class PendingProgress:
+    """Postęp zbierany w trakcie crawla i zapisywany dopiero po zapisie danych na dysk."""
+
+    def __init__(self, state):
+        self.state = state
+        self._high_water = []
+        self._harvested = []
+
+    def high_water(self, topic, source, scope, value):
+        self._high_water.append((topic, source, scope, value))
+
+    def harvested(self, source, item_ids):
+        self._harvested.append((source, list(item_ids)))
+
+    def commit(self):
+        for source, item_ids in self._harvested:
+            self.state.mark_harvested(source, item_ids)
+        for topic, source, scope, value in self._high_water:
+            self.state.update_high_water(topic, source, scope, value)
+        self._high_water = []
+        self._harvested = []
+
+
+_default_state = None
+_default_lock = threading.Lock()
+
+
+def get_crawl_state():
+    global _default_state
+    with _default_lock:
+        if _default_state is None:
+            _default_state = CrawlState()
+        return _default_state
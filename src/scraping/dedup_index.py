@@ -0,0 +1,216 @@
+import os
+import json
+import struct
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+
+from metrics import METRICS, timed
+from partition_writer import get_writer
+
+# Nagłówek pliku .idx: liczba bajtów pliku z postami, która jest już zaindeksowana
+HEADER = struct.Struct("<Q")
+# Ile partycji (dni) trzymamy w pamięci; pozostałe wracają z DD.idx przy następnym dostępie
+DEFAULT_MAX_PARTITIONS = 256
+
+
+def text_hash(text):
+    digest = hashlib.blake2b(text.strip().encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def index_path(file_path):
+    return os.path.splitext(file_path)[0] + ".idx"
+
+
+class _Partition:
+    def __init__(self):
+        self.hashes = set()
+        self.covered = 0
+        # Linie w buforze PartitionWriter, których hashy nie ma jeszcze w DD.idx
+        self.pending = 0
+
+
+class DedupIndex:
+    """Trwały indeks hashy tekstów dla plików data/<temat>/YYYY/MM/DD.txt.
+
+    Obok każdego pliku dnia trzymamy DD.idx z 64-bitowymi hashami zapisanych tekstów.
+    Indeks ładowany jest leniwie i zostaje w pamięci między wywołaniami. Jeśli plik
+    z postami urósł poza zaindeksowany zakres (stare dane, zapis z innego procesu),
+    brakująca końcówka jest doindeksowywana, a brak pliku .idx oznacza pełną odbudowę.
+    Nowe posty idą przez PartitionWriter, a hashe trafiają do .idx po zrzuceniu bufora.
+    W pamięci jest najwyżej `max_partitions` ostatnio używanych dni (LRU); partycja z liniami
+    czekającymi w buforze nie jest usuwana, bo ich hashy nie ma jeszcze na dysku.
+    """
+
+    def __init__(self, writer=None, max_partitions=DEFAULT_MAX_PARTITIONS):
+        self.max_partitions = max_partitions
+        self._partitions = OrderedDict()
+        self._lock = threading.RLock()
+        self._writer = writer
+        if writer is not None:
+            writer.add_flush_listener(self._on_flush)
+
+    def _load(self, file_path):
+        size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        part = self._partitions.get(file_path)
+        if part is None:
+            self._evict()
+            part = self._read_sidecar(file_path, size)
+            self._partitions[file_path] = part
+        else:
+            self._partitions.move_to_end(file_path)
+
+        if size < part.covered:
+            # Plik został skrócony lub podmieniony - indeks trzeba zbudować od nowa
+            pending = part.pending
+            part = _Partition()
+            part.pending = pending
+            self._partitions[file_path] = part
+            self._write_sidecar(file_path, part.covered, [], truncate=True)
+        if size > part.covered:
+            self._catch_up(file_path, part)
+        return part
+
+    def _evict(self):
+        # Miejsce na nową partycję: usuwamy najdawniej używane bez linii czekających w buforze
+        if len(self._partitions) < self.max_partitions:
+            return
+        for path in list(self._partitions):
+            if len(self._partitions) < self.max_partitions:
+                break
+            if self._partitions[path].pending == 0:
+                del self._partitions[path]
+                METRICS.inc("dedup_partitions_evicted")
+
+    def _read_sidecar(self, file_path, size):
+        part = _Partition()
+        sidecar = index_path(file_path)
+        if not os.path.exists(sidecar):
+            return part
+        with open(sidecar, "rb") as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return part
+            (covered,) = HEADER.unpack(header)
+            if covered <= size:
+                hashes = array("Q")
+                hashes.frombytes(f.read())
+        if covered > size:
+            # Plik został skrócony lub podmieniony - stare hashe nie mogą zostać w .idx,
+            # bo _catch_up tylko dopisuje; indeks budujemy od nowa
+            self._write_sidecar(file_path, 0, [], truncate=True)
+            return part
+        part.hashes.update(hashes)
+        part.covered = covered
+        return part
+
+    def _catch_up(self, file_path, part):
+        new_hashes = []
+        covered = part.covered
+        with open(file_path, "rb") as f:
+            f.seek(covered)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Niedokończona linia - zaindeksujemy ją przy następnym dopisaniu
+                    break
+                covered += len(line)
+                try:
+                    h = text_hash(json.loads(line)["text"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if h not in part.hashes:
+                    part.hashes.add(h)
+                    new_hashes.append(h)
+        part.covered = covered
+        self._write_sidecar(file_path, covered, new_hashes)
+
+    def _write_sidecar(self, file_path, covered, hashes, truncate=False):
+        sidecar = index_path(file_path)
+        fresh = truncate or not os.path.exists(sidecar)
+        with open(sidecar, "wb" if fresh else "r+b") as f:
+            if fresh:
+                f.write(HEADER.pack(0))
+            # Najpierw hashe, potem nagłówek - przerwany zapis najwyżej zdubluje hashe
+            f.seek(0, os.SEEK_END)
+            f.write(array("Q", hashes).tobytes())
+            f.seek(0)
+            f.write(HEADER.pack(covered))
+
+    @timed("dedup")
+    def filter_new(self, file_path, posts):
+        return self.unique(file_path, posts)
+
+    def unique(self, file_path, posts):
+        # filter_new bez pomiaru czasu - dla backendów, które mierzą całą swoją deduplikację same
+        with self._lock:
+            part = self._load(os.path.normpath(file_path))
+            seen = set()
+            unique = []
+            for post in posts:
+                h = text_hash(post["text"])
+                if h in part.hashes or h in seen:
+                    continue
+                seen.add(h)
+                unique.append(post)
+            return unique
+
+    def append(self, file_path, posts):
+        file_path = os.path.normpath(file_path)
+        with self._lock:
+            unique = self.filter_new(file_path, posts)
+            if not unique:
+                return unique
+
+            hashes = [text_hash(post["text"]) for post in unique]
+            part = self._partitions[file_path]
+            part.hashes.update(hashes)
+            part.pending += len(hashes)
+            lines = [json.dumps(post, ensure_ascii=False) + "\n" for post in unique]
+            self._writer.write_lines(file_path, lines, hashes)
+        return unique
+
+    def _on_flush(self, path, hashes, line_count, start, size):
+        with self._lock:
+            part = self._partitions.get(path)
+            if part is None or not hashes:
+                return
+            part.pending = max(0, part.pending - len(hashes))
+            # Zakres pliku przesuwamy tylko, gdy zrzut zawierał wyłącznie nasze linie;
+            # w przeciwnym razie obce linie zostaną doindeksowane przy następnym _load
+            covered = part.covered
+            if part.covered == start and len(hashes) == line_count:
+                covered = part.covered = size
+            self._write_sidecar(path, covered, hashes)
+
+    def forget(self, file_path):
+        # Plik dnia zniknął (np. po kompaktacji do Parquet) - kolejne _load zaczyna od tego, co jest na dysku
+        with self._lock:
+            self._partitions.pop(os.path.normpath(file_path), None)
+
+    def rebuild(self, file_path):
+        file_path = os.path.normpath(file_path)
+        with self._lock:
+            self._partitions.pop(file_path, None)
+            sidecar = index_path(file_path)
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
+            return len(self._load(file_path).hashes)
+
+
+DEDUP_INDEX = DedupIndex(get_writer())
+
+
+def rebuild_all(root="data"):
+    index = DedupIndex()
+    total = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(".txt"):
+                total += index.rebuild(os.path.join(dirpath, filename))
+    return total
+
+
+if __name__ == "__main__":
+    print(f"🗂️ Odbudowano indeks deduplikacji: {rebuild_all()} hashy")
@@ -0,0 +1,204 @@
+from collections import namedtuple
+
+try:
+    import lxml.html as lxml_html
+    HTML_PARSER = "lxml"
+except ImportError:
+    lxml_html = None
+    HTML_PARSER = "html.parser"
+
+from metrics import timed
+
+
+def make_soup(html):
+    # lxml jest kilkukrotnie szybszy od html.parser, używamy go, jeśli jest zainstalowany.
+    # bs4 potrzebny jest tylko bez lxml, więc importujemy go dopiero tutaj.
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, HTML_PARSER)
+
+
+# Węzeł: tag i atrybuty (wartość None = atrybut musi tylko istnieć); attribute != None oznacza,
+# że tekstem węzła jest wartość tego atrybutu (np. alt obrazka na Instagramie)
+Selector = namedtuple("Selector", "tag attrs attribute", defaults=(None,))
+
+# container - najbardziej zewnętrzne węzły postów; bodies - selektory treści w kolejności
+# ważności (pierwszy, który coś znajdzie w kontenerze, wygrywa); split - każdy węzeł treści to
+# osobny wpis zamiast jednego tekstu na kontener; fallback - liście używane, gdy nie ma kontenerów
+ExtractionRule = namedtuple("ExtractionRule", "container bodies min_length split fallback")
+
+EXTRACTION_RULES = {
+    "facebook": ExtractionRule(
+        container=Selector("div", {"role": "article"}),
+        bodies=(
+            Selector("div", {"data-ad-preview": "message"}),
+            Selector("div", {"data-ad-comet-preview": "message"}),
+            Selector("div", {"dir": "auto"}),
+        ),
+        min_length=50,
+        split=False,
+        fallback=Selector("div", {}),
+    ),
+    "instagram": ExtractionRule(
+        container=Selector("article", {}),
+        bodies=(
+            Selector("img", {"alt": None}, attribute="alt"),
+            Selector("h1", {}),
+        ),
+        min_length=1,
+        split=True,
+        fallback=None,
+    ),
+}
+
+
+def _xpath(selector):
+    conditions = "".join(f"[@{name}]" if value is None else f"[@{name}='{value}']"
+                         for name, value in selector.attrs.items())
+    return selector.tag + conditions
+
+
+def _bs4_attrs(selector):
+    return {name: True if value is None else value for name, value in selector.attrs.items()}
+
+
+def _normalize(parts):
+    # Jak get_text(separator=" ", strip=True) - ten sam tekst co ekstrakcja X w przeglądarce
+    return " ".join(part.strip() for part in parts if part and part.strip())
+
+
+class _LxmlTree:
+    def __init__(self, html):
+        self.root = lxml_html.fromstring(html)
+
+    def outermost(self, selector):
+        path = _xpath(selector)
+        return self.root.xpath(f"//{path}[not(ancestor::{path})]")
+
+    def innermost(self, node, selector):
+        path = _xpath(selector)
+        return node.xpath(f".//{path}[not(.//{path})]")
+
+    def text(self, node, selector):
+        if selector.attribute:
+            return _normalize([node.get(selector.attribute)])
+        return _normalize(node.itertext())
+
+
+class _SoupTree:
+    # Ścieżka bez lxml: te same reguły na BeautifulSoup (html.parser), wolniej, ale z tym samym wynikiem
+    def __init__(self, html):
+        self.root = make_soup(html)
+
+    def outermost(self, selector):
+        attrs = _bs4_attrs(selector)
+        return [node for node in self.root.find_all(selector.tag, attrs=attrs)
+                if node.find_parent(selector.tag, attrs=attrs) is None]
+
+    def innermost(self, node, selector):
+        attrs = _bs4_attrs(selector)
+        return [found for found in node.find_all(selector.tag, attrs=attrs)
+                if found.find(selector.tag, attrs=attrs) is None]
+
+    def text(self, node, selector):
+        if selector.attribute:
+            return _normalize([node.get(selector.attribute)])
+        return _normalize(node.stripped_strings)
+
+
+def parse_html(html):
+    return _LxmlTree(html) if lxml_html is not None else _SoupTree(html)
+
+
+@timed("html_parse")
+def extract_posts(html, platform, max_posts=None):
+    """Teksty postów ze strony według EXTRACTION_RULES[platform].
+
+    Bierzemy tylko najgłębsze węzły treści wewnątrz najbardziej zewnętrznych kontenerów,
+    więc każdy fragment tekstu jest czytany raz - zamiast get_text() na każdym divie, gdzie
+    rodzic powtarza tekst wszystkich potomków. Zwraca listę tekstów bez powtórzeń.
+    """
+    rule = EXTRACTION_RULES[platform]
+    tree = parse_html(html)
+    texts = []
+    seen = set()
+
+    def add(text):
+        if len(text) >= rule.min_length and text not in seen:
+            seen.add(text)
+            texts.append(text)
+        return max_posts is not None and len(texts) >= max_posts
+
+    containers = tree.outermost(rule.container)
+    for container in containers:
+        for body in rule.bodies:
+            nodes = tree.innermost(container, body)
+            if nodes:
+                break
+        else:
+            nodes = [container]
+            body = rule.container
+
+        if rule.split:
+            for node in nodes:
+                if add(tree.text(node, body)):
+                    return texts
+        elif add(_normalize(tree.text(node, body) for node in nodes)):
+            return texts
+
+    if not containers and rule.fallback is not None:
+        # Zmieniony układ strony bez kontenerów - same liście, nigdy ich przodkowie
+        for node in tree.innermost(tree.root, rule.fallback):
+            if add(tree.text(node, rule.fallback)):
+                return texts
+    return texts
+
+
+# Ekstrakcja w przeglądarce: zwraca tylko artykuły, których jeszcze nie widzieliśmy na tej stronie.
+# Tekst składany jest jak get_text(separator=" ", strip=True) w BeautifulSoup, żeby deduplikacja
+# działała tak samo jak dla danych zapisanych wcześniej.
+EXTRACT_NEW_JS = """
+var selector = arguments[0];
+var seen = window.__mtSeen || (window.__mtSeen = new Set());
+
+function collectText(node) {
+    var parts = [];
+    var walker = document.createTreeWalker(node, NodeFilter.SHOW_TEXT);
+    while (walker.nextNode()) {
+        var value = walker.currentNode.nodeValue.trim();
+        if (value) parts.push(value);
+    }
+    return parts.join(" ");
+}
+
+var items = [];
+document.querySelectorAll(selector).forEach(function (article) {
+    if (article.dataset.mtSeen) return;
+
+    var textDiv = article.querySelector("div[data-testid='tweetText']");
+    var time = article.querySelector("time");
+    var link = time ? time.closest("a[href*='/status/']") : null;
+    if (!link) link = article.querySelector("a[href*='/status/']");
+
+    var text = textDiv ? collectText(textDiv) : "";
+    var url = link ? link.getAttribute("href") : null;
+    var key = url || text;
+    // Artykuł bez linku i tekstu jeszcze się nie wyrenderował - sprawdzimy go przy następnym odczycie
+    if (!key) return;
+    article.dataset.mtSeen = "1";
+    if (seen.has(key)) return;
+    seen.add(key);
+
+    items.push({
+        text: text,
+        url: url,
+        timestamp: time ? time.getAttribute("datetime") : null
+    });
+});
+return items;
+"""
+
+
+@timed("dom_extract")
+def extract_new_articles(driver, selector="article[role='article']"):
+    # Koszt zależy od liczby nowych artykułów, a nie od rozmiaru całej strony
+    return driver.execute_script(EXTRACT_NEW_JS, selector) or []
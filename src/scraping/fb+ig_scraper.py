@@ -1,41 +1,21 @@
-import os
-import json
-import time
 from datetime import datetime
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 
-# === Zapis do pliku ===
-def save_posts(posts, query, date):
-    safe_query = query.replace(" ", "_")
-    path = f"data/{safe_query}/{date.year}/{date.month:02d}/"
-    os.makedirs(path, exist_ok=True)
-    file_path = os.path.join(path, f"{date.day:02d}.txt")
+from browser_pool import BrowserPool
+from dom_extract import extract_posts
+from metrics import labels, start_export
+from page_wait import wait_for_content
+from pipeline import Pipeline, Record
 
-    existing_texts = set()
-    if os.path.exists(file_path):
-        with open(file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    data = json.loads(line)
-                    existing_texts.add(data["text"].strip())
-                except:
-                    continue
-
-    unique_posts = [p for p in posts if p["text"].strip() not in existing_texts]
-    if not unique_posts:
-        print(f"Brak nowych postów: {date.date()}")
-        return
-
-    with open(file_path, "a", encoding="utf-8") as f:
-        for post in unique_posts:
-            f.write(json.dumps(post, ensure_ascii=False) + "\n")
-
-    print(f"Zapisano {len(unique_posts)} postów do: {file_path}")
+# Adresy wyszukiwania (benchmarki podstawiają lokalny serwer z nagranymi stronami)
+INSTAGRAM_TAG_URL = "https://www.instagram.com/explore/tags/{query}/"
+FACEBOOK_SEARCH_URL = "https://www.facebook.com/search/posts/?q={query}"
 
 # === Setup Selenium ===
 def init_driver():
+    # Selenium ładujemy dopiero przy starcie przeglądarki, nie przy imporcie modułu
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
     options = Options()
     options.add_argument("--headless=new")
     options.add_argument("--disable-gpu")
@@ -44,64 +24,72 @@ def init_driver():
 
     return webdriver.Chrome(options=options)
 
-# === Scraper Instagram ===
-def scrape_instagram(query, max_posts=10):
-    url = f"https://www.instagram.com/explore/tags/{query.lower()}/"
-    driver = init_driver()
-    driver.get(url)
-    time.sleep(5)
-
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-    driver.quit()
+# Jedna ciepła przeglądarka na cały przebieg zamiast nowego Chrome dla każdej strony
+_browser_pool = None
 
-    posts = []
-    articles = soup.find_all("article")
-    for article in articles:
-        text = article.get_text(strip=True)
-        if text:
-            posts.append({
-                "platform": "Instagram",
-                "text": text,
-                "timestamp": str(datetime.utcnow())
-            })
-        if len(posts) >= max_posts:
-            break
+def get_browser_pool():
+    global _browser_pool
+    if _browser_pool is None:
+        _browser_pool = BrowserPool(init_driver, size=1)
+    return _browser_pool
 
-    return posts
+# === Scraper Instagram ===
+def scrape_instagram(query, max_posts=10, pool=None):
+    url = INSTAGRAM_TAG_URL.format(query=query.lower())
+    with (pool or get_browser_pool()).session() as driver:
+        driver.get(url)
+        state, waited = wait_for_content(driver, "article", timeout=15)
+        print(f"⏱️ Instagram: strona gotowa po {waited:.1f}s (artykułów: {state.count})")
+
+        html = driver.page_source
+
+    # Generator - posty trafiają do potoku zapisu jeden po drugim, przeglądarka jest już zwolniona
+    for text in extract_posts(html, "instagram", max_posts):
+        yield {
+            "platform": "Instagram",
+            "text": text,
+            "timestamp": str(datetime.utcnow())
+        }
 
 # === Scraper Facebook (tylko dla publicznych wyszukiwań) ===
-def scrape_facebook(query, max_posts=10):
-    url = f"https://www.facebook.com/search/posts/?q={query}"
-    driver = init_driver()
-    driver.get(url)
-    time.sleep(6)
-
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-    driver.quit()
-
-    posts = []
-    divs = soup.find_all("div")
-    for div in divs:
-        text = div.get_text(strip=True)
-        if text and len(text) > 50:
-            posts.append({
-                "platform": "Facebook",
-                "text": text,
-                "timestamp": str(datetime.utcnow())
-            })
-        if len(posts) >= max_posts:
-            break
-
-    return posts
+def scrape_facebook(query, max_posts=10, pool=None):
+    url = FACEBOOK_SEARCH_URL.format(query=query)
+    with (pool or get_browser_pool()).session() as driver:
+        driver.get(url)
+        state, waited = wait_for_content(driver, "div[role='article']", timeout=15)
+        print(f"⏱️ Facebook: strona gotowa po {waited:.1f}s (postów: {state.count})")
+
+        html = driver.page_source
+
+    # Tylko najgłębsze węzły treści postów - rodzice nie powtarzają już tekstu dzieci
+    for text in extract_posts(html, "facebook", max_posts):
+        yield {
+            "platform": "Facebook",
+            "text": text,
+            "timestamp": str(datetime.utcnow())
+        }
+
+# === Jeden temat: IG + FB ===
+def scrape_and_save(query, max_posts=10, pool=None, limiter=None):
+    # limiter (opcjonalny) to wspólny budżet stron przeglądarki - jeden token na stronę
+    # Posty FB/IG nie są filtrowane po słowach kluczowych - potok tylko je dopisuje
+    print(f"\n🔍 IG + FB: Szukam postów o: {query}")
+    with Pipeline() as pipeline:
+        for platform, scrape in (("instagram", scrape_instagram), ("facebook", scrape_facebook)):
+            with labels(platform=platform, topic=query):
+                if limiter is not None:
+                    limiter.acquire()
+                for post in scrape(query, max_posts=max_posts, pool=pool):
+                    pipeline.put(Record(query, post, require_keywords=False))
+    saved = pipeline.saved.get(query, 0)
+    if not saved:
+        print(f"Brak nowych postów: {query}")
+    return saved
 
 # === MAIN ===
 if __name__ == "__main__":
     topics = ["Bitcoin", "Allegro", "Ethereum", "Zabka", "XTB"]
-    for query in topics:
-        print(f"\n🔍 IG + FB: Szukam postów o: {query}")
-        posts_ig = scrape_instagram(query, max_posts=10)
-        posts_fb = scrape_facebook(query, max_posts=10)
-
-        now = datetime.utcnow()
-        save_posts(posts_ig, query, now)
-        save_posts(posts_fb, query, now)
+    start_export()
+    with get_browser_pool() as pool:
+        for query in topics:
+            scrape_and_save(query, max_posts=10, pool=pool)
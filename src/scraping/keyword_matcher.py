@@ -0,0 +1,125 @@
+from collections import deque
+
+from metrics import timed
+
+# Słowa kluczowe związane z inwestowaniem (wspólne dla wszystkich scraperów)
+INVESTMENT_KEYWORDS = [
+    "akcje", "giełda", "inwestor", "inwestycja", "notowania",
+    "kurs", "spółka", "fundusz", "dividenda", "dividend",
+    "ticker", "share", "stock", "earnings", "IPO",
+    "wykres", "trading", "broker", "forex", "crypto",
+    "bitcoin", "ethereum", "altcoin",
+    "price", "market", "buy", "sell", "hold",
+    "portfolio", "wallet", "exchange", "mining", "blockchain",
+    "cena", "rynek", "kupić", "sprzedać", "trzymać",
+    "portfel", "portfel kryptowalut", "giełda kryptowalut", "kopanie", "blockchain"
+]
+
+
+class KeywordMatcher:
+    """Automat Aho-Corasick: jedno przejście po tekście niezależnie od liczby słów kluczowych."""
+
+    def __init__(self, keywords, whole_words=False):
+        self.whole_words = whole_words
+        # Kolejne warianty tego samego słowa (np. "Bitcoin" i "bitcoin") mapujemy na pierwszy wpis
+        self.keywords = []
+        seen = {}
+        for keyword in keywords:
+            key = keyword.lower()
+            if key and key not in seen:
+                seen[key] = keyword
+                self.keywords.append(keyword)
+        self._build([(key, original) for key, original in seen.items()])
+
+    def _build(self, patterns):
+        goto = [{}]
+        outputs = [()]
+        for key, original in patterns:
+            state = 0
+            for ch in key:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append(())
+                state = nxt
+            outputs[state] = outputs[state] + ((original, len(key)),)
+
+        # Funkcja przejść DFA: brak wpisu w słowniku oznacza powrót do korzenia
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            fallback = delta[fail[state]]
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            transitions = dict(fallback)
+            for ch, nxt in goto[state].items():
+                fail[nxt] = fallback.get(ch, 0)
+                transitions[ch] = nxt
+                queue.append(nxt)
+            delta[state] = transitions
+
+        self._delta = delta
+        self._outputs = outputs
+
+    def _iter_matches(self, text):
+        text = text.lower()
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for end, ch in enumerate(text, 1):
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                for keyword, length in outputs[state]:
+                    if self.whole_words and not _is_whole_word(text, end - length, end):
+                        continue
+                    yield keyword
+
+    # contains/find są wołane dla każdego wpisu - bez pomiaru czasu, który kosztowałby więcej niż
+    # samo dopasowanie; czas etapu mierzą wywołania na paczkach (tag, filter, potok zapisu)
+    def contains(self, text):
+        if self.whole_words:
+            for _ in self._iter_matches(text):
+                return True
+            return False
+
+        # Szybka ścieżka bez generatora - wystarczy dojść do dowolnego stanu akceptującego
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for ch in text.lower():
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                return True
+        return False
+
+    def find(self, text):
+        return set(self._iter_matches(text))
+
+    @timed("keyword_filter")
+    def tag(self, texts):
+        return [self.find(text) for text in texts]
+
+    @timed("keyword_filter")
+    def filter(self, texts):
+        # Zwraca tylko pasujące teksty razem ze zbiorem dopasowanych słów kluczowych
+        result = []
+        for text in texts:
+            matched = self.find(text)
+            if matched:
+                result.append((text, matched))
+        return result
+
+
+def _is_whole_word(text, start, end):
+    if start > 0 and text[start - 1].isalnum():
+        return False
+    if end < len(text) and text[end].isalnum():
+        return False
+    return True
+
+
+INVESTMENT_MATCHER = KeywordMatcher(INVESTMENT_KEYWORDS)
@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import atexit
+import cProfile
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+CONFIG_PATH = "config.json"
+METRICS_ROOT = os.path.join("data", "metrics")
+PREFIX = "scraper"
+
+# Etykiety (platform, topic) ustawione przez labels() - widoczne w zagnieżdżonych wywołaniach
+# i zadaniach asyncio. Nowe wątki ich nie dziedziczą, tam etykiety podajemy jawnie.
+_context_labels = contextvars.ContextVar("metric_labels", default=())
+
+
+@contextmanager
+def labels(**values):
+    merged = dict(_context_labels.get())
+    merged.update((key, str(value)) for key, value in values.items() if value is not None)
+    token = _context_labels.set(tuple(sorted(merged.items())))
+    try:
+        yield
+    finally:
+        _context_labels.reset(token)
+
+
+def _key(name, extra):
+    if not extra:
+        return name, _context_labels.get()
+    merged = dict(_context_labels.get())
+    merged.update((key, str(value)) for key, value in extra.items())
+    return name, tuple(sorted(merged.items()))
+
+
+class Metrics:
+    """Liczniki, czasy etapów i wskaźniki w pamięci procesu, oznaczone platformą i tematem.
+
+    Czasy etapów (start przeglądarki, ładowanie strony, parsowanie HTML, deduplikacja, zapis,
+    zapytania API) to suma, liczba i maksimum; tempo (wpisy/s, strony/s) wynika z liczników
+    i czasu działania - w snapshotach JSON albo przez rate() w Prometheusie.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._counters = {}
+        self._stages = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, stage, seconds, **labels):
+        key = _key(stage, labels)
+        with self._lock:
+            entry = self._stages.get(key)
+            if entry is None:
+                self._stages[key] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+
+    def set(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        now = time.time()
+        uptime = max(now - self.started, 1e-9)
+        with self._lock:
+            counters = sorted(self._counters.items())
+            stages = sorted((key, list(entry)) for key, entry in self._stages.items())
+            gauges = sorted(self._gauges.items())
+        return {
+            "timestamp": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            "uptime_seconds": round(uptime, 3),
+            "counters": [{"name": name, "labels": dict(key), "value": value, "per_second": value / uptime}
+                         for (name, key), value in counters],
+            "stages": [{"stage": stage, "labels": dict(key), "count": count, "seconds": total, "max": peak,
+                        "mean": total / count}
+                       for (stage, key), (count, total, peak) in stages],
+            "gauges": [{"name": name, "labels": dict(key), "value": value} for (name, key), value in gauges],
+        }
+
+    def to_prometheus(self):
+        # Format tekstowy Prometheusa (np. dla textfile collectora node_exportera)
+        snapshot = self.snapshot()
+        lines = []
+        for name, samples in _group(snapshot["counters"], "name").items():
+            metric = f"{PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f"{metric}{_format_labels(sample['labels'])} {sample['value']}" for sample in samples)
+        if snapshot["stages"]:
+            # Etapy jako jedno summary scraper_stage_seconds{stage=...} plus maksimum jako gauge
+            metric = f"{PREFIX}_stage_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for stage in snapshot["stages"]:
+                stage_labels = _format_labels({"stage": stage["stage"], **stage["labels"]})
+                lines.append(f"{metric}_sum{stage_labels} {stage['seconds']}")
+                lines.append(f"{metric}_count{stage_labels} {stage['count']}")
+            lines.append(f"# TYPE {metric}_max gauge")
+            lines.extend(f"{metric}_max{_format_labels({'stage': stage['stage'], **stage['labels']})} {stage['max']}"
+                         for stage in snapshot["stages"])
+        for name, samples in _group(snapshot["gauges"], "name").items():
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.extend(f"{metric}{_format_labels(sample['labels'])} {sample['value']}" for sample in samples)
+        lines.append(f"# TYPE {PREFIX}_uptime_seconds gauge")
+        lines.append(f"{PREFIX}_uptime_seconds {snapshot['uptime_seconds']}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        _write_atomic(path, json.dumps(self.snapshot(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path):
+        _write_atomic(path, self.to_prometheus())
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._stages.clear()
+            self._gauges.clear()
+            self.started = time.time()
+
+
+def _group(samples, field):
+    groups = {}
+    for sample in samples:
+        groups.setdefault(sample[field], []).append(sample)
+    return groups
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(sample_labels):
+    if not sample_labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(sample_labels.items())) + "}"
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+METRICS = Metrics()
+
+
+def timed(stage, **stage_labels):
+    # Dekorator: czas każdego wywołania funkcji trafia do etapu `stage`
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                METRICS.observe(stage, time.perf_counter() - start, **stage_labels)
+        return wrapper
+    return decorator
+
+
+def load_metrics_config(config_path=CONFIG_PATH):
+    # Sekcja "metrics" w config.json, np. {"prometheus": "data/metrics/scraper.prom",
+    # "json": "data/metrics/scraper.json", "interval": 30, "profile": "cprofile"}
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("metrics", {})
+
+
+class MetricsExporter:
+    """Okresowy zapis metryk do pliku Prometheusa i/lub snapshotu JSON (także przy zamknięciu)."""
+
+    def __init__(self, metrics=METRICS, prometheus_path=None, json_path=None, interval=30.0):
+        self.metrics = metrics
+        self.prometheus_path = prometheus_path
+        self.json_path = json_path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def export(self):
+        if self.prometheus_path:
+            self.metrics.write_prometheus(self.prometheus_path)
+        if self.json_path:
+            self.metrics.write_json(self.json_path)
+
+    def start(self):
+        if self._thread is None and self.interval:
+            self._thread = threading.Thread(target=self._export_periodically, daemon=True)
+            self._thread.start()
+        return self
+
+    def _export_periodically(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.export()
+            except OSError as e:
+                print(f"⚠️ Nie udało się zapisać metryk: {str(e)}")
+
+    def close(self):
+        self._stopped.set()
+        self.export()
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+_profile_mode = None
+# Naraz profilujemy jeden przebieg: od Pythona 3.12 cProfile korzysta z sys.monitoring całego procesu,
+# więc drugi profiler w innym wątku rzuca ValueError, a profil i tak nie dotyczyłby jednego zadania
+_profile_lock = threading.Lock()
+
+
+def start_export(prometheus_path=None, json_path=None, interval=None, profile=None):
+    # Wywoływane przez punkty wejścia (scrapery, harmonogram); domyślnie oba formaty w data/metrics/
+    global _exporter, _profile_mode
+    with _exporter_lock:
+        if _exporter is None:
+            config = load_metrics_config()
+            _exporter = MetricsExporter(
+                METRICS,
+                prometheus_path or config.get("prometheus", os.path.join(METRICS_ROOT, "scraper.prom")),
+                json_path or config.get("json", os.path.join(METRICS_ROOT, "scraper.json")),
+                interval if interval is not None else config.get("interval", 30.0),
+            ).start()
+            _profile_mode = profile or config.get("profile")
+            atexit.register(_exporter.close)
+        return _exporter
+
+
+@contextmanager
+def profile_run(name, mode=None, root=os.path.join(METRICS_ROOT, "profiles")):
+    """Profil jednego przebiegu: "cprofile" -> .prof, "pyinstrument" -> .html.
+
+    Bez trybu (ani w argumencie, ani w config.json) nic nie robi, więc może stale owijać zadania.
+    Gdy inny przebieg jest właśnie profilowany, ten wykonuje się bez profilu.
+    """
+    mode = mode or _profile_mode
+    if not mode:
+        yield
+        return
+    if not _profile_lock.acquire(blocking=False):
+        print(f"ℹ️ Trwa profilowanie innego przebiegu - {name} bez profilu")
+        yield
+        return
+    try:
+        with _profiled(name, mode, root):
+            yield
+    finally:
+        _profile_lock.release()
+
+
+@contextmanager
+def _profiled(name, mode, root):
+    if mode == "pyinstrument" and Profiler is None:
+        print("⚠️ Profil pyinstrument wymaga pakietu pyinstrument - używam cProfile")
+        mode = "cprofile"
+    os.makedirs(root, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    safe_name = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in name)
+
+    if mode == "pyinstrument":
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            path = os.path.join(root, f"{safe_name}-{stamp}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            print(f"📈 Profil zapisany: {path}")
+    elif mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path = os.path.join(root, f"{safe_name}-{stamp}.prof")
+            profiler.dump_stats(path)
+            print(f"📈 Profil zapisany: {path}")
+    else:
+        raise ValueError(f"Nieznany tryb profilowania: {mode} (dostępne: cprofile, pyinstrument)")
@@ -0,0 +1,191 @@
+import os
+import re
+import struct
+import hashlib
+import threading
+from array import array
+
+from dedup_index import text_hash
+from metrics import METRICS
+
+NEAR_DUPLICATES_FILE = "near_duplicates.idx"
+
+# Próg podobieństwa odcisków (1 - odległość Hamminga / 64). 0.95 to najwyżej 3 różne bity,
+# czyli 4 pasma po 16 bitów - przy milionach wpisów kandydatów w paśmie jest garstka.
+DEFAULT_THRESHOLD = 0.95
+MIN_TOKENS = 5
+# Ile ostatnich odcisków trzymamy w pamięci (ok. 100 B na odcisk w pasmach) - starsze zostają tylko
+# w pliku, więc bliski duplikat sprzed setek tysięcy wpisów dostaje nową grupę
+DEFAULT_MAX_ENTRIES = 500_000
+
+TOKEN_RE = re.compile(r"\w+")
+RECORD = struct.Struct("<QQ")
+MASK = (1 << 64) - 1
+
+
+def _feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def simhash(text):
+    """64-bitowy SimHash z bigramów słów albo None dla zbyt krótkich tekstów.
+
+    Liczniki bitów trzymamy pionowo: planes[i] to i-ty bit licznika dla wszystkich 64
+    pozycji naraz, więc dodanie cechy to kilka operacji na intach zamiast pętli po bitach.
+    """
+    tokens = TOKEN_RE.findall(text.lower())
+    if len(tokens) < MIN_TOKENS:
+        return None
+    features = [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    planes = []
+    for feature in features:
+        carry = _feature_hash(feature)
+        for i, plane in enumerate(planes):
+            planes[i], carry = plane ^ carry, plane & carry
+            if not carry:
+                break
+        if carry:
+            planes.append(carry)
+
+    # Bit odcisku = 1, gdy licznik na tej pozycji > połowa cech (porównanie wszystkich pozycji naraz)
+    threshold = len(features) // 2
+    if threshold >> len(planes):
+        return 0
+    greater = 0
+    equal = MASK
+    for i in range(len(planes) - 1, -1, -1):
+        if (threshold >> i) & 1:
+            equal &= planes[i]
+        else:
+            greater |= equal & planes[i]
+            equal &= ~planes[i] & MASK
+    return greater
+
+
+def max_distance(threshold):
+    return int((1.0 - threshold) * 64)
+
+
+class NearDuplicateIndex:
+    """Trwały indeks bliskich duplikatów (SimHash) wspólny dla platform i dni.
+
+    Odcisk dzielimy na max_distance + 1 pasm: z zasady szufladkowej dwa odciski różniące się
+    najwyżej max_distance bitami mają co najmniej jedno identyczne pasmo, więc zapytanie to kilka
+    odczytów ze słowników i sprawdzenie garstki kandydatów. Duplikaty nie są usuwane - wpis
+    dostaje pole "cluster" z hashem tekstu pierwszego wpisu w grupie. Indeks to dopisywany
+    plik par (odcisk, grupa); wpisy innych procesów są doczytywane przed każdą paczką.
+    W pamięci jest tylko `max_entries` najnowszych odcisków, więc pamięć nie rośnie z korpusem.
+    """
+
+    def __init__(self, path=os.path.join("data", NEAR_DUPLICATES_FILE), threshold=DEFAULT_THRESHOLD,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_distance = max_distance(threshold)
+        bands = self.max_distance + 1
+        widths = [64 // bands + (1 if i < 64 % bands else 0) for i in range(bands)]
+        self._bands = []
+        shift = 0
+        for width in widths:
+            self._bands.append((shift, (1 << width) - 1))
+            shift += width
+
+        self._fingerprints = array("Q")
+        self._clusters = array("Q")
+        self._tables = [{} for _ in self._bands]
+        self._pending = []
+        self._covered = 0
+        self._lock = threading.RLock()
+        self._catch_up()
+
+    def _catch_up(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size <= self._covered:
+            return
+        # Starsze odciski i tak wypadłyby z okna - czytamy tylko końcówkę pliku (z zachowaniem granic rekordów)
+        tail = size - self.max_entries * RECORD.size
+        if tail > self._covered:
+            self._covered += (tail - self._covered) // RECORD.size * RECORD.size
+        with open(self.path, "rb") as f:
+            f.seek(self._covered)
+            data = f.read((size - self._covered) // RECORD.size * RECORD.size)
+        for fingerprint, cluster in RECORD.iter_unpack(data):
+            self._insert(fingerprint, cluster)
+        self._covered += len(data)
+
+    def _insert(self, fingerprint, cluster):
+        entry = len(self._fingerprints)
+        self._fingerprints.append(fingerprint)
+        self._clusters.append(cluster)
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            table.setdefault((fingerprint >> shift) & mask, []).append(entry)
+        # Przebudowa co max_entries / 4 wstawień - koszt rozłożony na wstawienia
+        if entry >= self.max_entries + self.max_entries // 4:
+            self._evict()
+
+    def _evict(self):
+        # Zostawiamy max_entries najnowszych odcisków i budujemy pasma od nowa
+        drop = len(self._fingerprints) - self.max_entries
+        fingerprints, clusters = self._fingerprints[drop:], self._clusters[drop:]
+        self._fingerprints, self._clusters = array("Q"), array("Q")
+        self._tables = [{} for _ in self._bands]
+        for fingerprint, cluster in zip(fingerprints, clusters):
+            self._insert(fingerprint, cluster)
+        METRICS.inc("near_dedup_evicted", drop)
+
+    def query(self, fingerprint):
+        # (grupa, odległość) najbliższego odcisku w progu albo (None, None)
+        best = None
+        best_distance = self.max_distance + 1
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            for entry in table.get((fingerprint >> shift) & mask, ()):
+                distance = (self._fingerprints[entry] ^ fingerprint).bit_count()
+                if distance < best_distance:
+                    best, best_distance = entry, distance
+                    if distance == 0:
+                        return self._clusters[entry], 0
+        if best is None:
+            return None, None
+        return self._clusters[best], best_distance
+
+    def assign(self, text):
+        # Grupa tekstu; nowy odcisk trafia do indeksu, chyba że identyczny już w nim jest
+        fingerprint = simhash(text)
+        if fingerprint is None:
+            return text_hash(text)
+        with self._lock:
+            cluster, distance = self.query(fingerprint)
+            if distance == 0:
+                return cluster
+            if cluster is None:
+                cluster = text_hash(text)
+            self._insert(fingerprint, cluster)
+            self._pending.append(RECORD.pack(fingerprint, cluster))
+            return cluster
+
+    def mark(self, posts):
+        with self._lock, METRICS.timer("near_dedup"):
+            self._catch_up()
+            for post in posts:
+                post["cluster"] = f"{self.assign(post['text']):016x}"
+        return posts
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Wcześniej doczytujemy obce wpisy, żeby _covered wskazywał koniec pliku po dopisaniu
+            self._catch_up()
+            data = b"".join(self._pending)
+            with open(self.path, "ab") as f:
+                f.write(data)
+            self._covered += len(data)
+            self._pending = []
+
+    def close(self):
+        self.flush()
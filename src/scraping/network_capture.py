@@ -0,0 +1,174 @@
+import re
+import json
+import html
+import base64
+import weakref
+from datetime import datetime
+
+from metrics import METRICS, timed
+from storage import TWITTER_TIME_FORMAT
+
+# Odpowiedzi GraphQL X z tweetami: wyszukiwanie i wątek konwersacji (strona statusu)
+TIMELINE_OPERATIONS = ("SearchTimeline", "TweetDetail")
+
+# Obrazy i wideo nie są potrzebne - dane bierzemy z JSON, a nie z wyrenderowanej strony
+BLOCKED_URLS = (
+    "*pbs.twimg.com/*", "*video.twimg.com/*", "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*",
+    "*.mp4*", "*.m3u8*", "*.m4s*",
+)
+
+
+def enable_network_log(options):
+    # Zdarzenia Network trafiają do logu "performance" przeglądarki; bez tego capture nie ma czego czytać.
+    # Log trzeba regularnie odczytywać (robi to TimelineCapture), więc włączamy go tylko w trybie sieciowym.
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+    return options
+
+
+def tweet_results(payload):
+    # Wszystkie tweet_results.result w kolejności z odpowiedzi: SearchTimeline (entries -> itemContent)
+    # i TweetDetail (także moduły conversationthread z items[]). W tweet nie schodzimy - cytaty pomijamy.
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            results = node.get("tweet_results")
+            if isinstance(results, dict) and "result" in results:
+                yield results["result"]
+                continue
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+
+def _count(value):
+    return int(value) if value not in (None, "") else None
+
+
+def parse_tweet(result):
+    """Wpis z tweet_results.result: tekst, ID, prawdziwy czas utworzenia, autor, powiązanie z odpowiedzią
+    i liczniki. None dla tweetów usuniętych lub niedostępnych (TweetTombstone, TweetUnavailable)."""
+    if result.get("__typename") == "TweetWithVisibilityResults":
+        result = result.get("tweet") or {}
+    legacy = result.get("legacy")
+    if not legacy:
+        return None
+    tweet_id = result.get("rest_id") or legacy.get("id_str")
+    user = ((result.get("core") or {}).get("user_results") or {}).get("result") or {}
+    author = (user.get("core") or {}).get("screen_name") or (user.get("legacy") or {}).get("screen_name")
+    # Długie tweety (powyżej 280 znaków) mają pełny tekst w note_tweet, a w full_text tylko początek
+    note = (((result.get("note_tweet") or {}).get("note_tweet_results") or {}).get("result") or {}).get("text")
+    created_at = legacy.get("created_at")
+    return {
+        # X zwraca w full_text encje HTML (&amp;, &lt;) - w DOM widać zwykłe znaki
+        "text": html.unescape(note or legacy.get("full_text") or ""),
+        "url": f"/{author}/status/{tweet_id}" if author else f"/i/status/{tweet_id}",
+        "timestamp": datetime.strptime(created_at, TWITTER_TIME_FORMAT).isoformat() if created_at else None,
+        "tweet_id": tweet_id,
+        "author": author,
+        "in_reply_to": legacy.get("in_reply_to_status_id_str"),
+        "conversation_id": legacy.get("conversation_id_str"),
+        "lang": legacy.get("lang"),
+        "metrics": {
+            "likes": _count(legacy.get("favorite_count")),
+            "retweets": _count(legacy.get("retweet_count")),
+            "replies": _count(legacy.get("reply_count")),
+            "quotes": _count(legacy.get("quote_count")),
+            "views": _count((result.get("views") or {}).get("count")),
+        },
+    }
+
+
+@timed("timeline_decode")
+def timeline_items(payload):
+    items = []
+    for result in tweet_results(payload):
+        item = parse_tweet(result)
+        if item is not None:
+            items.append(item)
+    return items
+
+
+class TimelineCapture:
+    """Przechwytywanie odpowiedzi JSON timeline'ów X przez Chrome DevTools Protocol.
+
+    Zamiast serializować i parsować HTML, czytamy zdarzenia Network z logu "performance"
+    (sterownik musi mieć enable_network_log) i dekodujemy odpowiedzi SearchTimeline/TweetDetail,
+    które strona i tak pobiera. items() zwraca wpisy, których nie było od ostatniego clear().
+    """
+
+    def __init__(self, driver, operations=TIMELINE_OPERATIONS):
+        self.driver = driver
+        self._pattern = re.compile(r"/graphql/[^/]+/(%s)(?:\?|$)" % "|".join(operations))
+        self._pending = {}
+        self._seen = set()
+
+    def start(self, blocked_urls=BLOCKED_URLS):
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        if blocked_urls:
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(blocked_urls)})
+        self.clear()
+        return self
+
+    def clear(self):
+        # Przed nową stroną: porzucamy zaległe zdarzenia i zbiór widzianych ID
+        self.driver.get_log("performance")
+        self._pending.clear()
+        self._seen.clear()
+
+    def _body(self, request_id):
+        body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        if body.get("base64Encoded"):
+            return base64.b64decode(body["body"]).decode("utf-8")
+        return body["body"]
+
+    def responses(self):
+        # (operacja, JSON) dla każdej odpowiedzi timeline'u zakończonej od poprzedniego odczytu logu.
+        # Treść jest dostępna dopiero po loadingFinished, więc responseReceived tylko zapamiętuje żądanie.
+        for entry in self.driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.responseReceived":
+                response = params.get("response", {})
+                match = self._pattern.search(response.get("url", ""))
+                if match and response.get("status") == 200:
+                    self._pending[params["requestId"]] = match.group(1)
+            elif method == "Network.loadingFinished":
+                operation = self._pending.pop(params.get("requestId"), None)
+                if operation is None:
+                    continue
+                try:
+                    payload = json.loads(self._body(params["requestId"]))
+                except Exception as e:
+                    METRICS.inc("capture_errors", operation=operation)
+                    print(f"⚠️ Nie udało się odczytać odpowiedzi {operation}: {str(e)}")
+                    continue
+                METRICS.inc("timeline_responses", operation=operation)
+                yield operation, payload
+
+    def items(self):
+        items = []
+        for operation, payload in self.responses():
+            for item in timeline_items(payload):
+                if item["tweet_id"] in self._seen:
+                    continue
+                self._seen.add(item["tweet_id"])
+                items.append(item)
+        return items
+
+
+# Przechwytywanie przypisane do sterownika - scrapery sprawdzają je przez get_capture(driver),
+# a sterowniki bez niego (np. z puli fb+ig) dalej używają ekstrakcji z DOM
+_captures = weakref.WeakKeyDictionary()
+
+
+def attach(driver, blocked_urls=BLOCKED_URLS):
+    capture = TimelineCapture(driver).start(blocked_urls)
+    _captures[driver] = capture
+    return capture
+
+
+def get_capture(driver):
+    return _captures.get(driver)
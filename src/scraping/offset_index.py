@@ -0,0 +1,130 @@
+import os
+import json
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from storage import parse_timestamp
+
+# Nagłówek pliku .tsi: zaindeksowana liczba bajtów pliku z postami i liczba wpisów
+HEADER = struct.Struct("<QQ")
+# Ile plików dnia trzymamy w pamięci; sidecar .tsi jest zapisywany po każdym doindeksowaniu,
+# więc usunięty z pamięci indeks wraca z dysku bez ponownego skanu
+DEFAULT_MAX_FILES = 128
+
+
+def index_path(file_path):
+    return os.path.splitext(file_path)[0] + ".tsi"
+
+
+class _FileIndex:
+    def __init__(self):
+        self.covered = 0
+        self.timestamps = array("q")
+        self.offsets = array("Q")
+
+
+class OffsetIndex:
+    """Indeks czasu dla plików JSONL data/<temat>/YYYY/MM/DD.txt.
+
+    Obok pliku dnia trzymamy DD.tsi z parami (czas wpisu w mikrosekundach, offset linii)
+    posortowanymi po czasie. Zapytanie o fragment dnia to dwa bisecty i odczyt tylko
+    pasujących linii zamiast skanu całego pliku. Dopisane linie są doindeksowywane przy
+    następnym zapytaniu, a wpisy bez czytelnego czasu do indeksu nie trafiają.
+    W pamięci jest najwyżej `max_files` ostatnio czytanych plików (LRU).
+    """
+
+    def __init__(self, max_files=DEFAULT_MAX_FILES):
+        self.max_files = max_files
+        self._files = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _load(self, file_path):
+        size = os.path.getsize(file_path)
+        index = self._files.get(file_path)
+        if index is None:
+            index = self._read_sidecar(file_path, size)
+            self._files[file_path] = index
+            if len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+        else:
+            self._files.move_to_end(file_path)
+
+        if size < index.covered:
+            # Plik został skrócony lub podmieniony - indeks trzeba zbudować od nowa
+            index = self._files[file_path] = _FileIndex()
+        if size > index.covered:
+            self._catch_up(file_path, index)
+            self._write_sidecar(file_path, index)
+        return index
+
+    def _read_sidecar(self, file_path, size):
+        index = _FileIndex()
+        sidecar = index_path(file_path)
+        if not os.path.exists(sidecar):
+            return index
+        with open(sidecar, "rb") as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return index
+            covered, count = HEADER.unpack(header)
+            if covered > size:
+                return index
+            timestamps = array("q")
+            offsets = array("Q")
+            try:
+                timestamps.fromfile(f, count)
+                offsets.fromfile(f, count)
+            except EOFError:
+                return index
+        index.covered = covered
+        index.timestamps = timestamps
+        index.offsets = offsets
+        return index
+
+    def _catch_up(self, file_path, index):
+        entries = []
+        offset = index.covered
+        with open(file_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Niedokończona linia - zaindeksujemy ją przy następnym zapytaniu
+                    break
+                try:
+                    timestamp = parse_timestamp(json.loads(line).get("timestamp"))
+                except (ValueError, AttributeError):
+                    timestamp = None
+                if timestamp is not None:
+                    entries.append((timestamp, offset))
+                offset += len(line)
+        index.covered = offset
+        if not entries:
+            return
+        entries.extend(zip(index.timestamps, index.offsets))
+        entries.sort()
+        index.timestamps = array("q", (timestamp for timestamp, _ in entries))
+        index.offsets = array("Q", (offset for _, offset in entries))
+
+    def _write_sidecar(self, file_path, index):
+        sidecar = index_path(file_path)
+        tmp_path = sidecar + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(index.covered, len(index.timestamps)))
+            index.timestamps.tofile(f)
+            index.offsets.tofile(f)
+        os.replace(tmp_path, sidecar)
+
+    def offsets(self, file_path, start=None, end=None):
+        # Offsety linii z czasem w [start, end), rosnąco - odczyt idzie sekwencyjnie po pliku
+        file_path = os.path.normpath(file_path)
+        with self._lock:
+            index = self._load(file_path)
+            lo = bisect_left(index.timestamps, start) if start is not None else 0
+            hi = bisect_left(index.timestamps, end) if end is not None else len(index.timestamps)
+            return sorted(index.offsets[lo:hi])
+
+
+OFFSET_INDEX = OffsetIndex()
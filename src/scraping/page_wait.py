@@ -0,0 +1,99 @@
+import time
+from collections import namedtuple
+
+from metrics import METRICS
+
+# Stan strony: liczba elementów pasujących do selektora i wysokość dokumentu.
+# X wirtualizuje listę (liczba <article> potrafi stać w miejscu), więc postęp
+# rozpoznajemy po wzroście któregokolwiek z nich.
+PageState = namedtuple("PageState", ["count", "height"])
+
+# MutationObserver zapisuje czas ostatniej zmiany DOM - cisza oznacza, że strona skończyła doładowywać
+PROBE_JS = """
+var selector = arguments[0];
+if (!window.__mtObserver) {
+    window.__mtLastMutation = performance.now();
+    window.__mtObserver = new MutationObserver(function () {
+        window.__mtLastMutation = performance.now();
+    });
+    window.__mtObserver.observe(document.documentElement, {childList: true, subtree: true});
+}
+return [
+    document.querySelectorAll(selector).length,
+    document.body ? document.body.scrollHeight : 0,
+    (performance.now() - window.__mtLastMutation) / 1000
+];
+"""
+
+SCROLL_JS = "window.scrollTo(0, document.body.scrollHeight);"
+
+
+def probe(driver, selector):
+    count, height, quiet_for = driver.execute_script(PROBE_JS, selector)
+    return PageState(count, height), quiet_for
+
+
+def _grew(state, previous):
+    return state.count > previous.count or state.height > previous.height
+
+
+def wait_for_content(driver, selector, timeout=15, min_count=1, quiet=0.5, poll=0.1, max_poll=1.0):
+    """Czeka, aż na stronie będzie min_count elementów i DOM ucichnie na `quiet` sekund.
+
+    Zwraca (PageState, czas oczekiwania w sekundach). Po timeoucie zwraca bieżący
+    stan zamiast rzucać wyjątek - decyzję, co dalej, podejmuje scraper.
+    """
+    start = time.monotonic()
+    interval = poll
+    previous = None
+    while True:
+        try:
+            state, quiet_for = probe(driver, selector)
+        except Exception:
+            # Strona jeszcze się przeładowuje - spróbujemy przy następnym odpytaniu
+            state, quiet_for = PageState(0, 0), 0.0
+        elapsed = time.monotonic() - start
+        if (state.count >= min_count and quiet_for >= quiet) or elapsed >= timeout:
+            METRICS.observe("page_load", elapsed)
+            METRICS.inc("pages")
+            if elapsed >= timeout:
+                METRICS.inc("page_timeouts")
+            return state, elapsed
+
+        # Back-off: odpytujemy rzadziej, dopóki na stronie nic się nie dzieje
+        interval = poll if previous is None or _grew(state, previous) else min(interval * 1.5, max_poll)
+        previous = state
+        time.sleep(min(interval, max(0.0, timeout - elapsed)))
+
+
+def scroll_and_wait(driver, selector, previous, timeout=10, quiet=0.5, poll=0.1, max_poll=1.0):
+    """Przewija na dół i czeka na postęp (więcej elementów lub wyższy dokument), a potem na ciszę w DOM.
+
+    Zwraca (PageState, czas oczekiwania). Stan równy `previous` oznacza, że nic nowego się nie pojawiło.
+    """
+    driver.execute_script(SCROLL_JS)
+    start = time.monotonic()
+    interval = poll
+    grown = False
+    state = previous
+    while True:
+        try:
+            state, quiet_for = probe(driver, selector)
+        except Exception:
+            quiet_for = 0.0
+        elapsed = time.monotonic() - start
+        if not grown and _grew(state, previous):
+            grown = True
+            interval = poll
+        if grown and quiet_for >= quiet:
+            METRICS.observe("scroll_wait", elapsed)
+            METRICS.inc("scrolls")
+            return state, elapsed
+        if elapsed >= timeout:
+            METRICS.observe("scroll_wait", elapsed)
+            METRICS.inc("scrolls")
+            return (state if grown else previous), elapsed
+
+        if not grown:
+            interval = min(interval * 1.5, max_poll)
+        time.sleep(min(interval, max(0.0, timeout - elapsed)))
@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import atexit
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from metrics import METRICS
+
+
+def partition_path(topic, date, root="data", extension=".txt"):
+    safe_topic = topic.replace(" ", "_")
+    return os.path.join(root, safe_topic, f"{date.year}", f"{date.month:02d}", f"{date.day:02d}{extension}")
+
+
+class PartitionWriter:
+    """Buforowany zapis linii do plików partycji data/<temat>/YYYY/MM/DD.txt.
+
+    Trzyma LRU otwartych uchwytów, bufor linii per partycja i pamięć istniejących
+    katalogów. Bufor jest zrzucany po przekroczeniu liczby linii, rozmiaru lub czasu,
+    a także przy close() / wyjściu z bloku with / zakończeniu procesu.
+
+    Otwarte pliki mają współdzieloną blokadę flock, więc kompaktacja w innym procesie
+    (exclusive_partition) pomija partycje, do których ten proces właśnie pisze.
+    """
+
+    def __init__(self, max_open_files=64, max_buffered_lines=500,
+                 max_buffered_bytes=4 * 1024 * 1024, flush_interval=5.0):
+        self.max_open_files = max_open_files
+        self.max_buffered_lines = max_buffered_lines
+        self.max_buffered_bytes = max_buffered_bytes
+        self.flush_interval = flush_interval
+
+        self._handles = OrderedDict()
+        self._buffers = {}
+        self._buffered_bytes = 0
+        self._oldest_write = None
+        self._known_dirs = set()
+        self._listeners = []
+        # Partycje przejęte przez hold() - ich bufor czeka, a uchwyt nie jest otwierany
+        self._held = set()
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        self._flusher = None
+
+    def start_background_flush(self):
+        # Zrzut po czasie także wtedy, gdy scraper długo nic nie zapisuje (np. czeka na scroll)
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+
+    def _flush_periodically(self):
+        while not self._stopped.wait(self.flush_interval):
+            with self._lock:
+                due = (self._oldest_write is not None
+                       and time.monotonic() - self._oldest_write >= self.flush_interval)
+            if not due:
+                continue
+            # Błąd zrzutu (np. pełny dysk) nie może zatrzymać wątku - linie zostają w buforze
+            # i kolejna próba zapisze je, gdy miejsce się zwolni
+            try:
+                self.flush()
+            except Exception as e:
+                METRICS.inc("flush_errors")
+                print(f"⚠️ Nie udało się zrzucić buforów zapisu: {str(e)}")
+
+    @contextmanager
+    def hold(self, path):
+        """Wyłączny dostęp do partycji w tym procesie (kompaktacja): zrzuca jej bufor, zamyka uchwyt
+        i do końca bloku nie zapisuje jej na dysk - nowe linie czekają w buforze."""
+        path = os.path.normpath(path)
+        flushed = []
+        try:
+            with self._lock:
+                if path in self._buffers:
+                    flushed.append(self._flush_partition(path))
+                handle = self._handles.pop(path, None)
+                if handle is not None:
+                    handle.close()
+                self._held.add(path)
+        finally:
+            self._notify(flushed)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._held.discard(path)
+
+    def add_flush_listener(self, listener):
+        # listener(path, tags, line_count, start, size) - wywoływany po zrzuceniu partycji na dysk
+        self._listeners.append(listener)
+
+    def write(self, path, line, tag=None):
+        self.write_lines(path, [line], [tag])
+
+    def write_json(self, path, record, tag=None):
+        self.write(path, json.dumps(record, ensure_ascii=False) + "\n", tag)
+
+    def write_lines(self, path, lines, tags=None):
+        path = os.path.normpath(path)
+        if tags is None:
+            tags = [None] * len(lines)
+        flushed = []
+        try:
+            with self._lock:
+                buffer = self._buffers.setdefault(path, [])
+                for line, tag in zip(lines, tags):
+                    data = line.encode("utf-8")
+                    buffer.append((data, tag))
+                    self._buffered_bytes += len(data)
+                if self._oldest_write is None:
+                    self._oldest_write = time.monotonic()
+
+                if len(buffer) >= self.max_buffered_lines and path not in self._held:
+                    flushed.append(self._flush_partition(path))
+                # Zrzut pojedynczej partycji mógł właśnie opróżnić wszystkie bufory (_oldest_write = None)
+                if (self._buffered_bytes >= self.max_buffered_bytes
+                        or (self._oldest_write is not None
+                            and time.monotonic() - self._oldest_write >= self.flush_interval)):
+                    self._flush_all(flushed)
+        finally:
+            # Partycje zrzucone przed ewentualnym błędem i tak trafiają do słuchaczy
+            self._notify(flushed)
+
+    def flush(self):
+        flushed = []
+        try:
+            with self._lock:
+                self._flush_all(flushed)
+        finally:
+            self._notify(flushed)
+
+    def close(self):
+        self._stopped.set()
+        flushed = []
+        try:
+            with self._lock:
+                try:
+                    self._flush_all(flushed)
+                finally:
+                    for handle in self._handles.values():
+                        handle.close()
+                    self._handles.clear()
+        finally:
+            self._notify(flushed)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _flush_all(self, flushed):
+        # Błąd jednej partycji nie blokuje pozostałych; pierwszy błąd zgłaszamy po przejściu wszystkich
+        error = None
+        for path in list(self._buffers):
+            if path in self._held:
+                continue
+            try:
+                flushed.append(self._flush_partition(path))
+            except OSError as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+    def _flush_partition(self, path):
+        buffer = self._buffers.get(path, [])
+        data = b"".join(line for line, _ in buffer)
+        handle = self._handle(path)
+        before = os.fstat(handle.fileno()).st_size
+        start = time.perf_counter()
+        try:
+            handle.write(data)
+            handle.flush()
+        except OSError:
+            self._discard(path, before)
+            raise
+        METRICS.observe("file_write", time.perf_counter() - start)
+        METRICS.inc("bytes_written", len(data))
+        # Bufor usuwamy dopiero po udanym zapisie - po błędzie linie zostają do kolejnej próby,
+        # a ich hashe w DedupIndex nadal odpowiadają temu, co trafi do pliku
+        del self._buffers[path]
+        self._buffered_bytes -= len(data)
+        if not self._buffers:
+            self._oldest_write = None
+        size = os.fstat(handle.fileno()).st_size
+        tags = [tag for _, tag in buffer if tag is not None]
+        return path, tags, len(buffer), size - len(data), size
+
+    def _handle(self, path):
+        handle = self._handles.get(path)
+        if handle is not None:
+            self._handles.move_to_end(path)
+            return handle
+
+        directory = os.path.dirname(path)
+        if directory and directory not in self._known_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._known_dirs.add(directory)
+
+        if len(self._handles) >= self.max_open_files:
+            _, oldest = self._handles.popitem(last=False)
+            oldest.close()
+        handle = _open_shared(path)
+        self._handles[path] = handle
+        return handle
+
+    def _discard(self, path, size):
+        # Po nieudanym zapisie zamykamy uchwyt (jego bufor ma już część danych) i obcinamy plik
+        # do stanu sprzed zapisu, żeby ponowienie nie zostawiło uciętej linii
+        handle = self._handles.pop(path)
+        try:
+            handle.close()
+        except OSError:
+            pass
+        try:
+            os.truncate(path, size)
+        except OSError:
+            pass
+
+    def _notify(self, flushed):
+        for flush in flushed:
+            for listener in self._listeners:
+                listener(*flush)
+
+
+def _open_shared(path):
+    # Otwarcie do dopisywania ze współdzieloną blokadą. Kompaktacja mogła usunąć plik, zanim
+    # dostaliśmy blokadę - wtedy uchwyt wskazuje usunięty i-węzeł i trzeba otworzyć plik od nowa.
+    while True:
+        handle = open(path, "ab")
+        if fcntl is None:
+            return handle
+        fcntl.flock(handle.fileno(), fcntl.LOCK_SH)
+        try:
+            if os.stat(path).st_ino == os.fstat(handle.fileno()).st_ino:
+                return handle
+        except FileNotFoundError:
+            pass
+        handle.close()
+
+
+@contextmanager
+def exclusive_partition(path, writer=None):
+    """Wyłączny dostęp do pliku partycji na czas kompaktacji; zwraca False, gdy trzyma go inny proces.
+
+    W tym procesie bufor partycji jest zrzucany, a uchwyt zamykany (PartitionWriter.hold);
+    inne procesy trzymają współdzieloną blokadę flock na otwartych plikach.
+    """
+    writer = writer or get_writer()
+    with writer.hold(path):
+        if fcntl is None or not os.path.exists(path):
+            yield True
+            return
+        with open(path, "rb") as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                owned = False
+            else:
+                owned = True
+            yield owned
+
+
+_default_writer = None
+_default_lock = threading.Lock()
+
+
+def get_writer():
+    # Wspólny writer dla wszystkich scraperów, zamykany automatycznie przy wyjściu z procesu
+    global _default_writer
+    with _default_lock:
+        if _default_writer is None:
+            _default_writer = PartitionWriter()
+            _default_writer.start_background_flush()
+            atexit.register(_default_writer.close)
+        return _default_writer
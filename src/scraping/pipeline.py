@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import queue
+import asyncio
+import threading
+import contextvars
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+
+from keyword_matcher import INVESTMENT_MATCHER
+from metrics import METRICS
+from storage import get_storage, parse_timestamp
+
+CONFIG_PATH = "config.json"
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL = 5.0
+# Ile ostatnich kluczy (ID) pamięta deduplikacja w strumieniu
+DEFAULT_RECENT_KEYS = 100_000
+
+# Wpis w strumieniu: temat, sam wpis, dzień partycji (None = z czasu utworzenia wpisu), klucz
+# deduplikacji w strumieniu (ID tweeta/posta), czy wpis bez słów kluczowych odpada i czy zapis
+# deduplikuje po tekście (Reddit deduplikuje po ID w stanie crawla)
+Record = namedtuple("Record", "topic post date key require_keywords dedup", defaults=(None, None, True, True))
+
+
+class Checkpoint:
+    # Znacznik w strumieniu: callback() po zrzuceniu na dysk wszystkiego, co było przed nim
+    def __init__(self, callback):
+        self.callback = callback
+
+
+_END = object()
+
+
+def load_pipeline_config(config_path=CONFIG_PATH):
+    # Sekcja "pipeline" w config.json, np. {"queue_size": 1000, "batch_size": 200, "flush_interval": 5}
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("pipeline", {})
+
+
+def filter_keywords(record):
+    # Wpisy z gotowymi słowami kluczowymi przechodzą bez ponownego liczenia (X filtruje już w źródle,
+    # bo od dopasowania zależy pobranie komentarzy)
+    if "keywords" in record.post:
+        return record
+    keywords = INVESTMENT_MATCHER.find(record.post.get("text") or "")
+    if not keywords and record.require_keywords:
+        return None
+    record.post["keywords"] = sorted(keywords)
+    return record
+
+
+class RecentKeys:
+    """Deduplikacja w strumieniu po (temat, klucz) z pamięcią ograniczoną do `size` ostatnich kluczy.
+
+    Łapie ten sam tweet z Twikit i Selenium albo komentarz z dwóch stron statusu, zanim dotrze
+    do zapisu; pełną deduplikację po tekście robi dalej storage.
+    """
+
+    def __init__(self, size=DEFAULT_RECENT_KEYS):
+        self.size = size
+        self._keys = OrderedDict()
+
+    def __call__(self, record):
+        if record.key is None:
+            return record
+        key = (record.topic, str(record.key))
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            METRICS.inc("stream_duplicates")
+            return None
+        self._keys[key] = None
+        if len(self._keys) > self.size:
+            self._keys.popitem(last=False)
+        return record
+
+
+# Etapy mierzone w metrykach (czas paczki wpisów) - nazwy jak w pozostałych modułach
+STAGE_METRICS = {filter_keywords: "keyword_filter"}
+
+
+def assign_partition(record):
+    # Partycja dnia według czasu utworzenia wpisu; bez czasu - dzień podany przez źródło albo dziś
+    micros = parse_timestamp(record.post.get("timestamp"))
+    if micros is not None:
+        return record._replace(date=datetime.fromtimestamp(micros / 1_000_000, timezone.utc))
+    if record.date is None:
+        return record._replace(date=datetime.now(timezone.utc))
+    return record
+
+
+class Pipeline:
+    """Strumień wpisów od scraperów do storage: filtr -> deduplikacja -> wzbogacenie -> zapis.
+
+    Każdy etap działa w osobnym wątku, a etapy łączą kolejki o rozmiarze `queue_size`. Gdy zapis
+    nie nadąża, put() blokuje scraper (backpressure), więc pamięć nie rośnie z długością crawla.
+    Zapis grupuje wpisy po (temat, dzień) w paczki po `batch_size` i co `flush_interval` sekund
+    zrzuca je na dysk. checkpoint(callback) wywołuje callback dopiero po zrzuceniu wszystkich
+    wcześniejszych wpisów - tak zatwierdzamy stan crawla. Błąd etapu wraca do scrapera przy
+    kolejnym put() i z close(); po błędzie checkpointy nie są wywoływane.
+    """
+
+    def __init__(self, stages=None, queue_size=None, batch_size=None, flush_interval=None, storage=None):
+        config = load_pipeline_config()
+        if stages is None:
+            stages = [filter_keywords, RecentKeys(config.get("recent_keys", DEFAULT_RECENT_KEYS)), assign_partition]
+        self.stages = list(stages)
+        self.batch_size = batch_size or config.get("batch_size", DEFAULT_BATCH_SIZE)
+        self.flush_interval = flush_interval or config.get("flush_interval", DEFAULT_FLUSH_INTERVAL)
+        self.storage = storage
+        queue_size = queue_size or config.get("queue_size", DEFAULT_QUEUE_SIZE)
+        # Wpisy przyjęte od scraperów i faktycznie zapisane (po deduplikacji), per temat
+        self.received = {}
+        self.saved = {}
+
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(len(self.stages) + 1)]
+        self._threads = []
+        self._lock = threading.Lock()
+        self._error = None
+
+    def start(self):
+        # Wątki etapów dostają kopię kontekstu wywołującego, więc metryki mają etykiety tematu
+        for stage, source, target in zip(self.stages, self._queues, self._queues[1:]):
+            self._spawn(self._run_stage, stage, source, target)
+        self._spawn(self._run_sink, self._queues[-1])
+        return self
+
+    def _spawn(self, target, *args):
+        context = contextvars.copy_context()
+        thread = threading.Thread(target=context.run, args=(target, *args), daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+
+    def _count(self, record):
+        with self._lock:
+            self.received[record.topic] = self.received.get(record.topic, 0) + 1
+
+    def put(self, record):
+        self._check()
+        self._count(record)
+        self._queues[0].put(record)
+
+    async def put_async(self, record):
+        # Dla źródeł asyncio: pełna kolejka wstrzymuje tylko to zadanie, a nie całą pętlę zdarzeń
+        self._check()
+        self._count(record)
+        while True:
+            try:
+                self._queues[0].put_nowait(record)
+                return
+            except queue.Full:
+                await asyncio.sleep(0.05)
+
+    def checkpoint(self, callback):
+        self._queues[0].put(Checkpoint(callback))
+
+    def close(self):
+        if self._threads:
+            self._queues[0].put(_END)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+        self._check()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        # Także po wyjątku scrapera zapisujemy to, co już jest w kolejkach
+        if exc_type is not None:
+            try:
+                self.close()
+            except Exception as e:
+                print(f"⚠️ Błąd potoku zapisu: {str(e)}")
+            return False
+        self.close()
+        return False
+
+    def _fail(self, error):
+        if self._error is None:
+            self._error = error
+            print(f"❌ Błąd potoku zapisu: {str(error)}")
+
+    def _run_stage(self, stage, source, target):
+        # Etap bierze wszystko, co czeka w kolejce (najwyżej batch_size), i mierzy czas całej paczki -
+        # pomiar każdego wpisu osobno kosztowałby więcej niż filtr słów kluczowych
+        metric = STAGE_METRICS.get(stage)
+        while True:
+            batch = [source.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(source.get_nowait())
+                except queue.Empty:
+                    break
+            output = []
+            records = 0
+            start = time.perf_counter()
+            for item in batch:
+                if item is _END or isinstance(item, Checkpoint):
+                    output.append(item)
+                    continue
+                # Po błędzie tylko opróżniamy kolejkę, żeby scrapery nie zawisły na put()
+                if self._error is not None:
+                    continue
+                records += 1
+                try:
+                    item = stage(item)
+                except Exception as e:
+                    self._fail(e)
+                    continue
+                if item is not None:
+                    output.append(item)
+            if metric is not None and records:
+                METRICS.observe(metric, time.perf_counter() - start)
+            for item in output:
+                target.put(item)
+                if item is _END:
+                    return
+
+    def _run_sink(self, source):
+        batches = {}
+        pending = 0
+        written = False
+        last_flush = time.monotonic()
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                item = source.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, Record) and self._error is None:
+                key = (item.topic, item.date.date(), item.dedup)
+                batches.setdefault(key, (item.date, []))[1].append(item.post)
+                pending += 1
+                if pending >= self.batch_size:
+                    written = self._write(batches) or written
+                    batches, pending = {}, 0
+
+            due = time.monotonic() - last_flush >= self.flush_interval
+            if item is _END or isinstance(item, Checkpoint) or due:
+                written = self._write(batches) or written
+                batches, pending = {}, 0
+                if written and self._error is None:
+                    try:
+                        self._storage().flush()
+                    except Exception as e:
+                        self._fail(e)
+                written = False
+                last_flush = time.monotonic()
+                METRICS.set("pipeline_queued", sum(q.qsize() for q in self._queues))
+                if isinstance(item, Checkpoint) and self._error is None:
+                    try:
+                        item.callback()
+                    except Exception as e:
+                        self._fail(e)
+            if item is _END:
+                return
+
+    def _storage(self):
+        if self.storage is None:
+            self.storage = get_storage()
+        return self.storage
+
+    def _write(self, batches):
+        if not batches or self._error is not None:
+            return False
+        storage = self._storage()
+        try:
+            for (topic, _, dedup), (date, posts) in batches.items():
+                new_posts = storage.append(topic, date, posts, dedup=dedup)
+                if not new_posts:
+                    continue
+                with self._lock:
+                    self.saved[topic] = self.saved.get(topic, 0) + len(new_posts)
+                print(f"💾 Zapisano {len(new_posts)} wpisów dla {topic}: {storage.path(topic, date)}")
+        except Exception as e:
+            self._fail(e)
+        return True
@@ -0,0 +1,251 @@
+import os
+import argparse
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    np = None
+    pd = None
+
+from corpus_reader import iter_batches
+
+PRICES_ROOT = os.path.join("data", "prices")
+ALIGNMENT_ROOT = os.path.join("data", "alignment")
+
+# Klucze tematów tak jak w katalogach data/ (spacje -> "_", bez rozróżniania wielkości liter)
+TOPIC_TICKERS = {
+    "bitcoin": "BTC-USD",
+    "ethereum": "ETH-USD",
+    "litecoin": "LTC-USD",
+    "tesla": "TSLA",
+    "apple": "AAPL",
+    "microsoft": "MSFT",
+    "amazon": "AMZN",
+    "google": "GOOGL",
+    "cd_projekt": "CDR.WA",
+    "allegro": "ALE.WA",
+    "xtb": "XTB.WA",
+    "pzu": "PZU.WA",
+    "zabka": "ZAB.WA",
+}
+
+BUCKETS = {"1m": "1min", "1h": "1h", "1d": "1D"}
+TIME_COLUMNS = ("timestamp", "datetime", "date", "time", "open_time")
+OHLC_AGGREGATIONS = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+
+
+def topic_key(topic):
+    return topic.replace(" ", "_").lower()
+
+
+def ticker_for(topic):
+    ticker = TOPIC_TICKERS.get(topic_key(topic))
+    if ticker is None:
+        raise KeyError(f"Brak tickera dla tematu {topic} - dodaj go do TOPIC_TICKERS")
+    return ticker
+
+
+def storage_topics(topic, root="data"):
+    # Scrapery zapisują ten sam temat jako np. "Zabka" i "zabka" - czytamy wszystkie warianty
+    if not os.path.isdir(root):
+        return []
+    key = topic_key(topic)
+    return sorted(name for name in os.listdir(root)
+                  if name.lower() == key and os.path.isdir(os.path.join(root, name)))
+
+
+def bucket_freq(bucket):
+    # "1m"/"1h"/"1d" albo dowolny alias częstotliwości pandas (np. "15min")
+    return BUCKETS.get(bucket, bucket)
+
+
+def load_prices(ticker, root=PRICES_ROOT):
+    """Świece OHLC z data/prices/<TICKER>.parquet albo .csv, indeksowane czasem UTC."""
+    for extension in (".parquet", ".csv"):
+        path = os.path.join(root, ticker + extension)
+        if os.path.exists(path):
+            frame = pd.read_parquet(path) if extension == ".parquet" else pd.read_csv(path)
+            break
+    else:
+        raise FileNotFoundError(f"Brak notowań dla {ticker}: oczekiwano {root}/{ticker}.parquet lub .csv")
+
+    frame.columns = [str(column).strip().lower().replace(" ", "_") for column in frame.columns]
+    time_column = next((column for column in TIME_COLUMNS if column in frame.columns), None)
+    if time_column is None or "close" not in frame.columns:
+        raise ValueError(f"Plik notowań {path} musi mieć kolumnę czasu ({', '.join(TIME_COLUMNS)}) i 'close'")
+
+    times = frame[time_column]
+    if pd.api.types.is_numeric_dtype(times):
+        # Sekundy albo milisekundy epoki (eksporty giełd krypto używają milisekund)
+        unit = "ms" if times.max() > 1e11 else "s"
+        index = pd.to_datetime(times, unit=unit, utc=True)
+    else:
+        index = pd.to_datetime(times, utc=True)
+    return frame.drop(columns=[time_column]).set_index(index).sort_index()
+
+
+def resample_prices(prices, bucket="1h"):
+    aggregations = {column: how for column, how in OHLC_AGGREGATIONS.items() if column in prices}
+    bars = prices.resample(bucket_freq(bucket), label="left", closed="left").agg(aggregations)
+    bars = bars.dropna(subset=["close"])
+    bars["returns"] = np.log(bars["close"]).diff()
+    return bars
+
+
+def aggregate_posts(topic, bucket="1h", start=None, end=None, root="data"):
+    """Liczba wpisów i średni sentyment tematu w przedziałach czasu [start, end).
+
+    Korpus czytany jest paczkami z corpus_reader, a każda paczka od razu zwija się
+    groupby do sum per przedział, więc w pamięci są tylko sumy, nie wpisy.
+    """
+    freq = bucket_freq(bucket)
+    parts = []
+    topics = storage_topics(topic, root)
+    if topics:
+        for batch in iter_batches(topics, start, end, root=root, columns=("timestamp", "sentiment")):
+            batch = batch.dropna(subset=["timestamp"])
+            if batch.empty:
+                continue
+            scored = batch["sentiment"].notna()
+            sums = pd.DataFrame({
+                "posts": np.ones(len(batch), dtype=np.int64),
+                "scored": scored.to_numpy(dtype=np.int64),
+                "sentiment_sum": batch["sentiment"].fillna(0.0).to_numpy(dtype=np.float64),
+            }, index=batch["timestamp"].dt.floor(freq))
+            parts.append(sums.groupby(level=0).sum())
+
+    if parts:
+        aggregates = pd.concat(parts).groupby(level=0).sum().sort_index()
+    else:
+        aggregates = pd.DataFrame({"posts": [], "scored": [], "sentiment_sum": []},
+                                  index=pd.DatetimeIndex([], tz="UTC"))
+    aggregates.index.name = "bucket"
+    return aggregates
+
+
+def align(bars, aggregates):
+    # Wiersze wyznaczają notowania; przedział bez wpisów ma 0 wpisów i brak sentymentu
+    aligned = bars.join(aggregates[["posts", "scored", "sentiment_sum"]], how="left")
+    aligned[["posts", "scored"]] = aligned[["posts", "scored"]].fillna(0).astype(np.int64)
+    aligned["sentiment_sum"] = aligned["sentiment_sum"].fillna(0.0)
+    aligned["sentiment"] = aligned["sentiment_sum"] / aligned["scored"].where(aligned["scored"] > 0)
+    return aligned
+
+
+def rolling_correlation(aligned, window=24, min_periods=None):
+    # Korelacja Pearsona sentymentu i stóp zwrotu w oknie ostatnich `window` przedziałów
+    min_periods = min_periods or max(3, window // 2)
+    return aligned["sentiment"].rolling(window, min_periods=min_periods).corr(aligned["returns"])
+
+
+def lead_lag_correlation(aligned, max_lag=12):
+    # Dodatni lag: sentyment wyprzedza stopy zwrotu o `lag` przedziałów
+    sentiment = aligned["sentiment"]
+    returns = aligned["returns"]
+    correlations = {lag: sentiment.corr(returns.shift(-lag)) for lag in range(-max_lag, max_lag + 1)}
+    return pd.Series(correlations, name="correlation").rename_axis("lag")
+
+
+class AlignmentEngine:
+    """Sentyment tematu zestawiony z notowaniami jego tickera w przedziałach `bucket`.
+
+    Sumy per przedział są zapisywane w data/alignment/, więc update() czyta z korpusu
+    tylko wpisy od ostatniego (mogło być niepełne) przedziału, a korelacja krocząca
+    liczona jest tylko dla okien obejmujących zmienione przedziały. Dociągnięte wstecz
+    dane (np. backfill Reddita) wymagają update(since=...) od ich początku.
+    """
+
+    def __init__(self, topic, bucket="1h", window=24, root="data", prices_root=PRICES_ROOT,
+                 state_root=ALIGNMENT_ROOT):
+        if pd is None:
+            raise ImportError("Zestawienie z notowaniami wymaga pakietów numpy i pandas")
+        self.topic = topic
+        self.ticker = ticker_for(topic)
+        self.bucket = bucket
+        self.window = window
+        self.root = root
+        self.prices_root = prices_root
+        name = f"{topic_key(topic)}_{bucket}"
+        self.aggregates_path = os.path.join(state_root, name + ".posts.csv")
+        self.aligned_path = os.path.join(state_root, name + ".aligned.csv")
+        self.aggregates = self._read(self.aggregates_path)
+        self.aligned = self._read(self.aligned_path)
+
+    def _read(self, path):
+        if not os.path.exists(path):
+            return None
+        frame = pd.read_csv(path, index_col=0)
+        frame.index = pd.to_datetime(frame.index, utc=True)
+        return frame
+
+    def _write(self, frame, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        frame.to_csv(tmp_path)
+        os.replace(tmp_path, path)
+
+    def update(self, since=None):
+        freq = bucket_freq(self.bucket)
+        if since is None and self.aggregates is not None and len(self.aggregates):
+            since = self.aggregates.index[-1]
+        if since is not None:
+            since = pd.Timestamp(since)
+            since = (since.tz_localize("UTC") if since.tzinfo is None else since.tz_convert("UTC")).floor(freq)
+
+        fresh = aggregate_posts(self.topic, self.bucket, start=since, root=self.root)
+        if since is not None and self.aggregates is not None:
+            fresh = pd.concat([self.aggregates[self.aggregates.index < since], fresh])
+        self.aggregates = fresh.sort_index()
+        self._write(self.aggregates, self.aggregates_path)
+
+        aligned = align(resample_prices(load_prices(self.ticker, self.prices_root), self.bucket), self.aggregates)
+        if since is not None and self.aligned is not None and "rolling_corr" in self.aligned:
+            # Okna kończące się przed `since` się nie zmieniły - liczymy tylko ogon z kontekstem okna
+            position = aligned.index.searchsorted(since)
+            tail = aligned.iloc[max(0, position - self.window + 1):]
+            tail_corr = rolling_correlation(tail, self.window)
+            previous = self.aligned["rolling_corr"]
+            rolling = pd.concat([previous[previous.index < since], tail_corr[tail_corr.index >= since]])
+            aligned["rolling_corr"] = rolling.reindex(aligned.index)
+        else:
+            aligned["rolling_corr"] = rolling_correlation(aligned, self.window)
+        self.aligned = aligned
+        self._write(self.aligned, self.aligned_path)
+        return aligned
+
+    def lead_lag(self, max_lag=12, last=None):
+        # Korelacje z przesunięciem dla całej historii albo ostatnich `last` przedziałów
+        aligned = self.aligned if last is None else self.aligned.tail(last)
+        return lead_lag_correlation(aligned, max_lag)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentyment tematu zestawiony z notowaniami tickera")
+    parser.add_argument("topics", nargs="+", help="tematy, np. Bitcoin Ethereum")
+    parser.add_argument("--bucket", default="1h", help="przedział: 1m, 1h, 1d (domyślnie 1h)")
+    parser.add_argument("--window", type=int, default=24, help="okno korelacji kroczącej w przedziałach")
+    parser.add_argument("--max-lag", type=int, default=12, help="największe przesunięcie dla lead/lag")
+    parser.add_argument("--since", help="przelicz od tej daty (np. po backfillu)")
+    args = parser.parse_args()
+
+    for topic in args.topics:
+        try:
+            engine = AlignmentEngine(topic, args.bucket, args.window)
+            aligned = engine.update(args.since)
+        except (KeyError, FileNotFoundError, ValueError) as e:
+            print(f"⚠️ Pomijam {topic}: {str(e)}")
+            continue
+        if aligned.empty:
+            print(f"📭 Brak notowań {engine.ticker} w zakresie wpisów dla {topic}")
+            continue
+        lead_lag = engine.lead_lag(args.max_lag)
+        print(f"\n📊 {topic} ({engine.ticker}, {args.bucket}): {int(aligned['posts'].sum())} wpisów w "
+              f"{len(aligned)} przedziałach, korelacja krocząca: {aligned['rolling_corr'].iloc[-1]:.3f}")
+        if lead_lag.notna().any():
+            best = lead_lag.abs().idxmax()
+            print(f"   Najsilniejsza korelacja dla przesunięcia {best}: {lead_lag[best]:.3f}")
+
+
+if __name__ == "__main__":
+    main()
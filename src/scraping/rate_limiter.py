@@ -0,0 +1,55 @@
+import time
+import asyncio
+import threading
+
+
+class TokenBucket:
+    """Limiter typu token bucket współdzielony przez wątki jednego klienta API."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, tokens):
+        # Zwraca czas oczekiwania; 0 oznacza, że tokeny zostały pobrane
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause_until(self, reset_timestamp):
+        # Czas resetu z nagłówka x-rate-limit-reset (sekundy epoki)
+        self.pause(max(0.0, reset_timestamp - time.time()))
+
+    def pause(self, seconds):
+        # Serwer zgłosił wyczerpanie limitu - wstrzymujemy wszystkich do czasu resetu
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
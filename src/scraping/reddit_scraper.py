@@ -1,19 +1,57 @@
 import os
 import json
+import time
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-import praw
 
-with open("config.json", encoding="utf-8") as f:
-    config = json.load(f)
+from crawl_state import get_crawl_state
+from keyword_matcher import INVESTMENT_MATCHER, KeywordMatcher
+from metrics import METRICS, labels, start_export
+from pipeline import Pipeline, Record
+from rate_limiter import TokenBucket
 
-reddit_config = config["reddit"]
+CONFIG_PATH = "config.json"
+
+# Limit Reddit API na jednego klienta OAuth i rozmiar strony listingu
+REDDIT_REQUESTS_PER_MINUTE = 100
+LISTING_PAGE_SIZE = 100
+
+# PRAW nie jest bezpieczny wątkowo - każdy wątek dostaje własnego klienta
+_thread_local = threading.local()
+_reddit_config = None
+_config_lock = threading.Lock()
+
+
+def load_reddit_config(config_path=CONFIG_PATH):
+    # Sekcja "reddit" w config.json, wczytywana przy pierwszym kliencie zamiast przy imporcie modułu
+    global _reddit_config
+    with _config_lock:
+        if _reddit_config is None:
+            if not os.path.exists(config_path):
+                raise FileNotFoundError(
+                    f"Plik {config_path} nie istnieje. Utwórz plik z kluczem 'reddit' zawierającym "
+                    "'client_id', 'client_secret' i 'user_agent'.")
+            with open(config_path, encoding="utf-8") as f:
+                _reddit_config = json.load(f)["reddit"]
+        return _reddit_config
+
+
+def get_reddit():
+    client = getattr(_thread_local, "reddit", None)
+    if client is None:
+        # PRAW ładujemy dopiero przy pierwszym zapytaniu, nie przy imporcie modułu
+        import praw
+        reddit_config = load_reddit_config()
+        client = praw.Reddit(
+            client_id=reddit_config["client_id"],
+            client_secret=reddit_config["client_secret"],
+            user_agent=reddit_config["user_agent"]
+        )
+        _thread_local.reddit = client
+    return client
 
-# Konfiguracja Reddit API
-reddit = praw.Reddit(
-    client_id=reddit_config["client_id"],
-    client_secret=reddit_config["client_secret"],
-    user_agent=reddit_config["user_agent"]
-)
 
 # Subreddity finansowe i inwestycyjne
 FINANCE_SUBREDDITS = [
@@ -24,96 +62,259 @@ FINANCE_SUBREDDITS = [
     "Trading", "Daytrading", "inwestowanie", "Polska"
 ]
 
-# Słowa kluczowe związane z inwestowaniem
-INVESTMENT_KEYWORDS = [
-    "akcje", "giełda", "inwestor", "inwestycja", "notowania",
-    "kurs", "spółka", "fundusz", "dividenda", "dividend",
-    "ticker", "share", "stock", "earnings", "IPO",
-    "wykres", "trading", "broker", "forex", "crypto",
-    "bitcoin", "ethereum", "altcoin",
-    "price", "market", "buy", "sell", "hold",
-    "portfolio", "wallet", "exchange", "mining", "blockchain",
-    "cena", "rynek", "kupić", "sprzedać", "trzymać",
-    "portfel", "portfel kryptowalut", "giełda kryptowalut", "kopanie", "blockchain"
-]
+# Subreddity, w których nie wymagamy dodatkowych słów kluczowych
+CORE_FINANCE_SUBREDDITS = {
+    "stocks", "CryptoCurrency", "Bitcoin", "Ethereum",
+    "CryptoMarkets", "altcoin", "inwestowanie"
+}
+
+
+def topic_variants(term):
+    term_lower = term.lower()
+    term_variants = list(set([
+        term, term_lower, term.upper(), term.capitalize()
+    ]))
+    if "zabka" in term_lower:
+        term_variants += ["Żabka", "żabka", "ŻABKA"]
+    return term_variants
+
 
 def build_simple_query(base_terms):
     base_parts = []
     for term in base_terms:
-        term_lower = term.lower()
-        term_variants = list(set([
-            term, term_lower, term.upper(), term.capitalize()
-        ]))
-        if "zabka" in term_lower:
-            term_variants += ["Żabka", "żabka", "ŻABKA"]
-
+        term_variants = topic_variants(term)
         variants_query = " OR ".join(f'"{v}"' for v in term_variants)
         base_parts.append(f"({variants_query})")
 
     return " OR ".join(base_parts)
 
 
+def build_topic_matcher(topics):
+    # Jeden automat dla wszystkich tematów; wariant (małymi literami) -> tematy
+    variant_topics = {}
+    for topic in topics:
+        for variant in topic_variants(topic):
+            variant_topics.setdefault(variant.lower(), []).append(topic)
+    matcher = KeywordMatcher(list(variant_topics), whole_words=True)
+    return matcher, variant_topics
+
+
+def route_topics(text, topic_matcher):
+    matcher, variant_topics = topic_matcher
+    topics = set()
+    for variant in matcher.find(text):
+        topics.update(variant_topics[variant.lower()])
+    return topics
+
+
 def text_contains_investment_keywords(text):
-    text_lower = text.lower()
-    return any(keyword in text_lower for keyword in INVESTMENT_KEYWORDS)
+    return INVESTMENT_MATCHER.contains(text)
+
+
+def throttled(listing, limiter):
+    # Jeden token na każdą stronę listingu, którą PRAW pobiera leniwie; czas pobrania strony
+    # mierzymy na pierwszym elemencie strony (wątki puli nie mają etykiet tematu)
+    iterator = iter(listing)
+    count = 0
+    while True:
+        page_start = count % LISTING_PAGE_SIZE == 0
+        if page_start:
+            limiter.acquire()
+            METRICS.inc("api_requests", api="reddit", platform="reddit")
+            start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            if page_start:
+                METRICS.observe("api_call", time.perf_counter() - start, api="reddit", platform="reddit")
+        count += 1
+        yield item
+
+
+def build_post_entry(post, subreddit_name):
+    # Słowa kluczowe i filtr (poza CORE_FINANCE_SUBREDDITS) liczy potok - zob. subreddit_record
+    full_text = (post.title or "") + "\n" + (post.selftext or "")
+    post_date = datetime.fromtimestamp(post.created_utc, timezone.utc)
+    return post.id, post_date, {
+        "platform": "Reddit",
+        "text": full_text.strip(),
+        "timestamp": post_date.isoformat(),
+        "subreddit": post.subreddit.display_name,
+        "title": post.title,
+        "url": post.url,
+    }
+
+
+def subreddit_record(topic, subreddit_name, post_id, post_date, post_json):
+    # Dla mniej finansowych subredditów wymagamy słów kluczowych; Reddit deduplikuje po ID
+    # zgłoszeń w stanie crawla, nie po tekście
+    return Record(topic, post_json, post_date, key=post_id,
+                  require_keywords=subreddit_name not in CORE_FINANCE_SUBREDDITS, dedup=False)
+
 
-def fetch_and_save_posts(topics, days_back=90, limit_total=1000):
+def harvested_source(topic):
+    # Ten sam post może trafić do kilku tematów, więc zbiór pobranych ID jest osobny dla tematu
+    return f"reddit/{topic}"
+
+
+def record_progress(state, topic, source, subreddit_name, post_ids, newest, error):
+    if topic:
+        state.mark_harvested(harvested_source(topic), post_ids)
+    # High-water mark przesuwamy tylko po pełnym przejściu - po błędzie starsza część
+    # listingu mogłaby zostać pominięta w kolejnym przebiegu
+    if error is None and newest is not None:
+        state.update_high_water(topic, source, subreddit_name, newest.timestamp())
+
+
+def iter_subreddit_posts(subreddit_name, query, cutoff, limit, limiter, known=None, harvested=None):
+    # Generator (id, data, wpis) od najnowszych; known to high-water mark (created_utc)
+    # z poprzedniego przebiegu - na starszym poście kończymy stronicowanie
+    subreddit = get_reddit().subreddit(subreddit_name)
+    gen = subreddit.search(
+        query=query,
+        sort="new",
+        time_filter="year",
+        limit=limit
+    )
+
+    for post in throttled(gen, limiter):
+        if known is not None and post.created_utc < known:
+            break
+        # ⏱️ Pomijamy posty starsze niż days_back dni
+        if post.created_utc < cutoff:
+            continue
+        if harvested is not None and harvested(post.id):
+            continue
+        yield build_post_entry(post, subreddit_name)
+
+
+def collect_subreddit(topic, subreddit_name, posts):
+    # Wątek puli: pobiera posty subreddita do listy - do potoku trafiają w wątku głównym,
+    # w kolejności subredditów, więc wynik nie zależy od liczby wątków. Posty sprzed błędu zostają.
+    records = []
+    post_ids = []
+    newest = None
+    error = None
+    try:
+        for post_id, post_date, post_json in posts:
+            records.append(subreddit_record(topic, subreddit_name, post_id, post_date, post_json))
+            post_ids.append(post_id)
+            newest = post_date if newest is None else max(newest, post_date)
+    except Exception as e:
+        error = e
+        print(f"⚠️ Błąd dla subreddit '{subreddit_name}': {error}")
+    return topic, subreddit_name, records, post_ids, newest, error
+
+
+def fetch_and_save_posts(topics, days_back=90, limit_total=1000, workers=1,
+                         requests_per_minute=REDDIT_REQUESTS_PER_MINUTE, state=None, limiter=None):
+    # limiter pozwala współdzielić limit API między równoległymi wywołaniami (np. w harmonogramie)
+    state = state or get_crawl_state()
     now = datetime.now(timezone.utc)
+    cutoff = (now - timedelta(days=days_back)).timestamp()
+    limit = limit_total // len(FINANCE_SUBREDDITS)
+    limiter = limiter or TokenBucket(requests_per_minute / 60.0, capacity=max(1, workers))
+
+    # Pobieranie równoległe, zapis w kolejności zgłoszeń; za postami subreddita idzie checkpoint,
+    # który zapisuje stan crawla dopiero po zrzuceniu tych postów na dysk
+    with labels(platform="reddit"), Pipeline() as pipeline, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for topic in topics:
+            print(f"\n🔎 Reddit | Temat: {topic}")
+            query = build_simple_query([topic])
+            source = harvested_source(topic)
+            for subreddit_name in FINANCE_SUBREDDITS:
+                posts = iter_subreddit_posts(subreddit_name, query, cutoff, limit, limiter,
+                                             state.high_water(topic, "reddit-search", subreddit_name),
+                                             lambda post_id, source=source: state.is_harvested(source, post_id))
+                futures.append(executor.submit(collect_subreddit, topic, subreddit_name, posts))
+        for future in futures:
+            topic, subreddit_name, records, post_ids, newest, error = future.result()
+            for record in records:
+                pipeline.put(record)
+            pipeline.checkpoint(partial(record_progress, state, topic, "reddit-search", subreddit_name, post_ids,
+                                        newest, error))
+
+    totals = {topic: pipeline.saved.get(topic, 0) for topic in topics}
+    for topic, saved in totals.items():
+        print(f"Zapisano {saved} postów dla tematu: '{topic}'")
+    return totals
 
-    for topic in topics:
-        safe_topic = topic.replace(" ", "_")
-        print(f"\n🔎 Reddit | Temat: {topic}")
-        query = build_simple_query([topic])
-        posts = []
 
+def iter_subreddit_listing(subreddit_name, cutoff, limit, limiter, known=None):
+    # Listing "new" jest posortowany od najnowszych - kończymy na pierwszym starszym
+    # albo znanym z poprzedniego przebiegu poście
+    subreddit = get_reddit().subreddit(subreddit_name)
+    for post in throttled(subreddit.new(limit=limit), limiter):
+        if post.created_utc < cutoff or (known is not None and post.created_utc < known):
+            break
+        yield build_post_entry(post, subreddit_name)
+
+
+def stream_listing(pipeline, state, topic_matcher, marks, subreddit_name, posts):
+    # Routing postów listingu do pasujących tematów; każdy temat dostaje własną kopię wpisu.
+    # marks to high-water marki tematów - temat nie dostaje postów starszych niż własny mark
+    routed = {}
+    newest = None
+    error = None
+    try:
+        for post_id, post_date, post_json in posts:
+            newest = post_date if newest is None else max(newest, post_date)
+            created = post_date.timestamp()
+            for topic in route_topics(post_json["text"], topic_matcher):
+                known = marks.get(topic)
+                if known is not None and created < known:
+                    continue
+                if state.is_harvested(harvested_source(topic), post_id):
+                    continue
+                pipeline.put(subreddit_record(topic, subreddit_name, post_id, post_date, dict(post_json)))
+                routed.setdefault(topic, []).append(post_id)
+    except Exception as e:
+        error = e
+        print(f"⚠️ Błąd dla subreddit '{subreddit_name}': {error}")
+
+    def commit():
+        for topic in marks:
+            record_progress(state, topic, "reddit-new", subreddit_name, routed.get(topic, []), newest, error)
+    pipeline.checkpoint(commit)
+
+
+def listing_marks(state, topics, subreddit_name):
+    # High-water mark per temat; listing czytamy do najstarszego z nich, a temat bez marka
+    # (np. dopisany później do konfiguracji) wymusza pełny odczyt w granicy days_back
+    marks = {topic: state.high_water(topic, "reddit-new", subreddit_name) for topic in topics}
+    known = None if any(mark is None for mark in marks.values()) else min(marks.values(), default=None)
+    return marks, known
+
+
+def route_and_save_posts(topics, days_back=1, limit_per_subreddit=1000, workers=1,
+                         requests_per_minute=REDDIT_REQUESTS_PER_MINUTE, state=None, limiter=None):
+    # Jeden odczyt listingu na subreddit i lokalny routing postów do wszystkich pasujących tematów.
+    # Reddit zwraca najwyżej ~1000 najnowszych postów, więc tryb nadaje się do częstych odświeżeń.
+    now = datetime.now(timezone.utc)
+    cutoff = (now - timedelta(days=days_back)).timestamp()
+    limiter = limiter or TokenBucket(requests_per_minute / 60.0, capacity=max(1, workers))
+    topic_matcher = build_topic_matcher(topics)
+    state = state or get_crawl_state()
+
+    print(f"\n🔎 Reddit | Routing {len(topics)} tematów przez {len(FINANCE_SUBREDDITS)} subredditów")
+    with labels(platform="reddit"), Pipeline() as pipeline, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
         for subreddit_name in FINANCE_SUBREDDITS:
-            try:
-                subreddit = reddit.subreddit(subreddit_name)
-                gen = subreddit.search(
-                    query=query,
-                    sort="new",
-                    time_filter="year",
-                    limit=limit_total // len(FINANCE_SUBREDDITS)
-                )
-
-                for post in gen:
-                    # ⏱️ Pomijamy posty starsze niż days_back dni
-                    if post.created_utc < (now - timedelta(days=days_back)).timestamp():
-                        continue
-
-                    full_text = (post.title or "") + "\n" + (post.selftext or "")
-
-                    # Dodatkowe filtrowanie dla mniej finansowych subredditów
-                    if subreddit_name not in [
-                        "stocks", "CryptoCurrency", "Bitcoin", "Ethereum",
-                        "CryptoMarkets", "altcoin", "inwestowanie"
-                    ]:
-                        if not text_contains_investment_keywords(full_text):
-                            continue
-
-                    post_date = datetime.fromtimestamp(post.created_utc, timezone.utc)
-                    save_path = os.path.join("data", safe_topic, f"{post_date.year}", f"{post_date.month:02d}")
-                    os.makedirs(save_path, exist_ok=True)
-                    filename = f"{post_date.day:02d}.txt"
-
-                    post_json = {
-                        "platform": "Reddit",
-                        "text": full_text.strip(),
-                        "timestamp": post_date.isoformat(),
-                        "subreddit": post.subreddit.display_name,
-                        "title": post.title,
-                        "url": post.url
-                    }
-
-                    with open(os.path.join(save_path, filename), "a", encoding="utf-8") as f:
-                        f.write(json.dumps(post_json, ensure_ascii=False) + "\n")
-
-                    posts.append(post_json)
-
-            except Exception as e:
-                print(f"⚠️ Błąd dla subreddit '{subreddit_name}': {e}")
-
-        print(f"Zapisano {len(posts)} postów dla tematu: '{topic}'")
+            marks, known = listing_marks(state, topics, subreddit_name)
+            posts = iter_subreddit_listing(subreddit_name, cutoff, limit_per_subreddit, limiter, known)
+            futures.append(executor.submit(stream_listing, pipeline, state, topic_matcher, marks,
+                                           subreddit_name, posts))
+        for future in futures:
+            future.result()
+
+    saved = {topic: pipeline.saved.get(topic, 0) for topic in topics}
+    for topic, count in saved.items():
+        print(f"Zapisano {count} postów dla tematu: '{topic}'")
+    return saved
+
 
 if __name__ == "__main__":
     topics = [
@@ -121,4 +322,5 @@ if __name__ == "__main__":
         "Tesla", "Apple", "Microsoft", "Amazon", "Google",
         "CD Projekt", "Allegro", "XTB", "PZU", "zabka"
     ]
-    fetch_and_save_posts(topics=topics, days_back=365, limit_total=1000)
+    start_export()
+    fetch_and_save_posts(topics=topics, days_back=365, limit_total=1000, workers=8)
@@ -0,0 +1,305 @@
+import os
+import json
+import time
+import heapq
+import argparse
+import importlib
+import itertools
+import threading
+
+from metrics import METRICS, labels, profile_run, start_export
+from rate_limiter import TokenBucket
+from storage import get_storage
+from twikit_search import SEARCH_RATE_WINDOW, SEARCH_REQUESTS_PER_WINDOW
+
+CONFIG_PATH = "config.json"
+
+DEFAULT_TOPICS = [
+    "Bitcoin", "Ethereum", "Litecoin",
+    "Tesla", "Apple", "Microsoft", "Amazon", "Google",
+    "CD Projekt", "Allegro", "XTB", "PZU", "zabka"
+]
+
+# Źródło -> budżety platform, które zadanie zajmuje na czas działania.
+# X wyszukuje przez Twikit, ale komentarze i przewijanie idą przez przeglądarki Selenium.
+SOURCES = {
+    "reddit": ("reddit",),
+    "x": ("twikit", "selenium"),
+    "fbig": ("selenium",),
+}
+
+# Limity współbieżności i tempa; nadpisywane sekcją "scheduler" -> "budgets" w config.json.
+# Reddit: 100 zapytań/min na klienta OAuth (jak REDDIT_REQUESTS_PER_MINUTE), Twikit: 50 zapytań
+# na 15 minut na konto, Selenium: strony wyników FB/IG na minutę dla wszystkich przeglądarek.
+DEFAULT_BUDGETS = {
+    "reddit": {"concurrency": 2, "requests_per_minute": 100, "workers": 4},
+    "twikit": {"concurrency": 1, "requests_per_minute": SEARCH_REQUESTS_PER_WINDOW * 60 / SEARCH_RATE_WINDOW,
+               "burst": SEARCH_REQUESTS_PER_WINDOW},
+    "selenium": {"concurrency": 2, "requests_per_minute": 12, "comment_workers": 2},
+}
+
+# Odstępy między przebiegami tematu (sekundy) i liczba nowych wpisów, po której warto wrócić
+MIN_INTERVAL = 5 * 60
+MAX_INTERVAL = 6 * 3600
+DEFAULT_INTERVAL = 30 * 60
+TARGET_POSTS = 20
+# Waga ostatniego przebiegu w średniej kroczącej wpisów na godzinę
+RATE_SMOOTHING = 0.5
+
+REDDIT_DAYS_BACK = 365
+REDDIT_LIMIT_TOTAL = 1000
+FBIG_MAX_POSTS = 10
+
+
+class Budget:
+    """Limit platformy: ile zadań naraz i wspólny token bucket na zapytania albo strony."""
+
+    def __init__(self, name, concurrency=1, requests_per_minute=None, burst=None, **options):
+        self.name = name
+        self.concurrency = concurrency
+        self.options = options
+        self.running = 0
+        self.limiter = None
+        if requests_per_minute:
+            self.limiter = TokenBucket(requests_per_minute / 60.0, capacity=burst or max(1, concurrency))
+
+    @property
+    def available(self):
+        return self.running < self.concurrency
+
+
+class Job:
+    """Para (temat, źródło) z historią wolumenu, na podstawie której liczony jest kolejny termin."""
+
+    def __init__(self, topic, source):
+        self.topic = topic
+        self.source = source
+        self.budgets = SOURCES[source]
+        self.rate = None
+        self.last_run = None
+        self.failures = 0
+
+    @property
+    def priority(self):
+        # Gorętsze tematy (więcej wpisów na godzinę) wygrywają o wolny slot platformy
+        return self.rate or 0.0
+
+    def __repr__(self):
+        return f"{self.source} | {self.topic}"
+
+
+def run_reddit(scheduler, topic):
+    import reddit_scraper
+    budget = scheduler.budgets["reddit"]
+    saved = reddit_scraper.fetch_and_save_posts([topic], days_back=REDDIT_DAYS_BACK,
+                                                limit_total=REDDIT_LIMIT_TOTAL,
+                                                workers=budget.options.get("workers", 1),
+                                                limiter=budget.limiter)
+    return saved.get(topic, 0)
+
+
+def run_x(scheduler, topic):
+    import x_scraper
+    comment_workers = scheduler.budgets["selenium"].options.get("comment_workers", 2)
+    pool = scheduler.pool("x", lambda: x_scraper.create_x_browser_pool(size=comment_workers + 1))
+    return x_scraper.fetch_and_save_topic(topic, pool, comment_workers, scheduler.budgets["twikit"].limiter)
+
+
+def run_fbig(scheduler, topic):
+    from browser_pool import BrowserPool
+    fbig = importlib.import_module("fb+ig_scraper")
+    budget = scheduler.budgets["selenium"]
+    pool = scheduler.pool("fbig", lambda: BrowserPool(fbig.init_driver, size=budget.concurrency))
+    return fbig.scrape_and_save(topic, FBIG_MAX_POSTS, pool, budget.limiter)
+
+
+# Scrapery importujemy dopiero w zadaniu - harmonogram samego Reddita nie wymaga Selenium ani Twikit
+RUNNERS = {
+    "reddit": run_reddit,
+    "x": run_x,
+    "fbig": run_fbig,
+}
+
+
+class Scheduler:
+    """Demon zbierający wszystkie tematy ze wszystkich platform równolegle.
+
+    Kolejka priorytetowa trzyma zadania (temat, źródło) według terminu. Gotowe zadanie startuje
+    we własnym wątku, gdy każdy z jego budżetów ma wolny slot - zajęta platforma czeka, ale nie
+    blokuje pozostałych. Po przebiegu temat wraca do kolejki za tyle, ile przy jego ostatnim
+    wolumenie trwa napłynięcie ~target_posts nowych wpisów (w granicach min/max_interval).
+    """
+
+    def __init__(self, topics=DEFAULT_TOPICS, sources=tuple(SOURCES), budgets=None, min_interval=MIN_INTERVAL,
+                 max_interval=MAX_INTERVAL, default_interval=DEFAULT_INTERVAL, target_posts=TARGET_POSTS,
+                 once=False):
+        unknown = [source for source in sources if source not in SOURCES]
+        if unknown:
+            raise ValueError(f"Nieznane źródła: {', '.join(unknown)} (dostępne: {', '.join(SOURCES)})")
+        budgets = budgets or {}
+        names = {name for source in sources for name in SOURCES[source]}
+        self.budgets = {name: Budget(name, **{**DEFAULT_BUDGETS.get(name, {}), **budgets.get(name, {})})
+                        for name in names}
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.target_posts = target_posts
+        self.once = once
+
+        self._queue = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = set()
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+
+        now = time.monotonic()
+        for topic in topics:
+            for source in sources:
+                self.schedule(Job(topic, source), now)
+
+    @property
+    def pending(self):
+        return len(self._queue)
+
+    def schedule(self, job, when):
+        with self._cond:
+            heapq.heappush(self._queue, (when, next(self._counter), job))
+            self._cond.notify()
+
+    def pool(self, name, factory):
+        # Pule przeglądarek tworzone przy pierwszym zadaniu i współdzielone do końca działania
+        with self._pools_lock:
+            if name not in self._pools:
+                self._pools[name] = factory()
+            return self._pools[name]
+
+    def next_interval(self, job, saved, error, now):
+        if error is not None:
+            job.failures += 1
+            return min(self.max_interval, self.min_interval * 2 ** job.failures)
+        job.failures = 0
+        # Pierwszy przebieg to backfill - jego liczba wpisów nie mówi nic o bieżącym tempie
+        if job.last_run is not None:
+            observed = saved * 3600 / max(now - job.last_run, 1.0)
+            job.rate = observed if job.rate is None else RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * job.rate
+        job.last_run = now
+        if job.rate is None:
+            return self.default_interval
+        if job.rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.target_posts * 3600 / job.rate))
+
+    def _dispatch(self, now):
+        # Gotowe zadania od najgorętszych; te bez wolnego budżetu wracają do kolejki
+        ready = []
+        while self._queue and self._queue[0][0] <= now:
+            ready.append(heapq.heappop(self._queue))
+        ready.sort(key=lambda item: (-item[2].priority, item[0], item[1]))
+        for item in ready:
+            job = item[2]
+            budgets = [self.budgets[name] for name in job.budgets]
+            if not all(budget.available for budget in budgets):
+                heapq.heappush(self._queue, item)
+                continue
+            for budget in budgets:
+                budget.running += 1
+            thread = threading.Thread(target=self._run, args=(job,), name=f"scheduler-{job.source}")
+            self._threads.add(thread)
+            thread.start()
+
+    def _run(self, job):
+        print(f"▶️ Start: {job}")
+        saved, error = 0, None
+        try:
+            with labels(topic=job.topic), profile_run(f"{job.source}-{job.topic}"):
+                saved = RUNNERS[job.source](self, job.topic) or 0
+        except Exception as e:
+            error = e
+        now = time.monotonic()
+        METRICS.inc("jobs", source=job.source, topic=job.topic, status="error" if error else "ok")
+
+        with self._cond:
+            for name in job.budgets:
+                self.budgets[name].running -= 1
+            self._threads.discard(threading.current_thread())
+            delay = self.next_interval(job, saved, error, now)
+            if error is not None:
+                print(f"⚠️ Błąd zadania {job}: {str(error)} - ponowienie za {delay / 60:.0f} min")
+            else:
+                rate = f"{job.rate:.1f}/h" if job.rate is not None else "backfill"
+                print(f"✅ {job}: {saved} nowych wpisów ({rate}), kolejny przebieg za {delay / 60:.0f} min")
+            if not self.once and not self._stop.is_set():
+                heapq.heappush(self._queue, (now + delay, next(self._counter), job))
+            self._cond.notify()
+
+    def run(self):
+        try:
+            with self._cond:
+                while not self._stop.is_set():
+                    if self.once and not self._queue and not self._threads:
+                        break
+                    now = time.monotonic()
+                    self._dispatch(now)
+                    # Budzi nas najbliższy przyszły termin albo koniec któregoś zadania (notify)
+                    future = [when for when, _, _ in self._queue if when > now]
+                    timeout = min(future) - now if future else None
+                    self._cond.wait(min(timeout, 60.0) if timeout is not None else 60.0)
+        except KeyboardInterrupt:
+            print("\n⏹️ Zatrzymuję harmonogram - czekam na trwające zadania")
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            threads = list(self._threads)
+            self._cond.notify_all()
+        for thread in threads:
+            thread.join()
+        with self._pools_lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.close()
+        get_storage().flush()
+
+
+def load_scheduler_config(config_path=CONFIG_PATH):
+    # Sekcja "scheduler" w config.json, np. {"topics": [...], "sources": ["reddit", "x"],
+    # "budgets": {"selenium": {"concurrency": 3}}, "min_interval": 300, "target_posts": 20}
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("scheduler", {})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ciągłe zbieranie wpisów ze wszystkich platform naraz")
+    parser.add_argument("--topics", nargs="+", help="tematy (domyślnie z config.json albo lista wbudowana)")
+    parser.add_argument("--sources", nargs="+", choices=list(SOURCES), help="źródła (domyślnie wszystkie)")
+    parser.add_argument("--once", action="store_true", help="każde zadanie raz, potem koniec")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"], help="profil przebiegów zadań (naraz jeden, równoległe bez profilu)")
+    args = parser.parse_args(argv)
+
+    start_export(profile=args.profile)
+
+    config = load_scheduler_config()
+    scheduler = Scheduler(
+        topics=args.topics or config.get("topics", DEFAULT_TOPICS),
+        sources=args.sources or config.get("sources", tuple(SOURCES)),
+        budgets=config.get("budgets"),
+        min_interval=config.get("min_interval", MIN_INTERVAL),
+        max_interval=config.get("max_interval", MAX_INTERVAL),
+        default_interval=config.get("default_interval", DEFAULT_INTERVAL),
+        target_posts=config.get("target_posts", TARGET_POSTS),
+        once=args.once,
+    )
+    limits = ", ".join(f"{budget.name}: {budget.concurrency} naraz" for budget in scheduler.budgets.values())
+    print(f"🗓️ Harmonogram: {scheduler.pending} zadań ({limits})")
+    scheduler.run()
+
+
+if __name__ == "__main__":
+    main()
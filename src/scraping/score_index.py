@@ -0,0 +1,58 @@
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+# Nagłówek pliku .sent: ocenione bajty pliku z postami i liczba ocenionych linii
+HEADER = struct.Struct("<QQ")
+
+
+def index_path(file_path):
+    return os.path.splitext(file_path)[0] + ".sent"
+
+
+class Scores:
+    """Kolumna ocen dla pliku JSONL: offsety linii (rosnąco) i odpowiadające im oceny."""
+
+    def __init__(self, covered=0, offsets=None, scores=None):
+        self.covered = covered
+        self.offsets = offsets if offsets is not None else array("Q")
+        self.scores = scores if scores is not None else array("f")
+
+    def get(self, offset):
+        i = bisect_left(self.offsets, offset)
+        if i < len(self.offsets) and self.offsets[i] == offset:
+            return self.scores[i]
+        return None
+
+
+def read_scores(file_path):
+    # Oceny z DD.sent; pusty wynik, gdy pliku brak albo nie pasuje do DD.txt (plik skrócony)
+    sidecar = index_path(file_path)
+    if not os.path.exists(sidecar):
+        return Scores()
+    with open(sidecar, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return Scores()
+        covered, count = HEADER.unpack(header)
+        if covered > os.path.getsize(file_path):
+            return Scores()
+        offsets = array("Q")
+        scores = array("f")
+        try:
+            offsets.fromfile(f, count)
+            scores.fromfile(f, count)
+        except EOFError:
+            return Scores()
+    return Scores(covered, offsets, scores)
+
+
+def write_scores(file_path, scores):
+    sidecar = index_path(file_path)
+    tmp_path = sidecar + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(scores.covered, len(scores.offsets)))
+        scores.offsets.tofile(f)
+        scores.scores.tofile(f)
+    os.replace(tmp_path, sidecar)
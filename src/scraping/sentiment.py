@@ -0,0 +1,280 @@
+import os
+import re
+import json
+import hashlib
+import argparse
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+from columnar_store import pa, partition_files, read_table, write_table
+from corpus_reader import iter_partitions
+from dedup_index import text_hash
+from score_index import read_scores, write_scores
+
+SENTIMENT_CACHE_PATH = os.path.join("data", "sentiment_cache.npz")
+BATCH_SIZE = 10_000
+
+# Słowa dłuższe niż MAX_TOKEN_LENGTH są obcinane - żadne hasło słownika nie jest dłuższe
+MAX_TOKEN_LENGTH = 24
+# Zmiana klucza cache (dawniej hash grupy bliskich duplikatów, teraz hash tekstu) unieważnia zapisane oceny
+CACHE_KEY_VERSION = 2
+TOKEN_RE = re.compile(r"[^\W\d_]+")
+
+# Normalizacja jak w VADER: suma wag -> (-1, 1), ALPHA ≈ suma, przy której wynik to ~0.7
+ALPHA = 15.0
+
+# Zaprzeczenie odwraca znak następnego słowa ("nie rośnie", "not bullish")
+NEGATIONS = ("nie", "not", "never", "nigdy", "ani", "no")
+
+# Hasła z "*" na końcu to rdzenie dopasowywane po prefiksie (polska fleksja: zysk, zysku, zyski...).
+# Rdzenie nie mogą być prefiksami innych rdzeni, a dokładne hasła mają pierwszeństwo.
+LEXICON = {
+    # English
+    "bullish": 1.0, "bull": 0.6, "bulls": 0.6, "moon": 0.8, "mooning": 0.9, "rally": 0.7,
+    "surge": 0.7, "surged": 0.7, "soar": 0.8, "soared": 0.8, "gain*": 0.5, "profit*": 0.6,
+    "buy": 0.4, "buying": 0.4, "breakout": 0.6, "uptrend": 0.7, "ath": 0.6, "hodl": 0.4,
+    "strong": 0.4, "growth": 0.5, "outperform*": 0.6, "upgrade*": 0.5, "recover*": 0.5,
+    "undervalued": 0.5, "adoption": 0.4, "beat": 0.3, "green": 0.3,
+    "bearish": -1.0, "bear": -0.6, "bears": -0.6, "crash*": -1.0, "dump*": -0.7, "sell": -0.4,
+    "selling": -0.4, "loss*": -0.6, "lose": -0.5, "losing": -0.5, "drop*": -0.5, "fall": -0.5,
+    "falling": -0.5, "plunge*": -0.9, "collapse*": -0.9, "scam*": -0.9, "fraud*": -1.0,
+    "rekt": -0.8, "fud": -0.5, "downtrend": -0.7, "liquidat*": -0.6, "bankrupt*": -1.0,
+    "hack": -0.7, "hacked": -0.8, "fear": -0.5, "panic*": -0.8, "weak": -0.4,
+    "downgrade*": -0.5, "recession": -0.7, "overvalued": -0.5, "bubble": -0.6, "red": -0.3,
+    # Polski
+    "wzrost*": 0.6, "rośnie": 0.5, "rosną": 0.5, "wzrośnie": 0.6, "zysk*": 0.6, "hoss*": 1.0,
+    "zarobi*": 0.5, "kupuj*": 0.4, "kupić": 0.4, "odbici*": 0.5, "rekord*": 0.5, "silny": 0.4,
+    "silne": 0.4, "świetn*": 0.6, "zwyżk*": 0.6, "okazj*": 0.4, "dywidend*": 0.3,
+    "bess*": -1.0, "spad*": -0.5, "strat*": -0.6, "krach*": -1.0, "tąpnięci*": -0.9,
+    "upadł*": -0.9, "upadek": -0.9, "bankructw*": -1.0, "oszust*": -1.0, "oszukańcz*": -0.9,
+    "ryzyk*": -0.3, "panik*": -0.8, "słab*": -0.4, "sprzedaj*": -0.4, "przecen*": -0.4,
+    "źle": -0.4, "kryzys*": -0.7, "recesj*": -0.7, "inflacj*": -0.3, "dno": -0.5,
+    "bańk*": -0.6, "manipulacj*": -0.7,
+}
+
+
+def lexicon_version(lexicon):
+    # Zmiana słownika unieważnia zapisane oceny
+    payload = json.dumps(sorted(lexicon.items()), ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+class LexiconScorer:
+    """Wektorowa ocena sentymentu słownikiem polsko-angielskich terminów finansowych.
+
+    Tokeny całej paczki trafiają do jednej tablicy NumPy i są mapowane na hasła słownika
+    przez searchsorted (dokładne hasła i rdzenie). Z dopasowań powstaje rzadka macierz
+    wpis x hasło, a suma wag to iloczyn tej macierzy z wektorem wag - bez pętli po słowach.
+    """
+
+    def __init__(self, lexicon=LEXICON):
+        if np is None:
+            raise ImportError("Ocena sentymentu wymaga pakietu numpy")
+        exact = sorted((term, weight) for term, weight in lexicon.items() if not term.endswith("*"))
+        stems = sorted((term[:-1], weight) for term, weight in lexicon.items() if term.endswith("*"))
+        self.version = lexicon_version(lexicon)
+        self.vocab = np.array([term for term, _ in exact], dtype=f"<U{MAX_TOKEN_LENGTH}")
+        self.stems = np.array([stem for stem, _ in stems], dtype=f"<U{MAX_TOKEN_LENGTH}")
+        self.weights = np.array([weight for _, weight in exact + stems], dtype=np.float64)
+        self.negations = np.array(sorted(NEGATIONS), dtype=f"<U{MAX_TOKEN_LENGTH}")
+
+    def _lookup(self, tokens, table):
+        # Indeks dokładnego trafienia w posortowanej tabeli albo -1
+        if len(table) == 0:
+            return np.full(len(tokens), -1)
+        index = np.minimum(np.searchsorted(table, tokens), len(table) - 1)
+        return np.where(table[index] == tokens, index, -1)
+
+    def score(self, texts):
+        count = len(texts)
+        token_lists = [TOKEN_RE.findall(text.lower()) if text else [] for text in texts]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=count)
+        tokens = np.array(list(chain.from_iterable(token_lists)), dtype=f"<U{MAX_TOKEN_LENGTH}")
+        if len(tokens) == 0:
+            return np.zeros(count, dtype=np.float32)
+        rows = np.repeat(np.arange(count), lengths)
+
+        terms = self._lookup(tokens, self.vocab)
+        if len(self.stems):
+            # Ostatni rdzeń <= token w porządku leksykograficznym; pasuje, jeśli jest prefiksem tokenu
+            stem_index = np.searchsorted(self.stems, tokens, side="right") - 1
+            candidates = self.stems[np.maximum(stem_index, 0)]
+            stem_match = (stem_index >= 0) & np.char.startswith(tokens, candidates)
+            terms = np.where((terms < 0) & stem_match, len(self.vocab) + stem_index, terms)
+
+        negated = np.zeros(len(tokens), dtype=bool)
+        is_negation = self._lookup(tokens, self.negations) >= 0
+        negated[1:] = is_negation[:-1] & (rows[1:] == rows[:-1])
+
+        matched = terms >= 0
+        signs = np.where(negated[matched], -1.0, 1.0)
+        if sparse is not None:
+            matrix = sparse.csr_matrix((signs, (rows[matched], terms[matched])),
+                                       shape=(count, len(self.weights)))
+            raw = matrix @ self.weights
+        else:
+            raw = np.bincount(rows[matched], weights=signs * self.weights[terms[matched]], minlength=count)
+        return (raw / np.sqrt(raw * raw + ALPHA)).astype(np.float32)
+
+
+class ScoreCache:
+    """Oceny zapamiętane po hashu tekstu (text_hash), trzymane jako posortowane tablice.
+
+    Wyszukiwanie całej paczki to jedno searchsorted, więc powtórne przebiegi i te same
+    teksty w wielu tematach nie są oceniane drugi raz.
+    """
+
+    def __init__(self, version, path=SENTIMENT_CACHE_PATH):
+        self.version = version
+        self.path = path
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self._new_hashes = []
+        self._new_scores = []
+        if os.path.exists(path):
+            with np.load(path) as cache:
+                if str(cache["version"]) == version:
+                    self.hashes = cache["hashes"]
+                    self.scores = cache["scores"]
+
+    def lookup(self, hashes):
+        scores = np.zeros(len(hashes), dtype=np.float32)
+        if len(self.hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool), scores
+        index = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+        found = self.hashes[index] == hashes
+        scores[found] = self.scores[index[found]]
+        return found, scores
+
+    def add(self, hashes, scores):
+        self._new_hashes.append(hashes)
+        self._new_scores.append(scores)
+        if sum(map(len, self._new_hashes)) >= 10 * BATCH_SIZE:
+            self._merge()
+
+    def _merge(self):
+        if not self._new_hashes:
+            return
+        hashes = np.concatenate([self.hashes, *self._new_hashes])
+        scores = np.concatenate([self.scores, *self._new_scores])
+        self.hashes, first = np.unique(hashes, return_index=True)
+        self.scores = scores[first]
+        self._new_hashes = []
+        self._new_scores = []
+
+    def save(self):
+        self._merge()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(tmp_path, version=np.array(self.version), hashes=self.hashes, scores=self.scores)
+        os.replace(tmp_path, self.path)
+
+
+class SentimentPipeline:
+    """Etap oceny sentymentu: paczki tekstów -> cache po hashu -> LexiconScorer dla reszty."""
+
+    def __init__(self, scorer=None, cache=None):
+        self.scorer = scorer or LexiconScorer()
+        self.cache = cache or ScoreCache(f"{self.scorer.version}-{CACHE_KEY_VERSION}")
+        self.scored = 0
+        self.cached = 0
+
+    def score_texts(self, texts):
+        # Cache po hashu własnego tekstu wpisu, a nie po polu "cluster" - bliskie duplikaty różnią się
+        # często tylko przeczeniem ("not bullish"), więc ocena innego tekstu z grupy byłaby błędna
+        hashes = np.fromiter((text_hash(text or "") for text in texts), dtype=np.uint64, count=len(texts))
+        unique, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+        found, scores = self.cache.lookup(unique)
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            new_scores = self.scorer.score([texts[i] for i in first[missing]])
+            scores[missing] = new_scores
+            self.cache.add(unique[missing], new_scores)
+        self.scored += len(missing)
+        self.cached += len(texts) - len(missing)
+        return scores[inverse]
+
+    def score_jsonl(self, path):
+        # Ocenia tylko linie dopisane od ostatniego przebiegu i dopisuje je do DD.sent
+        scores = read_scores(path)
+        offsets = []
+        texts = []
+        position = scores.covered
+        with open(path, "rb") as f:
+            f.seek(position)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                    text = record.get("text")
+                except (ValueError, AttributeError):
+                    text = None
+                if text is not None:
+                    offsets.append(position)
+                    texts.append(text)
+                position += len(line)
+        if position == scores.covered:
+            return 0
+
+        for i in range(0, len(texts), BATCH_SIZE):
+            batch = slice(i, i + BATCH_SIZE)
+            scores.scores.extend(self.score_texts(texts[batch]).tolist())
+        scores.offsets.extend(offsets)
+        scores.covered = position
+        write_scores(path, scores)
+        return len(texts)
+
+    def score_parquet(self, path):
+        # Kolumna "sentiment" w samym pliku; przepisujemy go tylko, gdy są wiersze bez oceny
+        table = read_table(path)
+        column = table.column("sentiment")
+        if column.null_count == 0:
+            return 0
+        texts = table.column("text").to_pylist()
+        values = column.to_numpy(zero_copy_only=False).astype(np.float32)
+        missing = np.flatnonzero(np.isnan(values))
+        for i in range(0, len(missing), BATCH_SIZE):
+            chunk = missing[i:i + BATCH_SIZE]
+            values[chunk] = self.score_texts([texts[j] for j in chunk])
+        index = table.schema.get_field_index("sentiment")
+        table = table.set_column(index, "sentiment", pa.array(values, type=pa.float32()))
+        write_table(table, path)
+        return len(missing)
+
+    def score_corpus(self, topics=None, root="data"):
+        posts = 0
+        for _, _, base in iter_partitions(topics, root=root):
+            legacy = base + ".txt"
+            if os.path.exists(legacy):
+                posts += self.score_jsonl(legacy)
+            for path in partition_files(base):
+                posts += self.score_parquet(path)
+        self.cache.save()
+        return posts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ocena sentymentu zapisanych wpisów (kolumna sentiment)")
+    parser.add_argument("--root", default="data", help="katalog z danymi (domyślnie data)")
+    parser.add_argument("topics", nargs="*", help="tematy do oceny (domyślnie wszystkie)")
+    args = parser.parse_args()
+
+    pipeline = SentimentPipeline()
+    posts = pipeline.score_corpus(args.topics or None, args.root)
+    print(f"📈 Oceniono {posts} wpisów: {pipeline.scored} nowych tekstów, {pipeline.cached} z cache")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import threading
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+    InvalidToken = None
+
+CONFIG_PATH = "config.json"
+SESSION_CACHE_PATH = os.path.join("data", "sessions", "sessions.enc")
+# Klucz poza katalogiem danych, żeby kopia data/ nie zawierała działających ciasteczek
+SESSION_KEY_PATH = os.path.join(os.path.expanduser("~"), ".config", "market-trading", "session.key")
+SESSION_KEY_ENV = "MARKET_SESSION_KEY"
+# Klucz Fernet to 32 bajty w base64 (urlsafe)
+KEY_LENGTH = 44
+
+# Ponowne logowanie najwyżej raz na dobę, nawet jeśli X nadal akceptuje ciasteczka
+DEFAULT_MAX_AGE = 24 * 3600
+# Ciasteczka, bez których sesja X nie jest zalogowana (auth_token) albo nie przejdzie CSRF (ct0)
+AUTH_COOKIES = ("auth_token", "ct0")
+X_COOKIE_DOMAIN = ".x.com"
+
+
+def load_session_config(config_path=CONFIG_PATH):
+    # Sekcja "sessions" w config.json, np. {"path": "data/sessions/sessions.enc",
+    # "key_file": "~/.config/market-trading/session.key", "max_age_hours": 24}
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("sessions", {})
+
+
+def twikit_cookies(cookies):
+    # Twikit (httpx) przyjmuje słownik nazwa -> wartość
+    return {cookie["name"]: cookie["value"] for cookie in cookies}
+
+
+def selenium_cookies(cookies, domain=X_COOKIE_DOMAIN):
+    # Lista ciasteczek w formacie driver.get_cookies(); słownik z Twikit dostaje domenę X
+    if isinstance(cookies, dict):
+        return [{"name": name, "value": value, "domain": domain, "path": "/", "secure": True}
+                for name, value in cookies.items()]
+    return [dict(cookie) for cookie in cookies]
+
+
+def _load_key_file(key_path, attempts=50):
+    # Inny proces mógł właśnie utworzyć plik i jeszcze nie zapisać klucza - czekamy chwilę na treść
+    for _ in range(attempts):
+        with open(key_path, "rb") as f:
+            key = f.read().strip()
+        if len(key) >= KEY_LENGTH:
+            return key
+        time.sleep(0.02)
+    raise ValueError(f"Niepełny klucz pamięci sesji: {key_path}")
+
+
+def _read_key(key_path):
+    key = os.environ.get(SESSION_KEY_ENV)
+    if key:
+        return key.encode("ascii")
+    if os.path.exists(key_path):
+        return _load_key_file(key_path)
+    directory = os.path.dirname(key_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    key = Fernet.generate_key()
+    try:
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Równoległy proces utworzył klucz pierwszy - używamy jego klucza, inaczej nie odczytalibyśmy jego sesji
+        return _load_key_file(key_path)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    print(f"🔑 Utworzono klucz pamięci sesji: {key_path}")
+    return key
+
+
+class SessionCache:
+    """Zaszyfrowana pamięć podręczna sesji logowania i ścieżek sterowników przeglądarki.
+
+    Ciasteczka konta X są wspólne dla Twikit i Selenium - zalogowanie jednym klientem
+    wystarcza drugiemu. Sesja jest ważna `max_age` sekund od zalogowania albo do wygaśnięcia
+    ciasteczek autoryzacji. Plik szyfruje Fernet (pakiet cryptography) kluczem ze zmiennej
+    MARKET_SESSION_KEY albo z pliku klucza; bez cryptography sesje żyją tylko w pamięci procesu.
+    """
+
+    def __init__(self, path=SESSION_CACHE_PATH, key_path=SESSION_KEY_PATH, max_age=DEFAULT_MAX_AGE):
+        self.path = path
+        self.key_path = os.path.expanduser(key_path)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._named_locks = {}
+        self._fernet = None
+        self._data = None
+
+    def _load(self):
+        if self._data is not None:
+            return self._data
+        self._data = {"accounts": {}, "drivers": {}}
+        if Fernet is None:
+            print("⚠️ Brak pakietu cryptography - sesje i ścieżki sterowników tylko w pamięci procesu")
+            return self._data
+        self._fernet = Fernet(_read_key(self.key_path))
+        if not os.path.exists(self.path):
+            return self._data
+        with open(self.path, "rb") as f:
+            token = f.read()
+        try:
+            self._data.update(json.loads(self._fernet.decrypt(token)))
+        except (InvalidToken, ValueError):
+            print(f"⚠️ Nie można odczytać pamięci sesji {self.path} (inny klucz?) - zaczynam od zera")
+        return self._data
+
+    def _save(self):
+        if self._fernet is None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        token = self._fernet.encrypt(json.dumps(self._data).encode("utf-8"))
+        tmp_path = self.path + ".tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(token)
+        os.replace(tmp_path, self.path)
+
+    def _named_lock(self, key):
+        with self._lock:
+            return self._named_locks.setdefault(key, threading.Lock())
+
+    def login_lock(self, account):
+        # Jedno logowanie naraz na konto - pozostałe przeglądarki puli czekają i biorą gotowe ciasteczka
+        return self._named_lock(("login", account))
+
+    def _expired(self, session, now):
+        if now - session["created"] >= self.max_age:
+            return True
+        names = {cookie["name"] for cookie in session["cookies"]}
+        if not all(name in names for name in AUTH_COOKIES):
+            return True
+        return any(cookie.get("expiry") is not None and cookie["expiry"] <= now
+                   for cookie in session["cookies"] if cookie["name"] in AUTH_COOKIES)
+
+    def cookies(self, account):
+        """Ciasteczka ważnej sesji konta (format Selenium) albo None, gdy trzeba się zalogować."""
+        with self._lock:
+            session = self._load()["accounts"].get(account)
+            if session is None or self._expired(session, time.time()):
+                return None
+            return [dict(cookie) for cookie in session["cookies"]]
+
+    def save(self, account, cookies, source):
+        # `cookies` z driver.get_cookies() albo client.get_cookies() z Twikit
+        with self._lock:
+            self._load()["accounts"][account] = {
+                "cookies": selenium_cookies(cookies),
+                "created": time.time(),
+                "source": source,
+            }
+            self._save()
+
+    def invalidate(self, account):
+        with self._lock:
+            if self._load()["accounts"].pop(account, None) is not None:
+                self._save()
+
+    def driver_path(self, name, resolve):
+        """Ścieżka sterownika `name`; resolve() (np. ChromeDriverManager.install) tylko gdy brak pliku.
+
+        resolve() może pobierać sterownik, więc działa pod blokadą tego sterownika, a nie całej
+        pamięci - cookies() i save() w innych wątkach nie czekają na pobieranie.
+        """
+        with self._named_lock(("driver", name)):
+            with self._lock:
+                path = self._load()["drivers"].get(name)
+            if path and os.path.exists(path):
+                return path
+            path = resolve()
+            with self._lock:
+                self._data["drivers"][name] = path
+                self._save()
+            return path
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_session_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            config = load_session_config()
+            _default_cache = SessionCache(config.get("path", SESSION_CACHE_PATH),
+                                          config.get("key_file", SESSION_KEY_PATH),
+                                          config.get("max_age_hours", DEFAULT_MAX_AGE / 3600) * 3600)
+        return _default_cache
@@ -0,0 +1,182 @@
+import os
+import json
+import atexit
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from dedup_index import DEDUP_INDEX, text_hash
+from metrics import METRICS
+from near_dedup import DEFAULT_MAX_ENTRIES, DEFAULT_THRESHOLD, NEAR_DUPLICATES_FILE, NearDuplicateIndex
+from partition_writer import get_writer, partition_path
+
+CONFIG_PATH = "config.json"
+DEFAULT_BACKEND = "jsonl"
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Format created_at z Twikit, np. "Wed Oct 10 20:19:24 +0000 2018"
+TWITTER_TIME_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+
+
+def parse_timestamp(value):
+    # Mikrosekundy od epoki (UTC) z formatów, które zapisują scrapery: ISO 8601, str(datetime),
+    # created_at z Twikit i sekundy epoki. Czas bez strefy traktujemy jako UTC; None, gdy się nie da.
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value * 1_000_000)
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        text = str(value).strip()
+        try:
+            moment = datetime.fromisoformat(text)
+        except ValueError:
+            try:
+                moment = datetime.strptime(text, TWITTER_TIME_FORMAT)
+            except ValueError:
+                return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    delta = moment - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def parquet_names(base):
+    # Nazwy plików Parquet dnia (DD.parquet po kompaktacji i DD.part-*.parquet) bez importu pyarrow
+    directory, day = os.path.split(base)
+    if not os.path.isdir(directory):
+        return ()
+    return tuple(sorted(name for name in os.listdir(directory)
+                        if name.startswith(day + ".") and name.endswith(".parquet")))
+
+
+class JsonlStorage:
+    """Dotychczasowy układ: linie JSON w data/<temat>/YYYY/MM/DD.txt z indeksem DD.idx.
+
+    Dzień skompaktowany do DD.parquet (columnar_store) nie ma już DD.txt ani DD.idx, więc
+    deduplikacja sprawdza też hashe tekstów z plików Parquet tego dnia.
+    """
+
+    name = "jsonl"
+    extension = ".txt"
+
+    def __init__(self, root="data", near_duplicates=None, max_compacted=64):
+        self.root = root
+        self.near_duplicates = near_duplicates
+        self.max_compacted = max_compacted
+        # base -> (nazwy plików Parquet, hashe tekstów); LRU jak uchwyty w PartitionWriter
+        self._compacted = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, topic, date):
+        return partition_path(topic, date, self.root, self.extension)
+
+    def append(self, topic, date, posts, dedup=True):
+        # Zwraca wpisy faktycznie przyjęte do zapisu (po deduplikacji po tekście)
+        path = self.path(topic, date)
+        posts = mark_near_duplicates(self.near_duplicates, posts)
+        if dedup:
+            known = self._compacted_hashes(os.path.splitext(path)[0])
+            if known:
+                posts = [post for post in posts if text_hash(post["text"]) not in known]
+            posts = DEDUP_INDEX.append(path, posts)
+        else:
+            get_writer().write_lines(path, [json.dumps(post, ensure_ascii=False) + "\n" for post in posts])
+        count_saved(topic, posts)
+        return posts
+
+    def _compacted_hashes(self, base):
+        # Lista plików jest częścią klucza - kompaktacja w innym procesie zmienia ją i wymusza ponowny odczyt
+        names = parquet_names(base)
+        if not names:
+            return None
+        with self._lock:
+            cached = self._compacted.get(base)
+            if cached is not None and cached[0] == names:
+                self._compacted.move_to_end(base)
+                return cached[1]
+        from columnar_store import known_text_hashes, pa
+        if pa is None:
+            # Ostrzeżenie raz na zestaw plików - pusty zbiór trafia do pamięci jak zwykły wynik
+            print(f"⚠️ Dzień {base} ma pliki Parquet, ale bez pyarrow nie można ich sprawdzić przy deduplikacji")
+            known = set()
+        else:
+            known = known_text_hashes(base)
+        with self._lock:
+            self._compacted[base] = (names, known)
+            if len(self._compacted) > self.max_compacted:
+                self._compacted.popitem(last=False)
+        return known
+
+    def flush(self):
+        get_writer().flush()
+        if self.near_duplicates is not None:
+            self.near_duplicates.flush()
+
+    def close(self):
+        get_writer().close()
+        if self.near_duplicates is not None:
+            self.near_duplicates.close()
+
+
+def mark_near_duplicates(index, posts):
+    # Bliskie duplikaty (crossposty, retweety, zagnieżdżone divy FB) dostają wspólne pole "cluster"
+    posts = list(posts)
+    if index is not None:
+        index.mark(posts)
+    return posts
+
+
+def count_saved(topic, posts):
+    # Licznik zapisanych wpisów per temat i źródło wpisu (np. X-Twikit i X-Selenium osobno)
+    sources = {}
+    for post in posts:
+        source = post.get("platform", "")
+        sources[source] = sources.get(source, 0) + 1
+    for source, count in sources.items():
+        METRICS.inc("posts_saved", count, topic=topic, source=source)
+
+
+def load_storage_config(config_path=CONFIG_PATH):
+    # Sekcja "storage" w config.json, np. {"backend": "parquet", "root": "data",
+    # "near_duplicate_threshold": 0.95, "near_duplicate_window": 500000}; "near_duplicates": false
+    # wyłącza grupowanie
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("storage", {})
+
+
+def create_storage(backend=None, root=None):
+    config = load_storage_config()
+    backend = backend or config.get("backend", DEFAULT_BACKEND)
+    root = root or config.get("root", "data")
+    near_duplicates = None
+    if config.get("near_duplicates", True):
+        near_duplicates = NearDuplicateIndex(os.path.join(root, NEAR_DUPLICATES_FILE),
+                                             config.get("near_duplicate_threshold", DEFAULT_THRESHOLD),
+                                             config.get("near_duplicate_window", DEFAULT_MAX_ENTRIES))
+    if backend == "jsonl":
+        return JsonlStorage(root, near_duplicates)
+    if backend == "parquet":
+        from columnar_store import ParquetStorage, pa
+        if pa is None:
+            print("⚠️ Backend 'parquet' wymaga pakietu pyarrow - zapisuję w JSONL")
+            return JsonlStorage(root, near_duplicates)
+        return ParquetStorage(root, near_duplicates=near_duplicates)
+    raise ValueError(f"Nieznany backend zapisu: {backend} (dostępne: jsonl, parquet)")
+
+
+_default_storage = None
+_default_lock = threading.Lock()
+
+
+def get_storage():
+    # Wspólny backend zapisu dla wszystkich scraperów, wybierany w config.json
+    global _default_storage
+    with _default_lock:
+        if _default_storage is None:
+            _default_storage = create_storage()
+            atexit.register(_default_storage.close)
+        return _default_storage
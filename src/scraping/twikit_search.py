@@ -0,0 +1,165 @@
+import time
+import asyncio
+import inspect
+from datetime import date, datetime, timedelta, timezone
+
+from metrics import METRICS
+from rate_limiter import TokenBucket
+
+# Limit SearchTimeline dla jednego konta: 50 zapytań na 15 minut
+SEARCH_REQUESTS_PER_WINDOW = 50
+SEARCH_RATE_WINDOW = 15 * 60
+
+
+class SessionExpired(Exception):
+    """X odrzucił ciasteczka sesji (401) - trzeba zalogować się ponownie."""
+
+
+def search_limiter():
+    return TokenBucket(SEARCH_REQUESTS_PER_WINDOW / SEARCH_RATE_WINDOW, capacity=SEARCH_REQUESTS_PER_WINDOW)
+
+
+def _tomorrow():
+    return datetime.now(timezone.utc).date() + timedelta(days=1)
+
+
+def month_windows(start, end=None):
+    # Miesięczne okna [since, until) od daty startowej do jutra (X traktuje "until" jako wyłączne).
+    # Bez `end` bieżący miesiąc kończy się na końcu miesiąca, a nie na jutrze - (since, until) jest
+    # kluczem stanu crawla i musi być stały między przebiegami; zapytanie przycina query_until()
+    if isinstance(start, str):
+        start = date.fromisoformat(start)
+    open_ended = end is None
+    if open_ended:
+        end = _tomorrow()
+    elif isinstance(end, str):
+        end = date.fromisoformat(end)
+
+    windows = []
+    current = start
+    while current < end:
+        month_end = (current.replace(day=1) + timedelta(days=32)).replace(day=1)
+        until = month_end if open_ended else min(month_end, end)
+        windows.append((current.isoformat(), until.isoformat()))
+        current = until
+    return windows
+
+
+def query_until(until):
+    # "until" do zapytania X: koniec okna, ale nie dalej niż jutro
+    return min(date.fromisoformat(until), _tomorrow()).isoformat()
+
+
+def _twikit_error(name):
+    # Klasy błędów bierzemy dopiero przy błędzie - sam import modułu (harmonogram) nie ładuje Twikit
+    try:
+        from twikit import errors
+    except ImportError:
+        return None
+    return getattr(errors, name, None)
+
+
+def _is_error(error, name, status_code):
+    error_class = _twikit_error(name)
+    if error_class is not None and isinstance(error, error_class):
+        return True
+    return getattr(error, "status_code", None) == status_code
+
+
+def _is_rate_limited(error):
+    return _is_error(error, "TooManyRequests", 429)
+
+
+def _is_unauthorized(error):
+    return _is_error(error, "Unauthorized", 401)
+
+
+async def _call(limiter, request):
+    # Każde zapytanie bierze token; 429 wstrzymuje wszystkie okna do czasu resetu z nagłówków
+    while True:
+        await limiter.acquire_async()
+        METRICS.inc("api_requests", api="twikit")
+        start = time.perf_counter()
+        try:
+            return await request()
+        except Exception as e:
+            if not _is_rate_limited(e):
+                METRICS.inc("api_errors", api="twikit")
+                if _is_unauthorized(e):
+                    raise SessionExpired(str(e)) from e
+                raise
+            METRICS.inc("rate_limited", api="twikit")
+            reset = getattr(e, "rate_limit_reset", None)
+            if reset:
+                limiter.pause_until(float(reset))
+            else:
+                limiter.pause(SEARCH_RATE_WINDOW)
+            print("⏳ Limit Twikit wyczerpany, czekam do resetu")
+        finally:
+            METRICS.observe("api_call", time.perf_counter() - start, api="twikit")
+
+
+async def search_window(client, query, since, until, limiter, sink, product="Latest", count=20, known=None):
+    # Wyniki "Latest" są od najnowszych - na tweecie o ID <= known kończymy stronicowanie
+    search_query = f"{query} since:{since} until:{query_until(until)} -is:retweet"
+    print(f"📅 Wyszukiwanie Twikit dla zakresu: {since} do {until}")
+    result = await _call(limiter, lambda: client.search_tweet(search_query, product, count=count))
+    pages = 0
+    total = 0
+    newest = None
+    reached_known = False
+    while result:
+        pages += 1
+        for tweet in result:
+            tweet_id = int(tweet.id)
+            if known is not None and tweet_id <= known:
+                reached_known = True
+                break
+            newest = tweet_id if newest is None else max(newest, tweet_id)
+            total += 1
+            outcome = sink(tweet)
+            if inspect.isawaitable(outcome):
+                await outcome
+        if reached_known or not getattr(result, "next_cursor", None):
+            break
+        current = result
+        result = await _call(limiter, lambda: current.next())
+    print(f"📅 Zakres {since} - {until}: {total} nowych tweetów z {pages} stron")
+    return total, newest
+
+
+async def search_windows(client, query, windows, sink, limiter=None, concurrency=4, product="Latest",
+                         known=None, on_complete=None):
+    """Przeszukuje okna równolegle (najwyżej `concurrency` naraz), stronicując aż do wyczerpania wyników.
+
+    Każdy tweet trafia do sink(tweet) od razu po pobraniu strony. known to {(since, until): ID}
+    z poprzednich przebiegów, a on_complete(since, until, newest_id) dostaje każde okno
+    zakończone bez błędu. Błąd jednego okna nie przerywa pozostałych, poza SessionExpired -
+    bez ważnej sesji pozostałe okna i tak by się nie powiodły.
+    """
+    limiter = limiter or search_limiter()
+    semaphore = asyncio.Semaphore(concurrency)
+    known = known or {}
+
+    async def run(since, until):
+        async with semaphore:
+            try:
+                total, newest = await search_window(client, query, since, until, limiter, sink, product,
+                                                    known=known.get((since, until)))
+            except SessionExpired:
+                raise
+            except Exception as e:
+                print(f"⚠️ Błąd Twikit dla {query} w zakresie {since} - {until}: {str(e)}")
+                return 0
+            if on_complete is not None:
+                on_complete(since, until, newest)
+            return total
+
+    tasks = [asyncio.ensure_future(run(since, until)) for since, until in windows]
+    try:
+        counts = await asyncio.gather(*tasks)
+    except SessionExpired:
+        for task in tasks:
+            task.cancel()
+        raise
+    return sum(counts)
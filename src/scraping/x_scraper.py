@@ -1,63 +1,47 @@
 import os
+import re
 import json
 import time
+import asyncio
 from datetime import datetime, timezone
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.core.os_manager import ChromeType
-from twikit import Client
-
-# Słowa kluczowe związane z inwestowaniem
-INVESTMENT_KEYWORDS = [
-    "akcje", "giełda", "inwestor", "inwestycja", "notowania",
-    "kurs", "spółka", "fundusz", "dividenda", "dividend",
-    "ticker", "share", "stock", "earnings", "IPO",
-    "wykres", "trading", "broker", "forex", "crypto",
-    "bitcoin", "ethereum", "altcoin",
-    "price", "market", "buy", "sell", "hold",
-    "portfolio", "wallet", "exchange", "mining", "blockchain",
-    "cena", "rynek", "kupić", "sprzedać", "trzymać",
-    "portfel", "portfel kryptowalut", "giełda kryptowalut", "kopanie", "blockchain"
-]
 
+from browser_pool import BrowserPool
+from comment_harvester import CommentHarvester
+from crawl_state import PendingProgress, get_crawl_state, window_scope
+from dom_extract import extract_new_articles
+from keyword_matcher import INVESTMENT_MATCHER
+from metrics import labels, start_export
+from network_capture import attach, enable_network_log, get_capture
+from page_wait import scroll_and_wait, wait_for_content
+from pipeline import Pipeline, Record
+from session_cache import get_session_cache, twikit_cookies
+from twikit_search import SessionExpired, month_windows, query_until, search_limiter, search_windows
 
-def contains_investment_keywords(text):
-    text = text.lower()
-    return any(kw in text for kw in INVESTMENT_KEYWORDS)
+# Selenium, webdriver_manager i Twikit importujemy w funkcjach, które ich używają - harmonogram
+# i benchmarki ładują ten moduł bez kosztu importu przeglądarki i klienta HTTP
 
+ARTICLE_SELECTOR = "article[role='article']"
+# Adresy stron X (benchmarki podstawiają lokalny serwer z nagranymi stronami)
+X_SEARCH_URL = "https://x.com/search?q={query}&f=live"
+X_STATUS_URL = "https://x.com/i/status/{tweet_id}"
 
-def save_posts(posts, topic, date):
-    safe_query = topic.replace(" ", "_")
-    path = os.path.join("data", safe_query, f"{date.year}", f"{date.month:02d}")
-    os.makedirs(path, exist_ok=True)
-    file_path = os.path.join(path, f"{date.day:02d}.txt")
+# Początek backfillu i limit tweetów z Twikit, dla których pobieramy komentarze
+SEARCH_START_DATE = "2025-01-01"
+MAX_TWIKIT_COMMENT_THREADS = 50
 
-    existing = set()
-    if os.path.exists(file_path):
-        with open(file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    existing.add(json.loads(line)["text"].strip())
-                except:
-                    pass
+STATUS_ID_RE = re.compile(r"/status/(\d+)")
 
-    new_posts = [p for p in posts if p["text"].strip() not in existing]
+CHROMEDRIVER_VERSION = "138.0.7204.94"
 
-    if not new_posts:
-        print(f"📭 Brak nowych wpisów do zapisania dla {topic} ({date.date()})")
-        return
+# "network" - wpisy z odpowiedzi JSON timeline'ów przechwyconych przez CDP (ID, czas, autor, odpowiedzi);
+# "dom" - dawne czytanie artykułów z wyrenderowanej strony
+DEFAULT_CAPTURE_MODE = "network"
+# Pola, które daje tylko tryb sieciowy - przepisywane do zapisywanego wpisu
+CAPTURED_FIELDS = ("tweet_id", "author", "in_reply_to", "conversation_id", "lang", "metrics")
 
-    with open(file_path, "a", encoding="utf-8") as f:
-        for post in new_posts:
-            f.write(json.dumps(post, ensure_ascii=False) + "\n")
 
-    print(f"💾 Zapisano {len(new_posts)} wpisów dla {topic}: {file_path}")
+def contains_investment_keywords(text):
+    return INVESTMENT_MATCHER.contains(text)
 
 
 def load_config():
@@ -83,7 +67,20 @@ def load_config():
     )
 
 
+def load_capture_mode(config_path="config.json"):
+    # Klucz "capture" w sekcji "twitter" config.json: "network" (domyślnie) albo "dom"
+    if not os.path.exists(config_path):
+        return DEFAULT_CAPTURE_MODE
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("twitter", {}).get("capture", DEFAULT_CAPTURE_MODE)
+
+
 def login_to_x_selenium(driver, username, password, cookies=None):
+    # Zwraca True, gdy wystarczyły ciasteczka, i False po logowaniu nazwą użytkownika i hasłem
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
     driver.get("https://x.com/login")
     print("🔒 Próba logowania do X (Selenium)...")
     try:
@@ -98,7 +95,7 @@ def login_to_x_selenium(driver, username, password, cookies=None):
                     EC.presence_of_element_located((By.CSS_SELECTOR, "input[data-testid='SearchBox_Search_Input']"))
                 )
                 print("🔒 Zalogowano pomyślnie za pomocą ciasteczek!")
-                return
+                return True
             except:
                 print("⚠️ Ciasteczka nie działały, próbuję standardowego logowania...")
                 driver.get("https://x.com/login")
@@ -145,218 +142,421 @@ def login_to_x_selenium(driver, username, password, cookies=None):
             EC.presence_of_element_located((By.CSS_SELECTOR, "input[data-testid='SearchBox_Search_Input']"))
         )
         print("🔒 Zalogowano pomyślnie!")
+        return False
     except Exception as e:
         print(f"⚠️ Błąd podczas logowania (Selenium): {str(e)}")
         raise
 
 
-def fetch_comments_selenium(driver, tweet_url, parent_tweet_text):
+def build_selenium_post(item, platform, **extra):
+    text = item.get("text")
+    keywords = INVESTMENT_MATCHER.find(text) if text else None
+    if not keywords:
+        return None
+
+    post = {
+        "platform": platform,
+        "text": text,
+        # Prawdziwy czas utworzenia z <time datetime>, a gdy go brak - czas pobrania
+        "timestamp": item.get("timestamp") or datetime.now(timezone.utc).isoformat(),
+        **extra,
+        "keywords": sorted(keywords)
+    }
+    for key in CAPTURED_FIELDS:
+        if item.get(key) is not None:
+            post[key] = item[key]
+    if item.get("url"):
+        post["tweet_url"] = f"https://x.com{item['url']}"
+    return post
+
+
+def new_items(driver, capture):
+    # Nowe wpisy od ostatniego odczytu: z przechwyconych odpowiedzi JSON albo z artykułów w DOM
+    if capture is not None:
+        return capture.items()
+    return extract_new_articles(driver, ARTICLE_SELECTOR)
+
+
+def harvest_comments(driver, tweet_url, parent_tweet_text, max_scrolls=20, scroll_timeout=8):
+    # Wersja dla CommentHarvester - błędy lecą wyżej, żeby worker mógł ponowić z back-offem
     comments = []
-    try:
-        print(f"💬 Otwieram stronę tweeta: {tweet_url}")
-        driver.get(tweet_url)
-
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "article"))
-        )
+    print(f"💬 Otwieram stronę tweeta: {tweet_url}")
+    capture = get_capture(driver)
+    if capture is not None:
+        capture.clear()
+    driver.get(tweet_url)
+
+    state, waited = wait_for_content(driver, ARTICLE_SELECTOR, timeout=10)
+    if state.count == 0:
+        raise RuntimeError(f"brak artykułów na stronie tweeta po {waited:.1f}s")
+
+    parent_id = str(status_id(tweet_url))
+    for i in range(max_scrolls + 1):
+        for item in new_items(driver, capture):
+            # TweetDetail zawiera też sam tweet - komentarzami są tylko pozostałe wpisy
+            if item.get("tweet_id") == parent_id:
+                continue
+            comment = build_selenium_post(item, "X-Selenium-Comment", parent_tweet=parent_tweet_text[:50])
+            if comment:
+                comments.append(comment)
+                print(f"💬 Komentarz: {comment['text'][:50]}... Matches keywords: True")
+        if i == max_scrolls:
+            break
+
+        print(f"🔄 Scroll komentarzy {i + 1}/{max_scrolls} dla tweeta, komentarzy: {state.count}")
+        new_state, elapsed = scroll_and_wait(driver, ARTICLE_SELECTOR, state, timeout=scroll_timeout)
+        waited += elapsed
+        if new_state == state:
+            print(f"ℹ️ Brak nowych komentarzy po scrollu {i + 1}, przerywam")
+            break
+        state = new_state
+    print(f"⏱️ Oczekiwanie na stronie tweeta: {waited:.1f}s")
+    print(f"💬 Znaleziono {len(comments)} komentarzy dla tweeta")
+    return comments
 
-        previous_comment_count = 0
-        for i in range(20):
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            current_comment_count = len(soup.find_all("article", attrs={"role": "article"}))
-            print(f"🔄 Scroll komentarzy {i + 1}/20 dla tweeta, komentarzy: {current_comment_count}")
 
-            if current_comment_count == previous_comment_count and i > 0:
-                print(f"ℹ️ Brak nowych komentarzy po scrollu {i + 1}, przerywam")
-                break
-            previous_comment_count = current_comment_count
-
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2 + (0.1 * current_comment_count))
-
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        comment_articles = soup.find_all("article", attrs={"role": "article"})
-        for article in comment_articles:
-            comment_div = article.find("div", attrs={"data-testid": "tweetText"})
-            if comment_div:
-                text = comment_div.get_text(separator=" ", strip=True)
-                if text and contains_investment_keywords(text):
-                    comments.append({
-                        "platform": "X-Selenium-Comment",
-                        "text": text,
-                        "timestamp": datetime.now(timezone.utc).isoformat(),
-                        "parent_tweet": parent_tweet_text[:50]
-                    })
-                    print(f"💬 Komentarz: {text[:50]}... Matches keywords: True")
-        print(f"💬 Znaleziono {len(comments)} komentarzy dla tweeta")
+def fetch_comments_selenium(driver, tweet_url, parent_tweet_text, max_scrolls=20, scroll_timeout=8):
+    try:
+        return harvest_comments(driver, tweet_url, parent_tweet_text, max_scrolls, scroll_timeout)
     except Exception as e:
         print(f"⚠️ Błąd podczas pobierania komentarzy dla {tweet_url}: {str(e)}")
-    return comments
+        return []
+
+
+def x_account(username):
+    # Klucz sesji w pamięci podręcznej - wspólny dla Twikit i Selenium
+    return f"x:{username.lower()}"
+
+
+def login_x_session(driver, username, password, cookies=None):
+    # Najpierw ciasteczka z pamięci sesji (także zapisane przez Twikit), potem z config.json, na końcu hasło.
+    # Przeglądarki puli logują się po kolei - kolejne dostają ciasteczka zapisane przez pierwszą.
+    sessions = get_session_cache()
+    account = x_account(username)
+    with sessions.login_lock(account):
+        cached = sessions.cookies(account)
+        if login_to_x_selenium(driver, username, password, cached or cookies) and cached:
+            return
+        sessions.save(account, driver.get_cookies(), "selenium")
+
+
+def chromedriver_path():
+    # install() przy każdym wywołaniu sprawdza wersję i pobrane pliki (także przy każdej próbie puli),
+    # więc rozwiązaną ścieżkę trzymamy w pamięci sesji i sprawdzamy tylko, czy plik nadal istnieje
+    def install():
+        from webdriver_manager.chrome import ChromeDriverManager
+        from webdriver_manager.core.os_manager import ChromeType
+        return ChromeDriverManager(chrome_type=ChromeType.GOOGLE, driver_version=CHROMEDRIVER_VERSION).install()
+    return get_session_cache().driver_path(f"chromedriver-{CHROMEDRIVER_VERSION}", install)
+
+
+def init_x_driver(username, password, cookies=None, capture=DEFAULT_CAPTURE_MODE):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
+    options = Options()
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--log-level=3")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-notifications")
+    options.add_argument("--memory-pressure-level=none")
+    options.add_argument("--disable-background-networking")
+    options.add_argument("--disable-software-rasterizer")
+    options.add_argument("--disable-images")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    if capture == "network":
+        enable_network_log(options)
+
+    driver = webdriver.Chrome(service=Service(chromedriver_path()), options=options)
+    try:
+        login_x_session(driver, username, password, cookies)
+        if capture == "network":
+            attach(driver)
+    except Exception:
+        driver.quit()
+        raise
+    return driver
+
+
+def create_x_browser_pool(size=1, max_retries=3, capture=None):
+    # Zalogowane sesje Selenium współdzielone przez wszystkie tematy jednego przebiegu
+    x_username, x_password, cookies, _, _ = load_config()
+    capture = capture or load_capture_mode()
+    return BrowserPool(
+        lambda: init_x_driver(x_username, x_password, cookies, capture),
+        size=size,
+        max_retries=max_retries
+    )
+
+
+async def twikit_client(username, password, refresh=False):
+    # Klient z ciasteczkami z pamięci sesji; logowanie tylko bez ważnej sesji albo po jej odrzuceniu (refresh)
+    from twikit import Client
+
+    sessions = get_session_cache()
+    account = x_account(username)
+    client = Client('en-US')
+    if not refresh:
+        cookies = sessions.cookies(account)
+        if cookies is None:
+            # Logowanie Selenium w toku (np. z 2FA) - czekamy na nie w osobnym wątku, żeby nie blokować
+            # pętli asyncio, i bierzemy zapisane przez nie ciasteczka
+            await asyncio.to_thread(_wait_for_login, sessions.login_lock(account))
+            cookies = sessions.cookies(account)
+        if cookies:
+            client.set_cookies(twikit_cookies(cookies))
+            print("🍪 Twikit: sesja z pamięci podręcznej")
+            return client
+    # Blokady logowania (threading.Lock) nie trzymamy przez await - zapis sesji i tak jest pod blokadą pamięci
+    sessions.invalidate(account)
+    print("🔒 Logowanie do X (Twikit)...")
+    await client.login(auth_info_1=username, password=password)
+    print("🔒 Zalogowano pomyślnie (Twikit)!")
+    sessions.save(account, client.get_cookies(), "twikit")
+    return client
+
+
+def _wait_for_login(lock):
+    with lock:
+        pass
 
 
-def fetch_tweets_hybrid(query, max_scrolls=100, max_retries=3, max_wait_time=300):
-    tweets = []
-    driver = None
+async def search_twikit(username, password, query, date_ranges, sink, concurrency=4, limiter=None,
+                       known=None, on_complete=None):
+    completed = set()
+
+    def complete(since, until, newest):
+        completed.add((since, until))
+        if on_complete is not None:
+            on_complete(since, until, newest)
+
+    client = await twikit_client(username, password)
+    try:
+        return await search_windows(client, query, date_ranges, sink, limiter=limiter, concurrency=concurrency,
+                                    known=known, on_complete=complete)
+    except SessionExpired:
+        # Ciasteczka unieważnione po stronie X - jedno ponowne logowanie i tylko niedokończone okna
+        # (tweety z przerwanych okien mogą trafić do sink drugi raz; storage odrzuca duplikaty)
+        print("🔒 Sesja Twikit wygasła, loguję ponownie...")
+        client = await twikit_client(username, password, refresh=True)
+        remaining = [window for window in date_ranges if window not in completed]
+        return await search_windows(client, query, remaining, sink, limiter=limiter, concurrency=concurrency,
+                                    known=known, on_complete=complete)
+
+
+def status_id(tweet_url):
+    match = STATUS_ID_RE.search(tweet_url or "")
+    return int(match.group(1)) if match else None
+
+
+def status_url(tweet_id):
+    # Jeden kanoniczny adres statusu, żeby kolejka komentarzy i stan crawla nie widziały duplikatów
+    return X_STATUS_URL.format(tweet_id=tweet_id)
+
+
+def comments_source(topic):
+    # Tweet pasujący do kilku tematów ma komentarze zapisane w każdym z nich, więc zbiór pobranych
+    # wątków jest osobny dla tematu (jak reddit/{temat})
+    return f"x-comments/{topic}"
+
+
+def tweet_record(topic, post):
+    # Ten sam tweet z Twikit i Selenium (i komentarz z dwóch stron statusu) odpada w potoku po ID
+    return Record(topic, post, key=post.get("tweet_id") or post.get("tweet_url"))
+
+
+def fetch_tweets_hybrid(query, pipeline, max_scrolls=100, max_retries=3, max_wait_time=300, pool=None,
+                        comment_workers=2, since=SEARCH_START_DATE, twikit_concurrency=4, twikit_limiter=None,
+                        progress=None):
+    # Każdy wpis (tweet Twikit, tweet Selenium, komentarz) trafia do potoku zaraz po pobraniu.
+    # Postęp (high-water marki, pobrane wątki) trafia do `progress`; wywołujący zatwierdza go
+    # checkpointem potoku, czyli po zapisaniu wpisów. Bez `progress` stan crawla jest tylko czytany.
+    own_pool = pool is None
+    if progress is None:
+        progress = PendingProgress(get_crawl_state())
+    crawl = progress.state
     try:
         # Wczytaj dane logowania z config.json
         x_username, x_password, cookies, x_client_id, x_client_secret = load_config()
 
-        # Inicjalizacja Twikit
-        client = Client('en-US')
-        print("🔒 Logowanie do X (Twikit)...")
-        client.login(auth_info_1=x_username, auth_info_2=x_password)
-        print("🔒 Zalogowano pomyślnie (Twikit)!")
-
-        # Wyszukiwanie tweetów za pomocą Twikit
-        date_ranges = [
-            ("2025-01-01", "2025-02-01"),
-            ("2025-02-01", "2025-03-01"),
-            ("2025-03-01", "2025-04-01"),
-            ("2025-04-01", "2025-05-01"),
-            ("2025-05-01", "2025-06-01"),
-            ("2025-06-01", datetime.now(timezone.utc).strftime("%Y-%m-%d"))
-        ]
-
-        for start_date, end_date in date_ranges:
-            print(f"📅 Wyszukiwanie Twikit dla zakresu: {start_date} do {end_date}")
-            search_query = f"{query} since:{start_date} until:{end_date} -is:retweet"
-            try:
-                twikit_tweets = client.search_tweet(query=search_query, product='Latest', count=1000)
-                for tweet in twikit_tweets:
-                    if contains_investment_keywords(tweet.text):
-                        tweets.append({
-                            "platform": "X-Twikit",
-                            "text": tweet.text,
-                            "timestamp": tweet.created_at,
-                            "tweet_id": tweet.id
-                        })
-                        print(
-                            f"📝 Tweet (Twikit): {tweet.text[:50]}... Matches keywords: True (Created: {tweet.created_at})")
-            except Exception as e:
-                print(f"⚠️ Błąd Twikit dla {query} w zakresie {start_date} - {end_date}: {str(e)}")
-                continue
+        # Miesięczne okna od daty startowej do dziś; okna zamknięte przed ostatnim przebiegiem pomijamy
+        date_ranges = month_windows(since)
+        twikit_windows = [w for w in date_ranges if not crawl.window_complete(query, "twikit", *w)]
+        twikit_known = {w: crawl.high_water(query, "twikit", window_scope(*w)) for w in twikit_windows}
+
+        def on_twikit_window(since, until, newest):
+            known = twikit_known.get((since, until))
+            progress.high_water(query, "twikit", window_scope(since, until), newest or known or 0)
 
-        # Inicjalizacja Selenium dla komentarzy
-        options = Options()
-        options.add_argument("--disable-gpu")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--log-level=3")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--window-size=1920,1080")
-        options.add_argument("--disable-extensions")
-        options.add_argument("--disable-notifications")
-        options.add_argument("--memory-pressure-level=none")
-        options.add_argument("--disable-background-networking")
-        options.add_argument("--disable-software-rasterizer")
-        options.add_argument("--disable-images")
-        options.add_argument("--blink-settings=imagesEnabled=false")
-
-        for attempt in range(1, max_retries + 1):
+        if own_pool:
+            pool = create_x_browser_pool(size=comment_workers + 1, max_retries=max_retries)
+        is_known = lambda url: crawl.is_harvested(comments_source(query), status_id(url))
+        emit = lambda post: pipeline.put(tweet_record(query, post))
+
+        def on_comments(comments):
+            # Błąd potoku nie może zatrzymać workera - i tak wróci z close() potoku
             try:
-                driver_path = ChromeDriverManager(chrome_type=ChromeType.GOOGLE,
-                                                  driver_version="138.0.7204.94").install()
-                service = Service(driver_path)
-                driver = webdriver.Chrome(service=service, options=options)
-                print(f"🌐 Inicjalizacja przeglądarki dla {query} (próba {attempt}/{max_retries})")
-                login_to_x_selenium(driver, x_username, x_password, cookies)
-                break
+                for comment in comments:
+                    emit(comment)
             except Exception as e:
-                print(f"⚠️ Błąd podczas inicjalizacji Selenium dla {query} (próba {attempt}/{max_retries}): {str(e)}")
-                if driver:
-                    driver.quit()
-                    driver = None
-                if attempt == max_retries:
-                    print(f"❌ Nie udało się zainicjalizować Selenium dla {query}")
-                    return tweets
-
-        # Pobierz komentarze dla tweetów z Twikit
-        for tweet in tweets[:50]:  # Ogranicz do 50 tweetów, aby uniknąć przeciążenia
-            if tweet["platform"] == "X-Twikit":
-                tweet_url = f"https://x.com/i/status/{tweet['tweet_id']}"
-                comments = fetch_comments_selenium(driver, tweet_url, tweet["text"])
-                tweets.extend(comments)
-
-        # Dodatkowe wyszukiwanie Selenium dla tweetów
-        for start_date, end_date in date_ranges:
-            print(f"📅 Wyszukiwanie Selenium dla zakresu: {start_date} do {end_date}")
-            search_query = f"{query} since:{start_date} until:{end_date}"
-            search_url = f"https://x.com/search?q={search_query}&f=live"
-            print(f"🌐 Ładowanie strony: {search_url}")
-            driver.get(search_url)
-
+                print(f"⚠️ Nie przekazano komentarzy do zapisu: {str(e)}")
+
+        with CommentHarvester(pool, harvest_comments, workers=comment_workers, is_known=is_known,
+                              on_comments=on_comments) as harvester:
+            submitted = []
+
+            def on_twikit_tweet(tweet):
+                keywords = INVESTMENT_MATCHER.find(tweet.text)
+                if not keywords:
+                    return
+                post = {
+                    "platform": "X-Twikit",
+                    "text": tweet.text,
+                    "timestamp": tweet.created_at,
+                    "tweet_id": tweet.id,
+                    "keywords": sorted(keywords)
+                }
+                print(f"📝 Tweet (Twikit): {tweet.text[:50]}... Matches keywords: True (Created: {tweet.created_at})")
+
+                # Komentarze pobierają workery już w trakcie wyszukiwania (limit 50 tweetów na temat)
+                if len(submitted) < MAX_TWIKIT_COMMENT_THREADS:
+                    url = status_url(tweet.id)
+                    if harvester.submit(url, tweet.text):
+                        submitted.append(url)
+                # Pełna kolejka potoku wstrzymuje tylko to okno wyszukiwania, a nie całą pętlę asyncio
+                return pipeline.put_async(tweet_record(query, post))
+
+            # Wyszukiwanie tweetów za pomocą Twikit - okna równolegle, ze stronicowaniem
             try:
-                WebDriverWait(driver, 30).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "article"))
-                )
-                print(f"✅ Strona załadowana dla {query}")
+                asyncio.run(search_twikit(x_username, x_password, query, twikit_windows, on_twikit_tweet,
+                                          twikit_concurrency, twikit_limiter, twikit_known, on_twikit_window))
             except Exception as e:
-                print(f"⚠️ Błąd podczas ładowania strony dla {query}: {str(e)}")
-                continue
+                print(f"⚠️ Błąd Twikit dla {query}: {str(e)}")
+
+            with pool.session(pages=0) as driver:
+                print(f"🌐 Przeglądarka gotowa dla {query}")
+                scrape_x_selenium(driver, pool, harvester, query, emit, date_ranges, max_scrolls, max_wait_time,
+                                  crawl=crawl, progress=progress)
 
-            start_time = time.time()
-            previous_article_count = 0
-            for i in range(max_scrolls):
-                soup = BeautifulSoup(driver.page_source, "html.parser")
-                current_article_count = len(soup.find_all("article", attrs={"role": "article"}))
-                print(f"🔄 Scroll {i + 1}/{max_scrolls} dla {query}, artykułów: {current_article_count}")
-
-                if current_article_count == previous_article_count and i > 0:
-                    print(f"ℹ️ Brak nowych artykułów po scrollu {i + 1}, przerywam")
-                    break
-                previous_article_count = current_article_count
-
-                articles = soup.find_all("article", attrs={"role": "article"})
-                for article in articles:
-                    tweet_div = article.find("div", attrs={"data-testid": "tweetText"})
-                    if tweet_div:
-                        text = tweet_div.get_text(separator=" ", strip=True)
-                        if contains_investment_keywords(text):
-                            tweets.append({
-                                "platform": "X-Selenium",
-                                "text": text,
-                                "timestamp": datetime.now(timezone.utc).isoformat()
-                            })
-                            print(f"📝 Tweet (Selenium): {text[:50]}... Matches keywords: True")
-
-                            link_element = article.find("a", href=True)
-                            if link_element and "/status/" in link_element["href"]:
-                                tweet_url = f"https://x.com{link_element['href']}"
-                                comments = fetch_comments_selenium(driver, tweet_url, text)
-                                tweets.extend(comments)
-
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2 + (0.05 * current_article_count))
-                try:
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "article"))
-                    )
-                except:
-                    print(f"⚠️ Błąd podczas scrollowania dla {query} na scrollu {i + 1}")
-                    break
-
-                if time.time() - start_time > max_wait_time:
-                    print(f"⏰ Przekroczono maksymalny czas oczekiwania ({max_wait_time}s) dla {query}")
-                    break
-
-        return tweets
+            harvester.join()
+            print(f"💬 Pobrano komentarze z {len(harvester.harvested)} wątków dla {query}")
+            progress.harvested(comments_source(query), [status_id(url) for url in harvester.harvested if status_id(url)])
     except Exception as e:
         print(f"❌ Błąd ogólny dla {query}: {str(e)}")
-        return tweets
     finally:
-        if driver:
-            driver.quit()
+        if own_pool and pool is not None:
+            pool.close()
             print("🌐 Zamknięto przeglądarkę Selenium")
 
 
-def fetch_all_posts_hybrid(topics):
-    print()
-    for topic in topics:
-        print(f"🔍 Pobieram tweety i komentarze dla: {topic}")
-        tweets = fetch_tweets_hybrid(topic)
-        save_posts(tweets, topic, datetime.now(timezone.utc))
-        print(f"📄 Znaleziono {len(tweets)} wpisów (tweety + komentarze) dla {topic}")
+def scrape_x_selenium(driver, pool, harvester, query, emit, date_ranges, max_scrolls, max_wait_time,
+                      scroll_timeout=10, crawl=None, progress=None):
+    # Wyszukiwanie trzyma własną kartę - komentarze trafiają do kolejki, więc stan scrolla nie ginie.
+    # Każdy tweet idzie od razu do emit(post) (potok zapisu).
+    # Dodatkowe wyszukiwanie Selenium dla tweetów
+    capture = get_capture(driver)
+    for start_date, end_date in date_ranges:
+        scope = window_scope(start_date, end_date)
+        if crawl is not None and crawl.window_complete(query, "x-selenium", start_date, end_date):
+            print(f"📅 Zakres {start_date} - {end_date} pobrany wcześniej, pomijam")
+            continue
+        known = crawl.high_water(query, "x-selenium", scope) if crawl is not None else None
+        newest = None
+        reached_known = False
+        # Mark przesuwamy tylko, gdy okno się wyczerpało - po limicie scrolli albo czasu starsze
+        # tweety zostały niepobrane i następny przebieg musi je jeszcze zobaczyć
+        exhausted = False
+
+        print(f"📅 Wyszukiwanie Selenium dla zakresu: {start_date} do {end_date}")
+        search_query = f"{query} since:{start_date} until:{query_until(end_date)}"
+        search_url = X_SEARCH_URL.format(query=search_query)
+        print(f"🌐 Ładowanie strony: {search_url}")
+        if capture is not None:
+            capture.clear()
+        driver.get(search_url)
+        pool.mark_pages(driver)
+
+        state, waited = wait_for_content(driver, ARTICLE_SELECTOR, timeout=30)
+        if state.count == 0:
+            # Puste okno też jest wyczerpane - bez znacznika puste miesiące byłyby przeszukiwane co przebieg
+            print(f"ℹ️ Brak wyników dla {query} w zakresie {start_date} - {end_date} (czekano {waited:.1f}s)")
+            if progress is not None:
+                progress.high_water(query, "x-selenium", scope, known or 0)
+            continue
+        print(f"✅ Strona załadowana dla {query} po {waited:.1f}s")
+
+        start_time = time.time()
+        for i in range(max_scrolls):
+            print(f"🔄 Scroll {i + 1}/{max_scrolls} dla {query}, artykułów: {state.count}")
+
+            for item in new_items(driver, capture):
+                item_id = status_id(item.get("url"))
+                if item_id is not None:
+                    # Wyniki "Latest" są od najnowszych - znany ID oznacza, że dalej jest już tylko stare
+                    if known is not None and item_id <= known:
+                        reached_known = True
+                        continue
+                    newest = item_id if newest is None else max(newest, item_id)
+
+                tweet = build_selenium_post(item, "X-Selenium")
+                if tweet:
+                    emit(tweet)
+                    print(f"📝 Tweet (Selenium): {tweet['text'][:50]}... Matches keywords: True")
+
+                    if item_id is not None:
+                        harvester.submit(status_url(item_id), tweet["text"])
+
+            if reached_known:
+                print(f"ℹ️ Dotarto do wpisów z poprzedniego przebiegu po scrollu {i + 1}, przerywam")
+                exhausted = True
+                break
+
+            new_state, elapsed = scroll_and_wait(driver, ARTICLE_SELECTOR, state, timeout=scroll_timeout)
+            waited += elapsed
+            if new_state == state:
+                print(f"ℹ️ Brak nowych artykułów po scrollu {i + 1}, przerywam")
+                exhausted = True
+                break
+            state = new_state
 
+            if time.time() - start_time > max_wait_time:
+                print(f"⏰ Przekroczono maksymalny czas oczekiwania ({max_wait_time}s) dla {query}")
+                break
+        print(f"⏱️ Oczekiwanie na stronie wyszukiwania: {waited:.1f}s")
+        if not exhausted:
+            print(f"ℹ️ Zakres {start_date} - {end_date} nie został przewinięty do końca - stan crawla bez zmian")
+        elif progress is not None:
+            progress.high_water(query, "x-selenium", scope, newest or known or 0)
+
+
+def fetch_and_save_topic(topic, pool, comment_workers=2, twikit_limiter=None, crawl=None):
+    # Jeden temat: wpisy zapisywane w trakcie pobierania, a stan crawla zatwierdza checkpoint
+    # po zrzuceniu na dysk wszystkich wpisów tematu; zwraca liczbę nowych wpisów
+    progress = PendingProgress(crawl or get_crawl_state())
+    with labels(platform="x", topic=topic), Pipeline() as pipeline:
+        fetch_tweets_hybrid(topic, pipeline, pool=pool, comment_workers=comment_workers,
+                            twikit_limiter=twikit_limiter, progress=progress)
+        pipeline.checkpoint(progress.commit)
+    print(f"📄 Znaleziono {pipeline.received.get(topic, 0)} wpisów (tweety + komentarze) dla {topic}, "
+          f"nowych: {pipeline.saved.get(topic, 0)}")
+    return pipeline.saved.get(topic, 0)
+
+
+def fetch_all_posts_hybrid(topics, comment_workers=2):
+    print()
+    # Limit zapytań Twikit dotyczy konta, więc jest wspólny dla wszystkich tematów
+    twikit_limiter = search_limiter()
+    crawl = get_crawl_state()
+    with create_x_browser_pool(size=comment_workers + 1) as pool:
+        for topic in topics:
+            print(f"🔍 Pobieram tweety i komentarze dla: {topic}")
+            fetch_and_save_topic(topic, pool, comment_workers, twikit_limiter, crawl)
 
 if __name__ == "__main__":
     topics = ["Bitcoin"]  # Testuj z jednym tematem
+    start_export()
     fetch_all_posts_hybrid(topics)
\ No newline at end of file
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Moduły scraperów importują się nawzajem płasko (jak przy uruchamianiu z src/scraping),
+# a atrapy API i dane testowe są wspólne z benchmarkami
+sys.path[:0] = [os.path.join(ROOT, "src", "scraping"), os.path.join(ROOT, "benchmarks")]
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # Scrapery piszą do data/ i czytają config.json względem bieżącego katalogu
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
@@ -0,0 +1,55 @@
+import random
+from datetime import datetime, timezone
+
+import fixtures
+from network_capture import parse_tweet, timeline_items
+
+
+def test_parse_tweet_fields():
+    rng = random.Random(1)
+    created = datetime(2025, 6, 1, 12, 30, tzinfo=timezone.utc)
+    result = fixtures.x_tweet(1234, "Kurs & <akcje>", created, "trader", rng, reply_to=1200, conversation_id=1100)
+
+    item = parse_tweet(result)
+
+    assert item["tweet_id"] == "1234"
+    assert item["author"] == "trader"
+    assert item["url"] == "/trader/status/1234"
+    assert item["in_reply_to"] == "1200"
+    assert item["conversation_id"] == "1100"
+    assert item["timestamp"] == "2025-06-01T12:30:00+00:00"
+    # full_text ma encje HTML, wpis - zwykłe znaki jak w DOM
+    assert item["text"] == "Kurs & <akcje>"
+    assert item["metrics"]["likes"] == result["legacy"]["favorite_count"]
+    assert item["metrics"]["views"] == int(result["views"]["count"])
+
+
+def test_parse_tweet_unwraps_visibility_results_and_skips_tombstones():
+    rng = random.Random(2)
+    result = fixtures.x_tweet(77, "tekst", datetime(2025, 1, 2, tzinfo=timezone.utc), "user", rng)
+
+    assert parse_tweet({"__typename": "TweetWithVisibilityResults", "tweet": result})["tweet_id"] == "77"
+    assert parse_tweet({"__typename": "TweetTombstone"}) is None
+
+
+def test_timeline_items_search_page_order():
+    results = fixtures.x_search_tweets(tweets=30)
+
+    first = timeline_items(fixtures.x_search_timeline(results, 0, batch=20))
+    second = timeline_items(fixtures.x_search_timeline(results, 1, batch=20))
+
+    assert [item["tweet_id"] for item in first + second] == [result["rest_id"] for result in results]
+    assert all(item["in_reply_to"] is None for item in first)
+
+
+def test_timeline_items_conversation_replies():
+    focal, replies = fixtures.x_conversation(5000, comments=3)
+
+    items = timeline_items(fixtures.x_tweet_detail(focal, replies, 0))
+
+    assert [item["tweet_id"] for item in items] == ["5000", "5001", "5002", "5003"]
+    assert items[0]["author"] == "author"
+    assert items[0]["in_reply_to"] is None
+    assert [item["author"] for item in items[1:]] == ["reply0", "reply1", "reply2"]
+    assert all(item["in_reply_to"] == "5000" and item["conversation_id"] == "5000" for item in items[1:])
+    assert items[1]["timestamp"] == "2025-06-01T00:01:00+00:00"
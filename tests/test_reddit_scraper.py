@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from crawl_state import CrawlState
+from fakes import FakeReddit
+
+reddit_scraper = pytest.importorskip("reddit_scraper")
+
+TOPICS = ["Bitcoin", "Ethereum"]
+
+
+def _saved_files(root):
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(".txt"):
+                path = os.path.join(dirpath, filename)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+def _fetch(workdir, monkeypatch, name, workers):
+    # Każdy przebieg we własnym katalogu, z własnym stanem crawla, backendem zapisu i writerem
+    # (writer pamięta uchwyty i katalogi po ścieżkach względnych)
+    import storage
+    import partition_writer
+    run_dir = workdir / name
+    run_dir.mkdir()
+    monkeypatch.chdir(run_dir)
+    monkeypatch.setattr(storage, "_default_storage", None)
+    monkeypatch.setattr(partition_writer, "_default_writer", None)
+    fake = FakeReddit(latency=0.001, posts_per_listing=40, spacing=600.0)
+    fake.now = 1_790_000_000.0
+    monkeypatch.setattr(reddit_scraper, "get_reddit", lambda: fake)
+    try:
+        with CrawlState("crawl_state.sqlite") as state:
+            totals = reddit_scraper.fetch_and_save_posts(
+                TOPICS, days_back=100_000, limit_total=40 * len(reddit_scraper.FINANCE_SUBREDDITS),
+                workers=workers, requests_per_minute=600_000, state=state)
+    finally:
+        if storage._default_storage is not None:
+            storage._default_storage.close()
+    return totals, _saved_files(str(run_dir / "data"))
+
+
+def test_parallel_fetch_matches_serial_output(workdir, monkeypatch):
+    serial_totals, serial_files = _fetch(workdir, monkeypatch, "serial", workers=1)
+    parallel_totals, parallel_files = _fetch(workdir, monkeypatch, "parallel", workers=8)
+
+    assert serial_totals["Bitcoin"] > 0
+    assert parallel_totals == serial_totals
+    assert parallel_files == serial_files
@@ -0,0 +1,51 @@
+import time
+import asyncio
+
+from fakes import FakeTwikitClient
+from rate_limiter import TokenBucket
+from twikit_search import search_window
+
+
+def _search(client, limiter, known=None):
+    tweets = []
+    total, newest = asyncio.run(search_window(client, "bitcoin", "2025-01-01", "2025-02-01", limiter,
+                                              tweets.append, known=known))
+    return tweets, total, newest
+
+
+def test_search_window_follows_cursor_through_all_pages():
+    client = FakeTwikitClient(latency=0, pages_per_window=3, count=5)
+
+    tweets, total, newest = _search(client, TokenBucket(1000, capacity=10))
+
+    expected = [tweet.id for page in range(3) for tweet in client.tweets_for(("2025-01-01", "2025-02-01"), page)]
+    assert [tweet.id for tweet in tweets] == expected
+    assert total == 15
+    assert newest == int(expected[0])
+    assert client.rate.requests == 3
+
+
+def test_search_window_stops_at_known_id():
+    client = FakeTwikitClient(latency=0, pages_per_window=3, count=5)
+    ids = [tweet.id for page in range(3) for tweet in client.tweets_for(("2025-01-01", "2025-02-01"), page)]
+
+    # Wszystko od siódmego tweeta (druga strona) znamy z poprzedniego przebiegu
+    tweets, total, _ = _search(client, TokenBucket(1000, capacity=10), known=int(ids[6]))
+
+    assert [tweet.id for tweet in tweets] == ids[:6]
+    assert total == 6
+    assert client.rate.requests == 2
+
+
+def test_search_window_waits_for_rate_limit_reset():
+    # Serwer przyjmuje 2 zapytania na 0.3 s; trzecia strona dostaje 429 z czasem resetu
+    client = FakeTwikitClient(latency=0, pages_per_window=3, count=5, rate_limit=2, rate_window=0.3)
+    start = time.time()
+
+    tweets, total, _ = _search(client, TokenBucket(1000, capacity=10))
+
+    assert total == 15
+    assert len({tweet.id for tweet in tweets}) == 15
+    assert client.rate.rejected == 1
+    assert client.rate.requests == 4
+    assert time.time() - start >= 0.25